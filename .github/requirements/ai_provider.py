@@ -1,39 +1,399 @@
 from __future__ import annotations
 
+import http.client
 import json
 import os
-from typing import Optional
-from urllib import request
+import queue
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlsplit
 
+from llm_cache import LlmCache, default_llm_cache, llm_cache_bypassed
+from llm_resilience import (
+    CircuitBreaker,
+    LatencyTracker,
+    LlmOutcome,
+    LlmPolicy,
+    OutcomeLog,
+    default_circuit_breaker,
+    default_latency_path,
+    retry_delay,
+    stall_retry_delay,
+)
 
-def call_llm(prompt: str, fallback: str) -> str:
+SYSTEM_MESSAGE = "Você é um analista de requisitos de software focado em precisão."
+TEMPERATURE = 0.1
+
+# Validador incremental: recebe o texto acumulado e se o stream terminou; retorna
+# True (válido, para de checar), False (inválido, aborta) ou None (ainda indefinido).
+OutputValidator = Callable[[str, bool], Optional[bool]]
+
+_STATE_LOCK = threading.Lock()
+_CACHE: Optional[LlmCache] = None
+_CACHE_LOADED = False
+_BREAKER: Optional[CircuitBreaker] = None
+_LATENCY: Optional[LatencyTracker] = None
+OUTCOMES = OutcomeLog()
+
+
+def get_llm_cache() -> Optional[LlmCache]:
+    global _CACHE, _CACHE_LOADED
+    with _STATE_LOCK:
+        if not _CACHE_LOADED:
+            _CACHE = default_llm_cache()
+            _CACHE_LOADED = True
+        return _CACHE
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    global _BREAKER
+    with _STATE_LOCK:
+        if _BREAKER is None:
+            _BREAKER = default_circuit_breaker()
+        return _BREAKER
+
+
+def get_latency_tracker() -> LatencyTracker:
+    global _LATENCY
+    with _STATE_LOCK:
+        if _LATENCY is None:
+            _LATENCY = LatencyTracker(default_latency_path())
+        return _LATENCY
+
+
+def reset_llm_state() -> None:
+    """Descarta cache, circuit breaker e histórico de latência (reconfigurados pelo ambiente no próximo uso)."""
+    global _CACHE, _CACHE_LOADED, _BREAKER, _LATENCY
+    with _STATE_LOCK:
+        _CACHE = None
+        _CACHE_LOADED = False
+        _BREAKER = None
+        _LATENCY = None
+
+
+def prefix_validator(prefix: str) -> OutputValidator:
+    """Aceita a saída assim que ela começa com `prefix` (ignorando espaços iniciais)."""
+
+    def validate(text: str, final: bool) -> Optional[bool]:
+        head = text.lstrip()
+        if len(head) >= len(prefix):
+            return head.startswith(prefix)
+        if final or not prefix.startswith(head):
+            return False
+        return None
+
+    return validate
+
+
+def _stream_enabled() -> bool:
+    return os.getenv("AI_PROVIDER_STREAM", "1").strip().lower() not in {"0", "false", "off", "no"}
+
+
+class _ProviderError(Exception):
+    def __init__(self, outcome: str, detail: str = "", status: Optional[int] = None, retry_after: Optional[str] = None) -> None:
+        super().__init__(detail or outcome)
+        self.outcome = outcome
+        self.detail = detail
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Attempt:
+    """Uma requisição ao provedor; `cancel` fecha a conexão a partir de outra thread."""
+
+    def __init__(self) -> None:
+        self.conn: Optional[http.client.HTTPConnection] = None
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.conn is not None:
+            self.conn.close()
+
+
+_MALFORMED_PAYLOAD = (ValueError, AttributeError, TypeError, IndexError, KeyError)
+
+
+def _parse_completion(raw: bytes) -> str:
+    """Conteúdo de uma resposta Chat Completions; corpo fora do formato vira `invalid_output`."""
+    try:
+        content = json.loads(raw.decode("utf-8"))["choices"][0]["message"]["content"]
+    except _MALFORMED_PAYLOAD as exc:
+        raise _ProviderError("invalid_output", f"resposta fora do formato ({exc.__class__.__name__}: {exc})") from exc
+    if not isinstance(content, str):
+        raise _ProviderError("invalid_output", "resposta sem conteúdo de texto")
+    return content
+
+
+def _parse_sse_line(raw_line: bytes) -> Tuple[bool, str]:
+    """(fim do stream, trecho de conteúdo) de uma linha SSE; chunk fora do formato vira `invalid_output`."""
+    try:
+        line = raw_line.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            return False, ""
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return True, ""
+        choices = json.loads(data).get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content") or ""
+    except _MALFORMED_PAYLOAD as exc:
+        raise _ProviderError("invalid_output", f"chunk SSE fora do formato ({exc.__class__.__name__}: {exc})") from exc
+    if not isinstance(delta, str):
+        raise _ProviderError("invalid_output", "chunk SSE sem conteúdo de texto")
+    return False, delta
+
+
+def _read_stream(resp, validator: Optional[OutputValidator], deadline_at: float) -> Optional[str]:
+    """Lê um stream SSE de Chat Completions; `None` se o validador rejeitar a saída parcial."""
+    parts = []
+    decided = validator is None
+    for raw_line in resp:
+        if time.monotonic() > deadline_at:
+            raise _ProviderError("timeout", "prazo total esgotado durante o stream")
+        done, delta = _parse_sse_line(raw_line)
+        if done:
+            break
+        if not delta:
+            continue
+        parts.append(delta)
+        if not decided:
+            verdict = validator("".join(parts), False)
+            if verdict is False:
+                return None
+            decided = verdict is True
+    content = "".join(parts)
+    if not decided and validator(content, True) is not True:
+        return None
+    return content
+
+
+def _send(
+    attempt: _Attempt,
+    base_url: str,
+    body: bytes,
+    headers: dict,
+    stream: bool,
+    validator: Optional[OutputValidator],
+    policy: LlmPolicy,
+    deadline_at: float,
+) -> str:
+    parts = urlsplit(base_url)
+    connection_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise _ProviderError("timeout", "prazo total esgotado antes do envio")
+    attempt.conn = connection_cls(parts.netloc, timeout=min(policy.connect_timeout, remaining))
+    target = parts.path or "/"
+    if parts.query:
+        target += f"?{parts.query}"
+    try:
+        # `cancel` pode ter rodado antes de `conn` existir ou durante o connect (que reabre o
+        # socket fechado): confere de novo antes de enviar e pagar por uma geração descartada.
+        if attempt.cancelled:
+            raise _ProviderError("cancelled")
+        attempt.conn.connect()
+        if attempt.cancelled:
+            raise _ProviderError("cancelled")
+        # Sem stream a resposta só chega ao fim da geração: vale o prazo total, não o de inatividade.
+        read_timeout = policy.read_timeout if stream else deadline_at - time.monotonic()
+        attempt.conn.sock.settimeout(min(read_timeout, max(deadline_at - time.monotonic(), 0.001)))
+        attempt.conn.request("POST", target, body=body, headers=headers)
+        resp = attempt.conn.getresponse()
+        if resp.status >= 400:
+            resp.read()
+            raise _ProviderError("http_error", resp.reason, status=resp.status, retry_after=resp.getheader("Retry-After"))
+        if stream:
+            content = _read_stream(resp, validator, deadline_at)
+        else:
+            content = _parse_completion(resp.read())
+            if validator is not None and validator(content, True) is not True:
+                content = None
+    except _ProviderError:
+        raise
+    except socket.timeout as exc:
+        raise _ProviderError("timeout", str(exc) or "timeout de conexão/leitura") from exc
+    except (OSError, http.client.HTTPException, ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+        if attempt.cancelled:
+            raise _ProviderError("cancelled") from exc
+        raise _ProviderError("network_error", f"{exc.__class__.__name__}: {exc}") from exc
+    finally:
+        # Fechar a conexão também interrompe a geração no provedor quando o stream é abortado.
+        attempt.conn.close()
+    if content is None:
+        raise _ProviderError("invalid_output", "saída rejeitada pelo validador")
+    return content
+
+
+def _send_hedged(send: Callable[[_Attempt], str], hedge_delay: float, deadline_at: float) -> Tuple[str, bool]:
+    """Dispara uma segunda requisição se a primeira não terminar em `hedge_delay`; vence a primeira resposta."""
+    results: "queue.Queue[Tuple[_Attempt, Optional[str], Optional[_ProviderError]]]" = queue.Queue()
+
+    def run(attempt: _Attempt) -> None:
+        try:
+            results.put((attempt, send(attempt), None))
+        except _ProviderError as exc:
+            results.put((attempt, None, exc))
+
+    attempts = [_Attempt()]
+    threading.Thread(target=run, args=(attempts[0],), daemon=True).start()
+    hedged = False
+    pending = 1
+    error: Optional[_ProviderError] = None
+    try:
+        while pending:
+            timeout = deadline_at - time.monotonic()
+            if not hedged:
+                timeout = min(timeout, hedge_delay)
+            try:
+                attempt, content, exc = results.get(timeout=max(timeout, 0.0))
+            except queue.Empty:
+                if hedged or time.monotonic() >= deadline_at:
+                    raise _ProviderError("timeout", "prazo total esgotado aguardando o provedor")
+                hedged = True
+                pending += 1
+                attempts.append(_Attempt())
+                threading.Thread(target=run, args=(attempts[-1],), daemon=True).start()
+                continue
+            pending -= 1
+            if exc is None:
+                return content, hedged
+            error = exc
+            # Erro definitivo da primeira tentativa antes do hedge: não vale a pena duplicar.
+            if not hedged:
+                raise exc
+        raise error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+def call_llm_detailed(
+    prompt: str,
+    fallback: str,
+    expect_prefix: Optional[str] = None,
+    validator: Optional[OutputValidator] = None,
+    policy: Optional[LlmPolicy] = None,
+) -> Tuple[str, LlmOutcome]:
+    """Como `call_llm`, mas devolve também o `LlmOutcome` registrado para a chamada."""
+    started = time.monotonic()
     api_key = os.getenv("OPENAI_API_KEY") or os.getenv("AI_PROVIDER_API_KEY")
     model = os.getenv("AI_PROVIDER_MODEL", "gpt-4o-mini")
     base_url = os.getenv("AI_PROVIDER_URL", "https://api.openai.com/v1/chat/completions")
+    policy = policy or LlmPolicy.from_env()
+
+    def finish(content: str, outcome: LlmOutcome) -> Tuple[str, LlmOutcome]:
+        outcome.model = model
+        outcome.latency_ms = round((time.monotonic() - started) * 1000, 1)
+        OUTCOMES.record(outcome)
+        if outcome.outcome != "no_key":
+            print(
+                f"LLM: {outcome.outcome} (modelo={model}, tentativas={outcome.attempts}, hedge={outcome.hedged}, "
+                f"{outcome.latency_ms:.0f} ms){' — ' + outcome.detail if outcome.detail else ''}",
+                file=sys.stderr,
+            )
+        return content, outcome
 
     if not api_key:
-        return fallback
+        return finish(fallback, LlmOutcome("no_key"))
+
+    if validator is None and expect_prefix:
+        validator = prefix_validator(expect_prefix)
+
+    cache = get_llm_cache()
+    cache_key = LlmCache.key_for(model, base_url, SYSTEM_MESSAGE, prompt, TEMPERATURE)
+    if cache is not None and not llm_cache_bypassed():
+        cached = cache.get(cache_key)
+        if cached is not None and (validator is None or validator(cached, True) is True):
+            return finish(cached, LlmOutcome("cache_hit", detail=cache_key[:12]))
+
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        return finish(fallback, LlmOutcome("circuit_open", detail=f"{breaker.failures} falhas seguidas"))
 
+    stream = validator is not None and _stream_enabled()
     payload = {
         "model": model,
         "messages": [
-            {"role": "system", "content": "Você é um analista de requisitos de software focado em precisão."},
+            {"role": "system", "content": SYSTEM_MESSAGE},
             {"role": "user", "content": prompt},
         ],
-        "temperature": 0.1,
+        "temperature": TEMPERATURE,
     }
+    if stream:
+        payload["stream"] = True
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+    if stream:
+        headers["Accept"] = "text/event-stream"
 
-    data = json.dumps(payload).encode("utf-8")
-    req = request.Request(base_url, method="POST", data=data)
-    req.add_header("Content-Type", "application/json")
-    req.add_header("Authorization", f"Bearer {api_key}")
+    deadline_at = started + policy.deadline
+    tracker = get_latency_tracker()
 
-    try:
-        with request.urlopen(req, timeout=60) as resp:
-            response = json.loads(resp.read().decode("utf-8"))
-            return response["choices"][0]["message"]["content"]
-    except Exception:
-        return fallback
+    def send(attempt: _Attempt) -> str:
+        return _send(attempt, base_url, body, headers, stream, validator, policy, deadline_at)
+
+    attempt_no = 0
+    hedged = False
+    while True:
+        attempt_no += 1
+        call_started = time.monotonic()
+        try:
+            if policy.hedge:
+                content, used_hedge = _send_hedged(send, tracker.hedge_delay(policy), deadline_at)
+                hedged = hedged or used_hedge
+            else:
+                content = send(_Attempt())
+        except _ProviderError as exc:
+            if exc.outcome == "invalid_output":
+                # O provedor respondeu; a saída é que não serve. Não conta como falha do circuito.
+                breaker.record_success()
+                return finish(fallback, LlmOutcome("invalid_output", attempts=attempt_no, hedged=hedged, detail=exc.detail))
+            delay = None
+            if exc.outcome == "http_error" and exc.status is not None:
+                delay = retry_delay(exc.status, exc.retry_after, attempt_no - 1, policy)
+            elif exc.outcome in {"timeout", "network_error"}:
+                delay = stall_retry_delay(attempt_no - 1, policy)
+            # Leitura travada ou conexão perdida também são repetidas, sempre dentro do prazo total.
+            if delay is not None and time.monotonic() + delay < deadline_at:
+                time.sleep(delay)
+                continue
+            breaker.record_failure()
+            return finish(
+                fallback,
+                LlmOutcome(exc.outcome, attempts=attempt_no, hedged=hedged, status=exc.status, detail=exc.detail),
+            )
+
+        breaker.record_success()
+        tracker.record(time.monotonic() - call_started)
+        # Apenas respostas reais e válidas do provedor são gravadas; o fallback nunca entra no cache.
+        if cache is not None:
+            try:
+                cache.put(cache_key, content, model=model)
+            except OSError:
+                pass
+        return finish(content, LlmOutcome("ok", attempts=attempt_no, hedged=hedged, status=200))
+
+
+def call_llm(
+    prompt: str,
+    fallback: str,
+    expect_prefix: Optional[str] = None,
+    validator: Optional[OutputValidator] = None,
+) -> str:
+    """Chama o provedor de IA; devolve `fallback` se não houver chave, em erro ou saída inválida.
+
+    Com `expect_prefix`/`validator` a resposta é lida em streaming (SSE) e a
+    requisição é abortada assim que a saída parcial é rejeitada, em vez de
+    esperar a geração completa. `AI_PROVIDER_STREAM=0` desativa o streaming;
+    a validação passa a ser feita sobre a resposta completa. Prazos,
+    retentativas, hedge e circuit breaker seguem `LlmPolicy.from_env()`; o
+    motivo de cada fallback fica em `OUTCOMES`.
+    """
+    content, _ = call_llm_detailed(prompt, fallback, expect_prefix=expect_prefix, validator=validator)
+    return content
 
 
 def load_prompt_file(path: str) -> str:
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from audit_ledger import DecisionRecord
+from github_api import GitHubAPI
+
+DEFAULT_BATCH_WORKERS = 8
+
+
+@dataclass
+class BatchSelection:
+    """Issues escolhidas para o lote; `prefetched` guarda as que vieram completas da listagem/busca."""
+
+    numbers: List[int]
+    prefetched: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    def issue(self, gh: GitHubAPI, issue_number: int) -> Dict[str, Any]:
+        cached = self.prefetched.get(issue_number)
+        return dict(cached) if cached is not None else gh.get_issue(issue_number)
+
+
+@dataclass
+class BatchItem:
+    issue_number: int
+    status: str
+    decision: str = ""
+    detail: str = ""
+    elapsed_ms: float = 0.0
+
+
+def add_selector_arguments(parser: argparse.ArgumentParser) -> None:
+    selector = parser.add_mutually_exclusive_group(required=True)
+    selector.add_argument("--issue", type=int)
+    selector.add_argument("--issues", help="Lista de issues, aceita intervalos (ex.: 12,15,20-25)")
+    selector.add_argument("--label", help="Todas as issues abertas com o label")
+    selector.add_argument("--query", help="Busca do GitHub restrita às issues do repositório (ex.: 'label:req is:open')")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BATCH_WORKERS, help="Teto de issues em paralelo no lote")
+
+
+def parse_issue_list(value: str) -> List[int]:
+    numbers: List[int] = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        match = re.fullmatch(r"(\d+)-(\d+)", item)
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            if end < start:
+                raise ValueError(f"Intervalo de issues inválido: {item}")
+            numbers.extend(range(start, end + 1))
+        elif item.isdigit():
+            numbers.append(int(item))
+        else:
+            raise ValueError(f"Issue inválida em --issues: {item}")
+    return list(dict.fromkeys(numbers))
+
+
+def select_issues(gh: GitHubAPI, args: argparse.Namespace) -> BatchSelection:
+    if args.issues:
+        return BatchSelection(parse_issue_list(args.issues))
+    found = gh.iter_issues_with_label(args.label) if args.label else gh.search_issues(args.query)
+    prefetched: Dict[int, Dict[str, Any]] = {}
+    for issue in found:
+        prefetched.setdefault(int(issue["number"]), issue)
+    return BatchSelection(sorted(prefetched), prefetched)
+
+
+def batch_workers(gh: GitHubAPI, requested: int) -> int:
+    """Paralelismo do lote limitado pelo orçamento de requisições do scheduler do transporte."""
+    requested = max(1, requested)
+    scheduler = getattr(gh.transport, "scheduler", None)
+    return scheduler.concurrency_budget(requested) if scheduler is not None else requested
+
+
+def run_batch(issue_numbers: List[int], worker: Callable[[int], DecisionRecord], workers: int) -> List[BatchItem]:
+    """Executa `worker` por issue num pool limitado; uma issue com erro não interrompe as demais."""
+
+    def run_one(issue_number: int) -> BatchItem:
+        started = time.perf_counter()
+        try:
+            decision = worker(issue_number)
+        except Exception as exc:
+            return BatchItem(
+                issue_number,
+                "erro",
+                detail=f"{exc.__class__.__name__}: {exc}",
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+        return BatchItem(
+            issue_number,
+            "ok",
+            decision=decision.decision,
+            detail=decision.justification,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(issue_numbers) or 1))) as pool:
+        return list(pool.map(run_one, issue_numbers))
+
+
+def format_batch_markdown(skill: str, items: List[BatchItem], elapsed_s: float, workers: int) -> str:
+    lines = [
+        f"### {skill} — lote de {len(items)} issues",
+        "| Issue | Status | Decisão | Tempo (ms) | Detalhe |",
+        "|---|---|---|---|---|",
+    ]
+    for item in items:
+        detail = item.detail.replace("|", "\\|").replace("\n", " ") or "-"
+        lines.append(f"| #{item.issue_number} | {item.status} | {item.decision or '-'} | {item.elapsed_ms} | {detail} |")
+    outcomes: Dict[str, int] = {}
+    for item in items:
+        key = item.decision if item.status == "ok" else "erro"
+        outcomes[key] = outcomes.get(key, 0) + 1
+    summary = ", ".join(f"{key}={value}" for key, value in sorted(outcomes.items())) or "-"
+    lines.extend(["", f"**Total:** {len(items)} issues em {elapsed_s:.1f} s com {workers} workers — {summary}"])
+    return "\n".join(lines)
+
+
+def run_batch_cli(
+    skill: str,
+    gh: GitHubAPI,
+    args: argparse.Namespace,
+    worker: Callable[[GitHubAPI, BatchSelection, int], DecisionRecord],
+    prepare: Optional[Callable[[BatchSelection], None]] = None,
+) -> None:
+    """Seleciona as issues, prepara o estado compartilhado do lote e imprime o resumo; exit 1 se alguma falhar.
+
+    Cada issue roda com `gh.with_retry_budget()`: a memoização do lote é
+    compartilhada, mas uma rajada de rate limit numa issue não consome as
+    retentativas das demais.
+    """
+    selection = select_issues(gh, args)
+    if not selection.numbers:
+        print(f"{skill}: nenhuma issue selecionada.")
+        return
+    started = time.perf_counter()
+    if prepare is not None:
+        prepare(selection)
+    workers = batch_workers(gh, args.workers)
+    items = run_batch(selection.numbers, lambda number: worker(gh.with_retry_budget(), selection, number), workers)
+    print(format_batch_markdown(skill, items, time.perf_counter() - started, workers))
+    if any(item.status == "erro" for item in items):
+        sys.exit(1)
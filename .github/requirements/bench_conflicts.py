@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from rn_catalog import RN_CATALOG, detect_conflicts
+
+
+def _legacy_detect(text: str) -> List[str]:
+    """Implementação anterior: um `re.search` por padrão, sem compilação prévia."""
+    lowered = text.lower()
+    conflicts = []
+    for rn_id, rule in RN_CATALOG.items():
+        if any(re.search(pattern, lowered) for pattern in rule.conflict_patterns):
+            conflicts.append(rn_id)
+    return sorted(set(conflicts))
+
+
+def pathological_inputs(size_kb: int) -> Dict[str, str]:
+    """Entradas em linha única que forçam backtracking em `a.*b` e `a.*b.*c`."""
+    size = size_kb * 1024
+
+    def repeat(chunk: str) -> str:
+        return (chunk * (size // len(chunk) + 1))[:size]
+
+    return {
+        "orcamento-sem-pendente": repeat("orçamento "),
+        "incluir-nao-confirmada": repeat("incluir não confirmada "),
+        "fluxo-de-caixa-repetido": repeat("fluxo de caixa "),
+        "texto-comum": repeat("O usuário registra uma transação na conta e consulta o relatório mensal.\n"),
+    }
+
+
+# Casos em que o motor já divergiu de `re.search`: um segmento anterior na linha errada
+# (via `\s+` atravessando a quebra) não pode impedir a ocorrência real.
+REGRESSION_CASES = [
+    "Incluir status não confirmada e também não\nconfirmada no orçamento mensal",
+    "fluxo de caixa não\nconfirmada e fluxo de caixa não confirmada",
+    "orçamento\npendente",
+]
+_FUZZ_WORDS = [
+    "incluir", "não", "nao", "confirmada", "orçamento", "orcamento", "pendente", "fluxo", "de", "caixa", "sem",
+    "validar", "saldo", "ignorar", "transação", "atômica", "excluir", "categoria", "padrão", "status", " ", "  ", "\n", "\t",
+]
+
+
+def check_equivalence(cases: int, seed: int = 7) -> List[Tuple[str, List[str], List[str]]]:
+    """Compara o motor com a implementação anterior em casos fixos e textos aleatórios; retorna as divergências."""
+    rng = random.Random(seed)
+    texts = list(REGRESSION_CASES)
+    for idx in range(cases):
+        words = rng.choices(_FUZZ_WORDS, k=rng.randint(1, 25))
+        texts.append((" " if idx % 2 else "").join(words))
+    mismatches = []
+    for text in texts:
+        engine, legacy = detect_conflicts(text, budget_ms=10_000).rn_ids, _legacy_detect(text)
+        if engine != legacy:
+            mismatches.append((text, engine, legacy))
+    return mismatches
+
+
+def _timed(fn: Callable[[str], Any], text: str) -> float:
+    started = time.perf_counter()
+    fn(text)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Detecção de conflitos RN: motor compilado vs re.search por padrão")
+    parser.add_argument("--sizes-kb", default="1,4,16,64")
+    parser.add_argument(
+        "--legacy-max-kb",
+        type=int,
+        default=4,
+        help="Maior entrada medida com a implementação anterior (o custo cresce de forma cúbica)",
+    )
+    parser.add_argument(
+        "--check",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Só confere equivalência com a implementação anterior em N textos aleatórios (exit 1 se divergir)",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check_equivalence(args.check)
+        for text, engine, legacy in mismatches[:10]:
+            print(f"Divergência: {text!r} motor={engine} anterior={legacy}")
+        print(f"{args.check + len(REGRESSION_CASES)} textos, {len(mismatches)} divergências")
+        if mismatches:
+            sys.exit(1)
+        return
+
+    print("| Entrada | KB | Anterior (ms) | Motor (ms) | RNs | Estourou orçamento |")
+    print("|---|---|---|---|---|---|")
+    for size_kb in [int(item) for item in args.sizes_kb.split(",") if item.strip()]:
+        for name, text in pathological_inputs(size_kb).items():
+            legacy = f"{_timed(_legacy_detect, text):.1f}" if size_kb <= args.legacy_max_kb else "-"
+            scan = detect_conflicts(text, budget_ms=10_000)
+            print(
+                f"| {name} | {size_kb} | {legacy} | {scan.elapsed_ms:.1f} | {', '.join(scan.rn_ids) or '-'} | "
+                f"{'sim' if scan.timed_out else 'não'} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
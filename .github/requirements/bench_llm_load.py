@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from ai_provider import OUTCOMES, reset_llm_state
+from bench_skills import SKILLS, configure_replay_env
+from github_replay import ReplayServer, synthetic_cassette
+from http_transport import reset_default_transport
+from llm_stub_server import LlmStubServer, add_stub_arguments, config_from_args, load_responses
+
+LLM_SKILLS = ("01", "02")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _run_once(module_name: str, issue_number: int) -> Tuple[str, float]:
+    module = importlib.import_module(module_name)
+    started = time.perf_counter()
+    try:
+        module.main(["--issue", str(issue_number)])
+        status = "ok"
+    except Exception as exc:
+        status = f"{exc.__class__.__name__}: {exc}"
+    return status, (time.perf_counter() - started) * 1000
+
+
+def run_load(stub: LlmStubServer, skill: str, issue_number: int, runs: int, concurrency: int) -> Dict[str, Any]:
+    """Executa `runs` vezes a skill com até `concurrency` execuções simultâneas no mesmo processo."""
+    reset_llm_state()
+    outcomes_before = dict(OUTCOMES.counts)
+    stub_before = stub.snapshot()
+    module_name = SKILLS[skill]
+    importlib.import_module(module_name)
+
+    started = time.perf_counter()
+    # Saída das skills e logs `LLM:` por chamada descartados; o resumo sai no fim.
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: _run_once(module_name, issue_number), range(runs)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [ms for _, ms in results]
+    failures = [status for status, _ in results if status != "ok"]
+    outcomes = {key: value - outcomes_before.get(key, 0) for key, value in OUTCOMES.counts.items()}
+    outcomes = {key: value for key, value in outcomes.items() if value}
+    calls = sum(outcomes.values())
+    fallbacks = sum(value for key, value in outcomes.items() if key not in {"ok", "cache_hit"})
+    stub_after = stub.snapshot()
+    return {
+        "skill": f"SKILL-REQ-{skill}",
+        "runs": runs,
+        "concurrency": concurrency,
+        "failures": len(failures),
+        "first_failure": failures[0] if failures else "",
+        "throughput_rps": round(runs / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50), 1),
+        "p95_ms": round(_percentile(latencies, 0.95), 1),
+        "p99_ms": round(_percentile(latencies, 0.99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+        "llm_calls": calls,
+        "fallback_rate": round(fallbacks / calls, 3) if calls else 0.0,
+        "outcomes": outcomes,
+        "provider_requests": stub_after["requests"] - stub_before["requests"],
+    }
+
+
+def format_load_markdown(results: List[Dict[str, Any]]) -> str:
+    lines = [
+        "| Skill | Execuções | Concorrência | Vazão (exec/s) | p50 (ms) | p95 (ms) | p99 (ms) | Máx (ms) | Falhas | Chamadas LLM | Req. provedor | Fallback | Resultados LLM |",
+        "|---|---|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for item in results:
+        outcomes = ", ".join(f"{key}={value}" for key, value in sorted(item["outcomes"].items())) or "-"
+        lines.append(
+            f"| {item['skill']} | {item['runs']} | {item['concurrency']} | {item['throughput_rps']} | {item['p50_ms']} | "
+            f"{item['p95_ms']} | {item['p99_ms']} | {item['max_ms']} | {item['failures']} | {item['llm_calls']} | "
+            f"{item['provider_requests']} | {item['fallback_rate']:.1%} | {outcomes} |"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga concorrente de REQ-01/REQ-02 contra GitHub gravado e LLM simulado")
+    parser.add_argument("--skills", default="01,02")
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--issue", type=int, default=42)
+    parser.add_argument("--repository", default="bench/deep-ion")
+    parser.add_argument("--synthetic-issues", type=int, default=250)
+    parser.add_argument("--github-latency-ms", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Emite resultados em JSON")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    github = ReplayServer(
+        synthetic_cassette(args.repository, args.issue, total_issues=args.synthetic_issues), latency_ms=args.github_latency_ms
+    ).start()
+    stub = LlmStubServer(config_from_args(args), load_responses(args.responses)).start()
+    os.environ.pop("OPENAI_API_KEY", None)
+    os.environ.pop("GITHUB_RECORD_CASSETTE", None)
+    configure_replay_env(github, args.repository)
+    os.environ.update(
+        {
+            "AI_PROVIDER_URL": stub.completions_url,
+            "AI_PROVIDER_API_KEY": "stub",
+            # Sem cache: toda execução deve chegar ao provedor simulado.
+            "AI_CACHE": "0",
+            "AI_PROVIDER_LATENCY_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-llm-"), "latency.json"),
+            # O GitHub é local; o limitador não deve ser o gargalo medido.
+            "GITHUB_RATE_LIMIT_RPS": os.getenv("GITHUB_RATE_LIMIT_RPS") or "10000",
+            "GITHUB_RATE_LIMIT_BURST": os.getenv("GITHUB_RATE_LIMIT_BURST") or "10000",
+        }
+    )
+    reset_default_transport()
+    try:
+        skills = [item.strip() for item in args.skills.split(",") if item.strip() in LLM_SKILLS]
+        results = [run_load(stub, skill, args.issue, args.runs, args.concurrency) for skill in skills]
+    finally:
+        stub.stop()
+        github.stop()
+
+    print(json.dumps(results, indent=2, ensure_ascii=False) if args.json else format_load_markdown(results))
+
+
+if __name__ == "__main__":
+    main()
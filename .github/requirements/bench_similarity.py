@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from minhash_lsh import MinHashLSH, bands_for_threshold, jaccard_for_cosine
+from similarity_engine import SimilarityEngine, Vocabulary
+from uc_dedup_sweep import sweep
+from uc_repository import UcRecord
+
+
+def synthetic_corpus(size: int, queries: int, seed: int = 7) -> tuple:
+    """Corpus sintético com quase-duplicatas plantadas para cada consulta."""
+    rng = random.Random(seed)
+    vocab = [f"termo{idx}" for idx in range(20000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+
+    def document() -> List[str]:
+        return rng.choices(vocab, weights=weights, k=rng.randint(40, 90))
+
+    corpus = [document() for _ in range(size)]
+    query_docs = []
+    for _ in range(queries):
+        base = document()
+        query_docs.append(base)
+        for _ in range(rng.randint(1, 4)):
+            variant = list(base)
+            for pos in rng.sample(range(len(variant)), k=max(1, len(variant) * rng.randint(2, 20) // 100)):
+                variant[pos] = rng.choice(vocab)
+            corpus[rng.randrange(size)] = variant
+    return [Counter(doc) for doc in corpus], [Counter(doc) for doc in query_docs]
+
+
+def run(size: int, queries: int, threshold: float, num_perm: int, band_options: List[int]) -> List[Dict[str, Any]]:
+    corpus, query_docs = synthetic_corpus(size, queries)
+
+    started = time.perf_counter()
+    engine = SimilarityEngine.build(corpus)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    truth = [{doc_id for doc_id, _ in engine.top_k(query, threshold=threshold)} for query in query_docs]
+    brute_ms = (time.perf_counter() - started) * 1000 / max(len(query_docs), 1)
+
+    results: List[Dict[str, Any]] = [
+        {
+            "mode": "força bruta",
+            "bands": "-",
+            "build_ms": round(build_ms, 1),
+            "query_ms": round(brute_ms, 2),
+            "candidates": len(corpus),
+            "recall": 1.0,
+        }
+    ]
+    for bands in band_options:
+        started = time.perf_counter()
+        lsh = MinHashLSH.build((engine.row_terms(doc_id) for doc_id in range(len(engine))), num_perm=num_perm, bands=bands)
+        lsh_build_ms = (time.perf_counter() - started) * 1000
+
+        found = expected = candidate_total = 0
+        started = time.perf_counter()
+        for query, relevant in zip(query_docs, truth):
+            candidates = lsh.query(query)
+            candidate_total += len(candidates)
+            hits = {doc_id for doc_id, _ in engine.top_k(query, threshold=threshold, candidates=candidates)}
+            found += len(hits & relevant)
+            expected += len(relevant)
+        query_ms = (time.perf_counter() - started) * 1000 / max(len(query_docs), 1)
+        results.append(
+            {
+                "mode": "minhash+lsh",
+                "bands": f"{bands}x{num_perm // bands}",
+                "build_ms": round(lsh_build_ms, 1),
+                "query_ms": round(query_ms, 2),
+                "candidates": round(candidate_total / max(len(query_docs), 1), 1),
+                "recall": round(found / expected, 4) if expected else 1.0,
+            }
+        )
+    return results
+
+
+def all_pairs(size: int, threshold: float, num_perm: int, band_options: List[int]) -> List[Dict[str, Any]]:
+    """Recall sobre todos os pares do corpus (o mesmo critério da varredura `uc_dedup_sweep`).
+
+    As consultas de `run` só medem as variantes plantadas; aqui a referência
+    são todos os pares com cosseno >= threshold, inclusive os que o TF ponderado
+    aproxima sem muitos termos em comum, que o MinHash (sobre conjuntos) tende a perder.
+    """
+    corpus, _ = synthetic_corpus(size, 0)
+    engine = SimilarityEngine.build(corpus)
+
+    started = time.perf_counter()
+    truth = {(left, right) for left, right, _ in engine.similar_pairs(0, len(engine), threshold)}
+    results: List[Dict[str, Any]] = [
+        {
+            "mode": "exato",
+            "bands": "-",
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "pairs": len(truth),
+            "recall": 1.0,
+        }
+    ]
+    for bands in band_options:
+        started = time.perf_counter()
+        lsh = MinHashLSH.build((engine.row_terms(doc_id) for doc_id in range(len(engine))), num_perm=num_perm, bands=bands)
+        found = {(left, right) for left, right, _ in engine.similar_pairs(0, len(engine), threshold, lsh=lsh)}
+        results.append(
+            {
+                "mode": "minhash+lsh",
+                "bands": f"{bands}x{num_perm // bands}",
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                "pairs": len(found),
+                "recall": round(len(found & truth) / len(truth), 4) if truth else 1.0,
+            }
+        )
+    return results
+
+
+def sweep_run(
+    size: int, threshold: float, num_perm: int, bands: int, workers: int, memory_mb: int, modes: List[str]
+) -> List[Dict[str, Any]]:
+    """Varredura completa do `uc_dedup_sweep` sobre `size` UCs sintéticos, no caminho real (UcRecord → CSR)."""
+    corpus, _ = synthetic_corpus(size, 0)
+    vocabulary = Vocabulary()
+    records = [
+        UcRecord.from_counts(doc_id + 1, "", f"UC-{doc_id + 1}-01", "", counts, vocabulary) for doc_id, counts in enumerate(corpus)
+    ]
+    del corpus
+    engine = SimilarityEngine.from_term_arrays(vocabulary, ((uc.term_ids, uc.term_freqs) for uc in records))
+    results: List[Dict[str, Any]] = []
+    for mode in modes:
+        lsh = None
+        started = time.perf_counter()
+        if mode == "lsh":
+            lsh = MinHashLSH.build((engine.row_terms(doc_id) for doc_id in range(len(engine))), num_perm=num_perm, bands=bands)
+        _, stats = sweep(records, engine, threshold, workers, memory_mb, lsh=lsh)
+        results.append({**stats, "elapsed_s": round(time.perf_counter() - started, 2)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall e latência: MinHash/LSH vs força bruta na similaridade de UCs")
+    parser.add_argument("--ucs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", default="", help="Lista de bandas separadas por vírgula (default: automático + vizinhos)")
+    parser.add_argument(
+        "--pair-ucs",
+        type=int,
+        default=2000,
+        help="Tamanho do corpus para o recall sobre todos os pares (0 desativa; o cálculo exato é quadrático)",
+    )
+    parser.add_argument(
+        "--sweep",
+        default="",
+        help="Só mede a varredura all-pairs do uc_dedup_sweep com --ucs UCs nos modos listados (ex.: exato,lsh)",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Workers da varredura (--sweep)")
+    parser.add_argument("--memory-mb", type=int, default=2048, help="Teto de memória da varredura (--sweep)")
+    args = parser.parse_args()
+
+    if args.bands:
+        band_options = [int(item) for item in args.bands.split(",") if item.strip()]
+    else:
+        auto = bands_for_threshold(jaccard_for_cosine(args.threshold), args.num_perm)
+        band_options = sorted({max(auto // 2, 1), auto, min(auto * 2, args.num_perm)})
+
+    if args.sweep:
+        modes = [item.strip() for item in args.sweep.split(",") if item.strip()]
+        bands = bands_for_threshold(jaccard_for_cosine(args.threshold), args.num_perm)
+        print("| Modo | UCs | Workers | Tempo (s) | Pares | Pico RSS total (MB) | Teto (MB) |")
+        print("|---|---|---|---|---|---|---|")
+        for item in sweep_run(args.ucs, args.threshold, args.num_perm, bands, args.workers, args.memory_mb, modes):
+            print(
+                f"| {item['mode']} | {item['ucs']} | {item['workers']} | {item['elapsed_s']} | {item['pairs']} | "
+                f"{item['peak_rss_total_mb']} | {item['memory_mb']} |"
+            )
+        return
+
+    results = run(args.ucs, args.queries, args.threshold, args.num_perm, band_options)
+    print("| Modo | Bandas x linhas | Build (ms) | Consulta (ms) | Candidatos/consulta | Recall |")
+    print("|---|---|---|---|---|---|")
+    for item in results:
+        print(
+            f"| {item['mode']} | {item['bands']} | {item['build_ms']} | {item['query_ms']} | {item['candidates']} | {item['recall']} |"
+        )
+
+    if args.pair_ucs:
+        print()
+        print(f"Todos os pares ({args.pair_ucs} UCs, cosseno >= {args.threshold}):")
+        print()
+        print("| Modo | Bandas x linhas | Tempo (ms) | Pares | Recall |")
+        print("|---|---|---|---|---|")
+        for item in all_pairs(args.pair_ucs, args.threshold, args.num_perm, band_options):
+            print(f"| {item['mode']} | {item['bands']} | {item['elapsed_ms']} | {item['pairs']} | {item['recall']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from github_replay import ReplayServer, load_cassette, synthetic_cassette
+from http_transport import reset_default_transport
+
+SKILLS = {"00": "skill_req_00", "01": "skill_req_01", "02": "skill_req_02"}
+
+
+def _run_skill(module_name: str, issue_number: int) -> str:
+    module = importlib.import_module(module_name)
+    try:
+        with redirect_stdout(io.StringIO()):
+            module.main(["--issue", str(issue_number)])
+        return "ok"
+    except Exception as exc:
+        return f"erro: {exc.__class__.__name__}: {exc}"
+
+
+def configure_replay_env(server: ReplayServer, repository: str) -> None:
+    """Aponta o cliente GitHub para o servidor local, com caches em diretórios temporários novos."""
+    os.environ.update(
+        {
+            "GITHUB_API_URL": server.base_url,
+            "GITHUB_GRAPHQL_URL": f"{server.base_url}/graphql",
+            "GITHUB_REPOSITORY": repository,
+            "GITHUB_TOKEN": os.getenv("GITHUB_TOKEN") or "bench-token",
+            "GITHUB_HTTP_CACHE_DIR": tempfile.mkdtemp(prefix="bench-gh-cache-"),
+            "UC_INDEX_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-uc-index-"), "uc_index.sqlite"),
+        }
+    )
+
+
+def run_benchmark(
+    server: ReplayServer,
+    issue_number: int,
+    skills: List[str],
+    repository: str,
+) -> List[Dict[str, Any]]:
+    configure_replay_env(server, repository)
+    results: List[Dict[str, Any]] = []
+    for skill in skills:
+        # Cada skill começa com transporte frio, como no processo isolado do Actions.
+        reset_default_transport()
+        before = server.snapshot()
+        started = time.perf_counter()
+        status = _run_skill(SKILLS[skill], issue_number)
+        elapsed = time.perf_counter() - started
+        after = server.snapshot()
+        results.append(
+            {
+                "skill": f"SKILL-REQ-{skill}",
+                "status": status,
+                "wall_ms": round(elapsed * 1000, 1),
+                "requests": after["requests"] - before["requests"],
+                "bytes_in": after["bytes_in"] - before["bytes_in"],
+                "bytes_out": after["bytes_out"] - before["bytes_out"],
+                "unmatched": after["unmatched"] - before["unmatched"],
+            }
+        )
+    reset_default_transport()
+    return results
+
+
+def format_results_markdown(results: List[Dict[str, Any]]) -> str:
+    lines = [
+        "| Skill | Status | Wall (ms) | Requisições | Bytes enviados | Bytes recebidos |",
+        "|---|---|---|---|---|---|",
+    ]
+    for item in results:
+        lines.append(
+            f"| {item['skill']} | {item['status']} | {item['wall_ms']} | {item['requests']} | {item['bytes_in']} | {item['bytes_out']} |"
+        )
+    return "\n".join(lines)
+
+
+def _regressions(results: List[Dict[str, Any]], baseline_path: str) -> List[str]:
+    with open(baseline_path, "r", encoding="utf-8") as fh:
+        baseline = {item["skill"]: item for item in json.load(fh)}
+    messages = []
+    for item in results:
+        previous = baseline.get(item["skill"])
+        if previous and item["requests"] > previous["requests"]:
+            messages.append(f"{item['skill']}: {previous['requests']} → {item['requests']} requisições")
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de I/O das skills REQ-00/01/02 contra a API GitHub gravada")
+    parser.add_argument("--cassette", help="Cassette JSON gravado com GITHUB_RECORD_CASSETTE (default: sintético)")
+    parser.add_argument("--issue", type=int, default=42)
+    parser.add_argument("--repository", default="bench/deep-ion")
+    parser.add_argument("--skills", default="00,01,02")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--synthetic-issues", type=int, default=250)
+    parser.add_argument("--json", action="store_true", help="Emite resultados em JSON")
+    parser.add_argument("--baseline", help="JSON de execução anterior; falha se alguma skill fizer mais requisições")
+    args = parser.parse_args()
+
+    if args.cassette:
+        interactions = load_cassette(args.cassette)
+    else:
+        interactions = synthetic_cassette(args.repository, args.issue, total_issues=args.synthetic_issues)
+
+    for key in ("OPENAI_API_KEY", "AI_PROVIDER_API_KEY", "GITHUB_RECORD_CASSETTE"):
+        os.environ.pop(key, None)
+
+    server = ReplayServer(interactions, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms).start()
+    try:
+        skills = [item.strip() for item in args.skills.split(",") if item.strip() in SKILLS]
+        results = run_benchmark(server, args.issue, skills, args.repository)
+    finally:
+        server.stop()
+
+    print(json.dumps(results, indent=2) if args.json else format_results_markdown(results))
+
+    if args.baseline:
+        regressions = _regressions(results, args.baseline)
+        if regressions:
+            print("\n".join(["Regressão de round trips:", *regressions]), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
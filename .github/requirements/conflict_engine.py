@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import re
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Pattern, Sequence, Tuple
+
+# Único operador de "lacuna" aceito nos padrões de conflito: `.*` (qualquer coisa na mesma linha).
+_GAP = re.compile(r"(?<!\\)\.\*")
+_NEWLINE = re.compile("\n")
+# Segmentos com um único fim possível por início: literais, escapes, classes e `\s` quantificado entre eles.
+_SIMPLE_SEGMENT = re.compile(r"(?:[^\\\[\]().*+?{}|^$]|\\[^sSwWdDbBAZ0-9]|\[[^\]]+\]|\\s(?:[+*](?!$))?)+")
+
+
+@dataclass(frozen=True)
+class ConflictMatch:
+    rn_id: str
+    pattern: str
+    start: int
+    end: int
+
+
+@dataclass
+class ConflictScan:
+    matches: List[ConflictMatch] = field(default_factory=list)
+    timed_out: bool = False
+    elapsed_ms: float = 0.0
+
+    @property
+    def rn_ids(self) -> List[str]:
+        return sorted({match.rn_id for match in self.matches})
+
+
+@dataclass(frozen=True)
+class _CompiledPattern:
+    rn_id: str
+    source: str
+    segments: Tuple[Pattern[str], ...]
+
+
+class _Occurrences:
+    """Todas as ocorrências (inclusive sobrepostas) de cada segmento, calculadas uma vez por texto."""
+
+    def __init__(self, text: str, deadline: float) -> None:
+        self.text = text
+        self.deadline = deadline
+        self._cache: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def find(self, segment: Pattern[str]) -> Optional[Tuple[List[int], List[int]]]:
+        """(inícios, fins) em ordem crescente de início; None se o orçamento de tempo acabar."""
+        cached = self._cache.get(segment.pattern)
+        if cached is not None:
+            return cached
+        starts: List[int] = []
+        ends: List[int] = []
+        pos = 0
+        match = segment.search(self.text, pos)
+        while match is not None:
+            starts.append(match.start())
+            ends.append(match.end())
+            if len(starts) % 256 == 0 and time.perf_counter() > self.deadline:
+                return None
+            match = segment.search(self.text, match.start() + 1)
+        self._cache[segment.pattern] = (starts, ends)
+        return starts, ends
+
+
+class ConflictEngine:
+    """Padrões de conflito de todas as RNs, avaliados sem o backtracking de `a.*b.*c`.
+
+    Padrões com `.*` são divididos em segmentos; as ocorrências de cada
+    segmento são enumeradas uma única vez por texto (e compartilhadas entre
+    padrões que repetem o segmento). Do último segmento para o primeiro,
+    marca-se quais ocorrências ainda completam o restante do padrão com o
+    próximo segmento começando na mesma linha em que a ocorrência termina; a
+    primeira ocorrência válida do primeiro segmento é exatamente o início que
+    `re.search` encontraria, inclusive quando um segmento atravessa linhas via
+    `\\s+`. Isso vale para segmentos com um único fim por início (literais,
+    classes e `\\s` com quantificador entre eles, a forma do catálogo);
+    padrões fora dessa forma são recusados na carga, já que um `re.search`
+    avulso não respeitaria o orçamento. Cada RN é reportada uma única vez e a
+    varredura respeita um orçamento de tempo por documento.
+    """
+
+    def __init__(self, patterns: Mapping[str, Sequence[str]], budget_ms: float = 200.0) -> None:
+        self.budget_ms = budget_ms
+        self._patterns: List[_CompiledPattern] = []
+        for rn_id, sources in patterns.items():
+            for source in sources:
+                parts = _GAP.split(source)
+                if any(not part for part in parts):
+                    raise ValueError(f"Padrão de conflito inválido para {rn_id}: {source!r}")
+                if not all(_SIMPLE_SEGMENT.fullmatch(part) for part in parts):
+                    raise ValueError(
+                        f"Padrão de conflito não suportado para {rn_id}: {source!r} "
+                        "(use literais, classes e \\s entre lacunas `.*`)"
+                    )
+                segments = tuple(re.compile(part) for part in parts)
+                self._patterns.append(_CompiledPattern(rn_id=rn_id, source=source, segments=segments))
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def _first_match(
+        self, item: _CompiledPattern, occurrences: _Occurrences, newlines: List[int], text_length: int
+    ) -> Tuple[Optional[ConflictMatch], bool]:
+        """Ocorrência mais à esquerda do padrão; o segundo valor indica orçamento esgotado."""
+        # `reach[i]`: fim do padrão quando a ocorrência i do segmento atual o completa; -1 se não completa.
+        following: Optional[Tuple[List[int], List[int]]] = None
+        following_reach: List[int] = []
+        for segment in reversed(item.segments):
+            found_occurrences = occurrences.find(segment)
+            if found_occurrences is None:
+                return None, True
+            starts, ends = found_occurrences
+            if following is None:
+                reach = list(ends)
+            else:
+                next_starts = following[0]
+                # Próxima ocorrência válida do segmento seguinte a partir de cada índice.
+                next_valid = [len(next_starts)] * (len(next_starts) + 1)
+                for idx in range(len(next_starts) - 1, -1, -1):
+                    next_valid[idx] = idx if following_reach[idx] >= 0 else next_valid[idx + 1]
+                reach = []
+                for end in ends:
+                    line = bisect_left(newlines, end)
+                    line_end = newlines[line] if line < len(newlines) else text_length
+                    candidate = next_valid[bisect_left(next_starts, end)]
+                    valid = candidate < len(next_starts) and next_starts[candidate] <= line_end
+                    reach.append(following_reach[candidate] if valid else -1)
+            if not any(value >= 0 for value in reach):
+                return None, False
+            following, following_reach = (starts, ends), reach
+        starts = following[0] if following is not None else []
+        for idx, end in enumerate(following_reach):
+            if end >= 0:
+                return ConflictMatch(rn_id=item.rn_id, pattern=item.source, start=starts[idx], end=end), False
+        return None, False
+
+    def scan(self, text: str, budget_ms: Optional[float] = None) -> ConflictScan:
+        started = time.perf_counter()
+        deadline = started + (self.budget_ms if budget_ms is None else budget_ms) / 1000.0
+        result = ConflictScan()
+        occurrences = _Occurrences(text, deadline)
+        newlines = [match.start() for match in _NEWLINE.finditer(text)]
+        found: Dict[str, ConflictMatch] = {}
+        for item in self._patterns:
+            if item.rn_id in found:
+                continue
+            if time.perf_counter() > deadline:
+                result.timed_out = True
+                break
+            match, timed_out = self._first_match(item, occurrences, newlines, len(text))
+            if timed_out:
+                result.timed_out = True
+                break
+            if match is not None:
+                found[item.rn_id] = match
+
+        result.matches = sorted(found.values(), key=lambda match: (match.start, match.rn_id))
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
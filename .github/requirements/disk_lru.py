@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class DiskLru:
+    """Diretório de entradas JSON com limite de tamanho e despejo LRU.
+
+    Cada entrada é um arquivo `<chave>.json` gravado de forma atômica; o índice
+    em memória (tamanho, último acesso) é carregado do disco na primeira
+    consulta e a data do último acesso é o `mtime` do arquivo, então o LRU
+    sobrevive entre execuções (ex.: diretório restaurado pelo `actions/cache`).
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self) -> Dict[str, Tuple[int, float]]:
+        if self._index is None:
+            index: Dict[str, Tuple[int, float]] = {}
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(self.directory, name))
+                index[name[:-5]] = (stat.st_size, stat.st_mtime)
+            self._index = index
+        return self._index
+
+    def read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def touch(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            index = self._load_index()
+            if key in index:
+                index[key] = (index[key][0], now)
+        try:
+            os.utime(self.path(key), (now, now))
+        except OSError:
+            pass
+
+    def write(self, key: str, payload: str) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+        os.replace(tmp_path, self.path(key))
+        with self._lock:
+            index = self._load_index()
+            index[key] = (len(payload.encode("utf-8")), time.time())
+            self._evict(index)
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+        with self._lock:
+            self._load_index().pop(key, None)
+
+    def _evict(self, index: Dict[str, Tuple[int, float]]) -> None:
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            del index[key]
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "evictions": self.evictions,
+                "entries": len(index),
+                "bytes": sum(size for size, _ in index.values()),
+            }
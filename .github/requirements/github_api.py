@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import copy
 import json
 import os
 import pathlib
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
-from urllib import parse, request
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from urllib import error, parse
+
+from http_transport import HttpTransport, get_default_transport, iter_link_pages
+from rate_limit import RetryBudget
+from single_flight import SingleFlight
 
 
 def _load_dotenv() -> None:
@@ -50,8 +55,33 @@ class GitHubContext:
         return self.repository.split("/", maxsplit=1)[1]
 
 
+_ISSUE_BUNDLE_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    issue(number: $number) {
+      number
+      title
+      body
+      state
+      labels(first: 100) { nodes { name } }
+      comments(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { body createdAt }
+      }
+    }
+  }
+}
+"""
+
+
 class GitHubAPI:
-    def __init__(self, repository: Optional[str] = None, token: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        repository: Optional[str] = None,
+        token: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+        api_url: Optional[str] = None,
+    ) -> None:
         repo = repository or os.getenv("GITHUB_REPOSITORY", "")
         gh_token = token or os.getenv("GITHUB_TOKEN", "")
         if not repo:
@@ -59,26 +89,100 @@ class GitHubAPI:
         if not gh_token:
             raise ValueError("GITHUB_TOKEN não definido")
         self.ctx = GitHubContext(repository=repo, token=gh_token)
+        self.transport = transport or get_default_transport()
+        # Orçamento de retentativas desta instância: cada execução/evento cria o seu `GitHubAPI`.
+        scheduler = getattr(self.transport, "scheduler", None)
+        self.retry_budget: Optional[RetryBudget] = scheduler.new_budget() if scheduler is not None else None
+        self.api_url = (api_url or os.getenv("GITHUB_API_URL") or "https://api.github.com").rstrip("/")
+        self.graphql_url = os.getenv("GITHUB_GRAPHQL_URL") or f"{self.api_url}/graphql"
+        self.flight = SingleFlight()
+
+    def with_retry_budget(self) -> "GitHubAPI":
+        """Cópia que compartilha transporte e memoização, com orçamento de retentativas novo."""
+        clone = copy.copy(self)
+        scheduler = getattr(self.transport, "scheduler", None)
+        clone.retry_budget = scheduler.new_budget() if scheduler is not None else None
+        return clone
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {self.ctx.token}",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
 
     def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
-        url = f"https://api.github.com{path}"
+        url = f"{self.api_url}{path}"
         data = json.dumps(payload).encode("utf-8") if payload is not None else None
-        req = request.Request(url, method=method, data=data)
-        req.add_header("Accept", "application/vnd.github+json")
-        req.add_header("Authorization", f"Bearer {self.ctx.token}")
-        req.add_header("X-GitHub-Api-Version", "2022-11-28")
+        headers = self._headers()
         if data is not None:
-            req.add_header("Content-Type", "application/json")
-        with request.urlopen(req, timeout=30) as resp:
-            text = resp.read().decode("utf-8")
-            return json.loads(text) if text else {}
+            headers["Content-Type"] = "application/json"
+        return self.transport.request(method, url, headers=headers, body=data, retry_budget=self.retry_budget).json()
+
+    def _paginate(self, path: str) -> Iterator[Dict[str, Any]]:
+        for page in iter_link_pages(
+            self.transport, f"{self.api_url}{path}", headers=self._headers(), retry_budget=self.retry_budget
+        ):
+            yield from page
+
+    def _graphql(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        headers = self._headers()
+        headers["Content-Type"] = "application/json"
+        body = json.dumps({"query": query, "variables": variables}).encode("utf-8")
+        data = self.transport.request(
+            "POST", self.graphql_url, headers=headers, body=body, retry_budget=self.retry_budget
+        ).json()
+        if data.get("errors"):
+            messages = "; ".join(str(item.get("message", item)) for item in data["errors"])
+            raise RuntimeError(f"Erro GraphQL: {messages}")
+        return data.get("data") or {}
 
     def get_issue(self, issue_number: int) -> Dict[str, Any]:
         return self._request("GET", f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues/{issue_number}")
 
-    def list_issue_comments(self, issue_number: int, per_page: int = 100) -> List[Dict[str, Any]]:
+    def fetch_issue_bundle(self, issue_number: int) -> Dict[str, Any]:
+        """Busca título, corpo, labels e todos os comentários numa consulta GraphQL.
+
+        Retorna um dict no formato REST (`labels` como `[{"name": ...}]` e
+        `comments` com `body`/`created_at`) para uso direto pelas skills.
+        """
+        bundle: Dict[str, Any] = {}
+        comments: List[Dict[str, Any]] = []
+        cursor: Optional[str] = None
+        while True:
+            data = self._graphql(
+                _ISSUE_BUNDLE_QUERY,
+                {"owner": self.ctx.owner, "name": self.ctx.repo, "number": issue_number, "cursor": cursor},
+            )
+            issue = (data.get("repository") or {}).get("issue")
+            if issue is None:
+                raise RuntimeError(f"Issue #{issue_number} não encontrada via GraphQL")
+            if not bundle:
+                bundle = {
+                    "number": issue.get("number", issue_number),
+                    "title": issue.get("title", ""),
+                    "body": issue.get("body", "") or "",
+                    "state": (issue.get("state") or "").lower(),
+                    "labels": [{"name": node["name"]} for node in (issue.get("labels") or {}).get("nodes", [])],
+                }
+            page = issue.get("comments") or {}
+            comments.extend(
+                {"body": node.get("body", "") or "", "created_at": node.get("createdAt", "")}
+                for node in page.get("nodes", [])
+            )
+            page_info = page.get("pageInfo") or {}
+            if not page_info.get("hasNextPage"):
+                break
+            cursor = page_info.get("endCursor")
+        bundle["comments"] = comments
+        return bundle
+
+    def iter_issue_comments(self, issue_number: int, per_page: int = 100) -> Iterator[Dict[str, Any]]:
         path = f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues/{issue_number}/comments?per_page={per_page}&sort=created&direction=asc"
-        return self._request("GET", path)
+        return self._paginate(path)
+
+    def list_issue_comments(self, issue_number: int, per_page: int = 100) -> List[Dict[str, Any]]:
+        return list(self.iter_issue_comments(issue_number, per_page=per_page))
 
     def post_issue_comment(self, issue_number: int, body: str) -> Dict[str, Any]:
         return self._request(
@@ -98,24 +202,162 @@ class GitHubAPI:
             {"labels": labels},
         )
 
-    def add_labels(self, issue_number: int, labels_to_add: List[str]) -> None:
-        current = set(self.get_labels(issue_number))
-        current.update(labels_to_add)
-        self.set_labels(issue_number, sorted(current))
+    def add_labels(self, issue_number: int, labels_to_add: List[str]) -> List[str]:
+        if not labels_to_add:
+            return []
+        data = self._request(
+            "POST",
+            f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues/{issue_number}/labels",
+            {"labels": sorted(set(labels_to_add))},
+        )
+        return [label["name"] for label in data]
+
+    def remove_label(self, issue_number: int, label: str) -> bool:
+        try:
+            self._request(
+                "DELETE",
+                f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues/{issue_number}/labels/{parse.quote(label, safe='')}",
+            )
+        except error.HTTPError as exc:
+            if exc.code == 404:
+                return False
+            raise
+        return True
 
     def remove_labels(self, issue_number: int, labels_to_remove: List[str]) -> None:
-        current = set(self.get_labels(issue_number))
-        current.difference_update(labels_to_remove)
-        self.set_labels(issue_number, sorted(current))
+        for label in sorted(set(labels_to_remove)):
+            self.remove_label(issue_number, label)
+
+    def label_transaction(self, issue_number: int, current: Optional[Iterable[str]] = None) -> "LabelTransaction":
+        return LabelTransaction(self, issue_number, current=current)
+
+    def iter_recent_issues(
+        self,
+        per_page: int = 100,
+        state: str = "all",
+        sort: str = "updated",
+        since: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        if since is None and state != "all":
+            found, snapshot = self.flight.peek(("issues", "all"))
+            if found:
+                # Subconjunto de uma listagem completa já obtida nesta execução.
+                sort_key = f"{sort}_at" if sort in {"created", "updated"} else "updated_at"
+                subset = [item for item in snapshot if item.get("state") == state]
+                yield from sorted(subset, key=lambda item: item.get(sort_key) or "", reverse=True)
+                return
+        params = {
+            "state": state,
+            "per_page": str(per_page),
+            "sort": sort,
+            "direction": "desc",
+        }
+        if since:
+            params["since"] = since
+        query = parse.urlencode(params)
+        for item in self._paginate(f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues?{query}"):
+            if "pull_request" not in item:
+                yield item
 
     def list_recent_issues(self, per_page: int = 100, state: str = "all") -> List[Dict[str, Any]]:
+        if state != "all":
+            found, _ = self.flight.peek(("issues", "all"))
+            if found:
+                return list(self.iter_recent_issues(per_page=per_page, state=state))
+        issues = self.flight.do(
+            ("issues", state),
+            lambda: list(self.iter_recent_issues(per_page=per_page, state=state)),
+        )
+        return list(issues)
+
+    def iter_issues_with_label(self, label: str, state: str = "open", per_page: int = 100) -> Iterator[Dict[str, Any]]:
         query = parse.urlencode(
-            {
-                "state": state,
-                "per_page": str(per_page),
-                "sort": "updated",
-                "direction": "desc",
-            }
+            {"labels": label, "state": state, "per_page": str(per_page), "sort": "created", "direction": "asc"}
         )
-        data = self._request("GET", f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues?{query}")
-        return [item for item in data if "pull_request" not in item]
+        for item in self._paginate(f"/repos/{self.ctx.owner}/{self.ctx.repo}/issues?{query}"):
+            if "pull_request" not in item:
+                yield item
+
+    def search_issues(self, query: str, per_page: int = 100) -> Iterator[Dict[str, Any]]:
+        """Issues do repositório que casam com `query` na sintaxe de busca do GitHub (`is:issue` implícito)."""
+        params = parse.urlencode({"q": f"repo:{self.ctx.repository} is:issue {query}".strip(), "per_page": str(per_page)})
+        for page in iter_link_pages(
+            self.transport,
+            f"{self.api_url}/search/issues?{params}",
+            headers=self._headers(),
+            retry_budget=self.retry_budget,
+        ):
+            yield from page.get("items", [])
+
+
+def labels_from_issue(issue: Dict[str, Any]) -> List[str]:
+    return [label["name"] if isinstance(label, dict) else str(label) for label in issue.get("labels", []) or []]
+
+
+def record_issue_writes(issue: Dict[str, Any], comments: Iterable[str], labels: Optional[Iterable[str]] = None) -> None:
+    """Reflete no dict da issue os comentários e labels recém-publicados, sem nova leitura da API."""
+    issue.setdefault("comments", []).extend({"body": body} for body in comments)
+    if labels is not None:
+        issue["labels"] = [{"name": name} for name in sorted(labels)]
+
+
+class LabelTransaction:
+    """Acumula inclusões/remoções de labels e aplica a mutação mínima.
+
+    Com o conjunto atual conhecido (ex.: labels do payload da issue), no-ops são
+    descartados e, havendo inclusões e remoções, um único PUT substitui o
+    conjunto. Sem ele, usa o POST aditivo e DELETEs por label, que não
+    sobrescrevem labels aplicados por execuções concorrentes.
+    """
+
+    def __init__(self, api: GitHubAPI, issue_number: int, current: Optional[Iterable[str]] = None) -> None:
+        self.api = api
+        self.issue_number = issue_number
+        self.current: Optional[Set[str]] = set(current) if current is not None else None
+        self._pending: Dict[str, bool] = {}
+        self._legacy_requests = 0
+        self.requests_sent = 0
+        self.requests_saved = 0
+
+    def add(self, *labels: str) -> "LabelTransaction":
+        for label in labels:
+            self._pending[label] = True
+        self._legacy_requests += 2 if labels else 0
+        return self
+
+    def remove(self, *labels: str) -> "LabelTransaction":
+        for label in labels:
+            self._pending[label] = False
+        self._legacy_requests += 2 if labels else 0
+        return self
+
+    def commit(self) -> int:
+        to_add = sorted(label for label, keep in self._pending.items() if keep)
+        to_remove = sorted(label for label, keep in self._pending.items() if not keep)
+        if self.current is not None:
+            to_add = [label for label in to_add if label not in self.current]
+            to_remove = [label for label in to_remove if label in self.current]
+
+        sent = 0
+        if self.current is not None and to_add and to_remove:
+            final = (self.current | set(to_add)) - set(to_remove)
+            self.api.set_labels(self.issue_number, sorted(final))
+            self.current = final
+            sent = 1
+        else:
+            if to_add:
+                names = self.api.add_labels(self.issue_number, to_add)
+                if self.current is not None:
+                    self.current = set(names) or self.current | set(to_add)
+                sent += 1
+            for label in to_remove:
+                self.api.remove_label(self.issue_number, label)
+                if self.current is not None:
+                    self.current.discard(label)
+                sent += 1
+
+        self.requests_sent += sent
+        self.requests_saved += max(self._legacy_requests - sent, 0)
+        self._pending.clear()
+        self._legacy_requests = 0
+        return self.requests_saved
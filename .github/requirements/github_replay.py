@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import atexit
+import base64
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import error, parse
+
+from http_transport import HttpResponse, HttpTransport
+from rate_limit import RetryBudget
+
+GITHUB_API_ORIGIN = "https://api.github.com"
+_RECORDED_HEADERS = {
+    "content-type": "Content-Type",
+    "etag": "ETag",
+    "last-modified": "Last-Modified",
+    "link": "Link",
+    "x-ratelimit-remaining": "X-RateLimit-Remaining",
+    "x-ratelimit-reset": "X-RateLimit-Reset",
+}
+
+
+def _normalize_path(target: str) -> str:
+    parts = parse.urlsplit(target)
+    query = parse.urlencode(sorted(parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.path}?{query}" if query else parts.path
+
+
+def _body_digest(body: Optional[bytes]) -> str:
+    return hashlib.sha1(body).hexdigest()[:12] if body else ""
+
+
+def load_cassette(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh).get("interactions", [])
+
+
+def save_cassette(path: str, interactions: List[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"version": 1, "interactions": interactions}, fh, ensure_ascii=False, indent=2)
+
+
+def make_interaction(
+    method: str,
+    path: str,
+    status: int,
+    body: Any,
+    headers: Optional[Dict[str, str]] = None,
+    request_body: Optional[bytes] = None,
+) -> Dict[str, Any]:
+    raw = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    return {
+        "method": method.upper(),
+        "path": _normalize_path(path),
+        "request_digest": _body_digest(request_body),
+        "status": status,
+        "headers": {"Content-Type": "application/json; charset=utf-8", **(headers or {})},
+        "body": base64.b64encode(raw).decode("ascii"),
+    }
+
+
+class RecordingTransport(HttpTransport):
+    """Transporte que grava cada interação num cassette JSON ao final do processo.
+
+    O cabeçalho `Authorization` nunca é gravado; apenas método, caminho, digest
+    do corpo enviado e a resposta (status, cabeçalhos relevantes e corpo).
+    """
+
+    def __init__(self, cassette_path: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cassette_path = cassette_path
+        self.interactions: List[Dict[str, Any]] = []
+        self._record_lock = threading.Lock()
+        atexit.register(self.save)
+
+    def _record(self, method: str, url: str, body: Optional[bytes], status: int, headers: Any, payload: bytes) -> None:
+        kept = {_RECORDED_HEADERS[name.lower()]: value for name, value in headers.items() if name.lower() in _RECORDED_HEADERS}
+        target = parse.urlsplit(url)
+        if "Link" in kept:
+            kept["Link"] = kept["Link"].replace(f"{target.scheme}://{target.netloc}", GITHUB_API_ORIGIN)
+        path = target.path + (f"?{target.query}" if target.query else "")
+        with self._record_lock:
+            self.interactions.append(make_interaction(method, path, status, payload, kept, body))
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ) -> HttpResponse:
+        try:
+            response = super().request(method, url, headers=headers, body=body, retry_budget=retry_budget)
+        except error.HTTPError as exc:
+            payload = exc.read()
+            self._record(method, url, body, exc.code, exc.headers, payload)
+            raise error.HTTPError(exc.url, exc.code, exc.reason, exc.headers, io.BytesIO(payload))
+        self._record(method, url, body, response.status, response.headers, response.body)
+        return response
+
+    def save(self) -> None:
+        with self._record_lock:
+            if self.interactions:
+                save_cassette(self.cassette_path, self.interactions)
+
+
+class ReplayServer:
+    """Substituto local da API do GitHub que serve interações de um cassette.
+
+    Interações com a mesma chave são servidas em ordem (a última se repete).
+    Escritas sem gravação correspondente recebem uma resposta sintética de
+    sucesso, para que as skills completem o fluxo. `latency_ms`/`jitter_ms`
+    simulam o RTT real; contadores de requisições e bytes ficam em `stats`.
+    """
+
+    def __init__(
+        self,
+        interactions: List[Dict[str, Any]],
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._lock = threading.Lock()
+        self._queues: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._loose: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for item in interactions:
+            self._queues.setdefault((item["method"], item["path"], item.get("request_digest", "")), []).append(item)
+            self._loose.setdefault((item["method"], item["path"]), []).append(item)
+        self.stats: Dict[str, int] = {"requests": 0, "bytes_in": 0, "bytes_out": 0, "unmatched": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _next(self, method: str, path: str, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            queue = self._queues.get((method, path, digest)) or self._loose.get((method, path))
+            if not queue:
+                return None
+            return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _serve(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                path = _normalize_path(self.path)
+                item = server._next(self.command, path, _body_digest(body))
+                if item is None:
+                    status, headers, payload = server._synthetic(self.command, body)
+                else:
+                    status = item["status"]
+                    headers = dict(item.get("headers") or {})
+                    payload = base64.b64decode(item.get("body", ""))
+                if "Link" in headers:
+                    headers["Link"] = headers["Link"].replace(GITHUB_API_ORIGIN, server.base_url)
+                delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+                with server._lock:
+                    server.stats["requests"] += 1
+                    server.stats["bytes_in"] += len(body) + len(self.requestline) + len(str(self.headers))
+                    server.stats["bytes_out"] += len(payload)
+                    if item is None:
+                        server.stats["unmatched"] += 1
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+            def log_message(self, *args: Any) -> None:
+                return
+
+        return Handler
+
+    def _synthetic(self, method: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if method == "GET":
+            return 404, headers, b'{"message": "Not Found"}'
+        try:
+            echo = json.loads(body.decode("utf-8")) if body else {}
+        except ValueError:
+            echo = {}
+        if isinstance(echo, dict) and "labels" in echo:
+            return 200, headers, json.dumps([{"name": name} for name in echo["labels"]]).encode("utf-8")
+        status = 201 if method == "POST" else 200
+        return status, headers, json.dumps(echo if isinstance(echo, dict) else {}).encode("utf-8")
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def synthetic_cassette(repository: str, issue_number: int, total_issues: int = 250, per_page: int = 100) -> List[Dict[str, Any]]:
+    """Gera um cassette determinístico para benchmarks sem gravação real."""
+    owner, name = repository.split("/", maxsplit=1)
+    base = f"/repos/{owner}/{name}"
+    issue = {
+        "number": issue_number,
+        "state": "open",
+        "title": "Transferência PIX entre contas com validação de saldo",
+        "body": "Como usuário quero transferir via pix entre conta corrente e poupança, debitar o saldo e consolidar o relatório.",
+        "labels": [{"name": "gate/1-aprovado"}],
+        "created_at": "2026-10-01T00:00:00Z",
+        "updated_at": "2026-10-01T00:00:00Z",
+    }
+    bar = "\n".join(
+        [
+            f"## BAR-{issue_number}: Análise Negocial",
+            f"**Issue:** #{issue_number} | **Classificação:** T1 (score: 1.0)",
+            "### Use Cases Identificados",
+            "| UC | Nome Provisório | Prioridade | Dependência |",
+            "|---|---|---|---|",
+            f"| UC-{issue_number}-01 | Transferir via PIX | Must | N/A |",
+            f"| UC-{issue_number}-02 | Consultar saldo | Should | N/A |",
+            "RN-01 RN-02",
+            "confidence_score: 0.80",
+        ]
+    )
+    comments = [{"body": f"## DuplicateReport-{issue_number}\n**Resultado:** LIMPO"}, {"body": bar}]
+
+    corpus = []
+    for idx in range(total_issues):
+        number = idx + 1
+        corpus.append(
+            {
+                "number": number,
+                "state": "open" if idx % 3 else "closed",
+                "title": f"Demanda {number}",
+                "body": f"## UC-{number}-01: Fluxo {number}\nO usuário executa transferencia da conta {number} e consulta saldo.",
+                "labels": [],
+                "created_at": f"2026-{(idx % 9) + 1:02d}-15T00:00:00Z",
+                "updated_at": f"2026-{(idx % 9) + 1:02d}-20T00:00:00Z",
+            }
+        )
+
+    interactions = [
+        make_interaction("GET", f"{base}/issues/{issue_number}", 200, issue),
+        make_interaction("GET", f"{base}/issues/{issue_number}/comments?per_page=100&sort=created&direction=asc", 200, comments),
+        make_interaction(
+            "POST",
+            "/graphql",
+            200,
+            {
+                "data": {
+                    "repository": {
+                        "issue": {
+                            "number": issue_number,
+                            "title": issue["title"],
+                            "body": issue["body"],
+                            "state": "OPEN",
+                            "labels": {"nodes": [{"name": label["name"]} for label in issue["labels"]]},
+                            "comments": {
+                                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                                "nodes": [{"body": c["body"], "createdAt": "2026-10-01T00:00:00Z"} for c in comments],
+                            },
+                        }
+                    }
+                }
+            },
+        ),
+    ]
+    newest = max(item["updated_at"] for item in corpus) if corpus else "2026-01-01T00:00:00Z"
+    changed = [item for item in corpus if item["updated_at"] >= newest]
+    since_params = {"state": "all", "per_page": str(per_page), "sort": "updated", "direction": "desc", "since": newest}
+    interactions.append(make_interaction("GET", f"{base}/issues?{parse.urlencode(since_params)}", 200, changed[:per_page]))
+
+    for state, sort in (("all", "updated"), ("open", "created"), ("open", "updated")):
+        selected = [item for item in corpus if state == "all" or item["state"] == state]
+        selected.sort(key=lambda item: item[f"{sort}_at"], reverse=True)
+        pages = [selected[i : i + per_page] for i in range(0, len(selected), per_page)] or [[]]
+        for page_idx, page in enumerate(pages, start=1):
+            params = {"state": state, "per_page": str(per_page), "sort": sort, "direction": "desc"}
+            if page_idx > 1:
+                params["page"] = str(page_idx)
+            headers = {}
+            if page_idx < len(pages):
+                next_query = parse.urlencode({**params, "page": str(page_idx + 1)})
+                headers["Link"] = f'<{GITHUB_API_ORIGIN}{base}/issues?{next_query}>; rel="next"'
+            interactions.append(
+                make_interaction("GET", f"{base}/issues?{parse.urlencode(params)}", 200, page, headers)
+            )
+    return interactions
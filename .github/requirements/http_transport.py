@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import gzip
+import http.client
+import io
+import json
+import os
+import select
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib import error, parse
+
+from rate_limit import RequestScheduler, RetryBudget, default_scheduler, is_idempotent
+from response_cache import ResponseCache, default_response_cache
+
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+def _is_stale(conn: http.client.HTTPConnection) -> bool:
+    """Conexão ociosa que o servidor já fechou (socket legível sem requisição pendente)."""
+    sock = conn.sock
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    reason: str
+    headers: http.client.HTTPMessage
+    body: bytes
+
+    def header(self, name: str, default: str = "") -> str:
+        return self.headers.get(name, default) or default
+
+    def json(self) -> Any:
+        text = self.body.decode("utf-8")
+        return json.loads(text) if text else {}
+
+
+def _decode_body(raw: bytes, encoding: str) -> bytes:
+    encoding = encoding.strip().lower()
+    if encoding == "gzip":
+        return gzip.decompress(raw)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(raw)
+        except zlib.error:
+            return zlib.decompress(raw, -zlib.MAX_WBITS)
+    return raw
+
+
+class HttpTransport:
+    """Transporte HTTP/1.1 com conexões keep-alive reaproveitadas por host.
+
+    Substitui `urllib.request.urlopen` (uma conexão TCP+TLS por chamada) por um
+    pool de `http.client` limitado a `pool_size` conexões simultâneas por host.
+    Respostas `gzip`/`deflate` são descomprimidas de forma transparente e status
+    >= 400 levantam `urllib.error.HTTPError`, preservando o contrato anterior.
+    Com `cache`, GETs viram requisições condicionais e respostas 304 são servidas
+    do disco; com `scheduler`, o envio é espaçado pela cota e erros transitórios
+    são repetidos dentro do `RetryBudget` informado pelo chamador (sem ele, cada
+    chamada recebe um orçamento novo).
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ) -> None:
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._slots: Dict[Tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    def _slot(self, key: Tuple[str, str, int]) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.pool_size)
+                self._slots[key] = slot
+            return slot
+
+    def _checkout(self, key: Tuple[str, str, int], fresh: bool = False) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle and not fresh:
+                conn = idle.pop()
+                if not _is_stale(conn):
+                    return conn, True
+                conn.close()
+            self.connections_opened += 1
+        scheme, host, port = key
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return conn_cls(host, port, timeout=self.timeout), False
+
+    def _checkin(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(
+        self,
+        key: Tuple[str, str, int],
+        method: str,
+        target: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+    ) -> Tuple[http.client.HTTPResponse, bytes]:
+        with self._slot(key):
+            conn, reused = self._checkout(key)
+            try:
+                try:
+                    conn.request(method, target, body=body, headers=headers)
+                    resp = conn.getresponse()
+                except _STALE_CONNECTION_ERRORS:
+                    # Conexão ociosa fechada pelo servidor: reabre uma única vez. POST/PATCH
+                    # não são repetidos, pois o servidor pode ter processado o primeiro envio
+                    # (comentário ou label duplicado).
+                    conn.close()
+                    if not reused or not is_idempotent(method):
+                        raise
+                    conn, reused = self._checkout(key, fresh=True)
+                    conn.request(method, target, body=body, headers=headers)
+                    resp = conn.getresponse()
+                raw = resp.read()
+            except Exception:
+                conn.close()
+                raise
+            with self._lock:
+                self.requests_sent += 1
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+        return resp, raw
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ) -> HttpResponse:
+        parts = parse.urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+
+        send_headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        send_headers.update(headers or {})
+
+        cache_key = ""
+        cached = None
+        if method == "GET" and self.cache is not None:
+            cache_key = self.cache.key_for(url, send_headers.get("Authorization", ""))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                send_headers.update(cached.validators())
+
+        if self.scheduler is not None and retry_budget is None:
+            retry_budget = self.scheduler.new_budget()
+        attempt = 0
+        while True:
+            if self.scheduler is not None:
+                self.scheduler.acquire()
+            resp, raw = self._send(key, method, target, body, send_headers)
+            if self.scheduler is None:
+                break
+            self.scheduler.observe(resp.headers)
+            if resp.status < 400:
+                break
+            delay = self.scheduler.retry_delay(
+                method,
+                resp.status,
+                resp.headers,
+                _decode_body(raw, resp.headers.get("Content-Encoding", "")),
+                attempt,
+                retry_budget,
+            )
+            if delay is None:
+                break
+            self.scheduler.backoff(delay)
+            attempt += 1
+
+        if cached is not None and resp.status == 304:
+            self.cache.record_hit(cache_key)
+            return HttpResponse(url=url, status=200, reason="OK", headers=cached.message(), body=cached.body)
+
+        payload = _decode_body(raw, resp.headers.get("Content-Encoding", ""))
+        if resp.status >= 400:
+            raise error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(payload))
+        if cache_key and resp.status == 200:
+            self.cache.record_miss()
+            self.cache.store(
+                cache_key,
+                etag=resp.headers.get("ETag", ""),
+                last_modified=resp.headers.get("Last-Modified", ""),
+                headers=list(resp.headers.items()),
+                body=payload,
+            )
+        return HttpResponse(url=url, status=resp.status, reason=resp.reason, headers=resp.headers, body=payload)
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for idle in pools:
+            for conn in idle:
+                conn.close()
+
+
+def next_link(response: HttpResponse) -> str:
+    for part in response.header("Link").split(","):
+        segments = [segment.strip() for segment in part.split(";")]
+        if len(segments) < 2 or not segments[0].startswith("<"):
+            continue
+        if any(segment.replace(" ", "") in {'rel="next"', "rel=next"} for segment in segments[1:]):
+            return segments[0][1:-1]
+    return ""
+
+
+def iter_link_pages(
+    transport: HttpTransport,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    retry_budget: Optional[RetryBudget] = None,
+) -> Iterator[List[Any]]:
+    """Percorre a paginação `Link: rel="next"` buscando cada página sob demanda."""
+    while url:
+        response = transport.request("GET", url, headers=headers, retry_budget=retry_budget)
+        yield response.json() or []
+        url = next_link(response)
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            pool_size = int(os.getenv("GITHUB_HTTP_POOL_SIZE", "4") or "4")
+            options: Dict[str, Any] = {
+                "pool_size": pool_size,
+                "cache": default_response_cache(),
+                "scheduler": default_scheduler(),
+            }
+            cassette = os.getenv("GITHUB_RECORD_CASSETTE", "")
+            if cassette:
+                from github_replay import RecordingTransport
+
+                _default_transport = RecordingTransport(cassette, **options)
+            else:
+                _default_transport = HttpTransport(**options)
+        return _default_transport
+
+
+def reset_default_transport() -> None:
+    global _default_transport
+    with _default_lock:
+        transport, _default_transport = _default_transport, None
+    if transport is not None:
+        transport.close()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordAutomaton:
+    """Automato Aho-Corasick para buscar várias palavras-chave em uma única passada.
+
+    As palavras são compiladas uma vez em uma trie com links de falha; a busca
+    percorre o texto caractere a caractere, então o custo é O(texto + ocorrências)
+    independentemente de quantas palavras existam. Sem `word_boundary` o
+    comportamento é o mesmo de `keyword in text`; com ele, a ocorrência precisa
+    estar delimitada por caracteres que não sejam letra, dígito ou `_`.
+    """
+
+    def __init__(self, keywords: Iterable[str] = ()) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._compiled = False
+        for keyword in keywords:
+            self.add(keyword)
+
+    def add(self, keyword: str) -> None:
+        if not keyword:
+            raise ValueError("Palavra-chave vazia não pode ser adicionada ao automato")
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        if keyword not in self._output[state]:
+            self._output[state].append(keyword)
+        self._compiled = False
+
+    def compile(self) -> "KeywordAutomaton":
+        goto, fail, output = self._goto, self._fail, self._output
+        queue = deque(goto[0].values())
+        for state in queue:
+            fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                fail[nxt] = goto[link].get(char, 0)
+                output[nxt] = output[nxt] + [keyword for keyword in output[fail[nxt]] if keyword not in output[nxt]]
+        self._compiled = True
+        return self
+
+    def iter_matches(self, text: str, word_boundary: bool = False) -> Iterator[Tuple[int, str]]:
+        """Gera (posição inicial, palavra) para cada ocorrência em `text`."""
+        if not self._compiled:
+            self.compile()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        length = len(text)
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                start = pos - len(keyword) + 1
+                if word_boundary and (
+                    (start > 0 and _is_word_char(text[start - 1])) or (pos + 1 < length and _is_word_char(text[pos + 1]))
+                ):
+                    continue
+                yield start, keyword
+
+    def find_all(self, text: str, word_boundary: bool = False) -> Set[str]:
+        return {keyword for _, keyword in self.iter_matches(text, word_boundary=word_boundary)}
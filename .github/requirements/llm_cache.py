@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+from disk_lru import DiskLru
+
+
+class LlmCache:
+    """Cache em disco de respostas do LLM, endereçado pelo conteúdo da requisição.
+
+    A chave é o sha256 de (modelo, URL base, mensagem de sistema, prompt,
+    temperatura), então qualquer mudança no prompt gera outra entrada. Entradas
+    expiram após `ttl_seconds`; tamanho e despejo ficam com o `DiskLru`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600) -> None:
+        self.lru = DiskLru(directory, max_bytes)
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(model: str, base_url: str, system_message: str, prompt: str, temperature: float) -> str:
+        material = json.dumps([model, base_url, system_message, prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        raw = self.lru.read(key)
+        if raw is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - float(raw.get("created_at", 0)) > self.ttl_seconds:
+            self.lru.discard(key)
+            with self._lock:
+                self.expired += 1
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        self.lru.touch(key)
+        return raw.get("content", "")
+
+    def put(self, key: str, content: str, model: str = "") -> None:
+        self.lru.write(key, json.dumps({"created_at": time.time(), "model": model, "content": content}, ensure_ascii=False))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = {"hits": self.hits, "misses": self.misses, "expired": self.expired}
+        return {**counters, **self.lru.stats()}
+
+
+def llm_cache_bypassed() -> bool:
+    return os.getenv("AI_CACHE_BYPASS", "0").strip().lower() in {"1", "true", "on", "yes"}
+
+
+def default_llm_cache() -> Optional[LlmCache]:
+    if os.getenv("AI_CACHE", "1").strip().lower() in {"0", "false", "off", "no"}:
+        return None
+    directory = os.getenv("AI_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "deep-ion-llm-cache")
+    max_mb = int(os.getenv("AI_CACHE_MAX_MB", "64") or "64")
+    ttl_hours = float(os.getenv("AI_CACHE_TTL_HOURS", "168") or "168")
+    try:
+        return LlmCache(directory, max_bytes=max_mb * 1024 * 1024, ttl_seconds=ttl_hours * 3600)
+    except OSError:
+        return None
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class LlmPolicy:
+    """Limites de latência de uma chamada ao LLM (todos em segundos).
+
+    `deadline` é o teto da chamada inteira, retentativas incluídas; `read_timeout`
+    (intervalo máximo sem bytes no stream) fica bem abaixo dele para que um
+    provedor travado ainda deixe tempo para uma nova tentativa ou um hedge.
+    """
+
+    connect_timeout: float = 10.0
+    read_timeout: float = 20.0
+    deadline: float = 60.0
+    max_retries: int = 2
+    base_backoff: float = 1.0
+    max_retry_after: float = 30.0
+    hedge: bool = False
+    hedge_min_delay: float = 2.0
+    hedge_default_delay: float = 20.0
+    max_concurrency: int = 4
+
+    @classmethod
+    def from_env(cls) -> "LlmPolicy":
+        def number(name: str, default: float) -> float:
+            raw = os.getenv(name, "").strip()
+            return float(raw) if raw else default
+
+        return cls(
+            connect_timeout=number("AI_PROVIDER_CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=number("AI_PROVIDER_READ_TIMEOUT", cls.read_timeout),
+            deadline=number("AI_PROVIDER_DEADLINE", cls.deadline),
+            max_retries=int(number("AI_PROVIDER_MAX_RETRIES", cls.max_retries)),
+            hedge=os.getenv("AI_PROVIDER_HEDGE", "0").strip().lower() in {"1", "true", "on", "yes"},
+            max_concurrency=max(1, int(number("AI_PROVIDER_MAX_CONCURRENCY", cls.max_concurrency))),
+        )
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Interpreta `Retry-After` em segundos ou como data HTTP."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def stall_retry_delay(attempt: int, policy: LlmPolicy) -> Optional[float]:
+    """Espera antes de repetir uma chamada que travou ou perdeu a conexão, ou `None` sem retentativas."""
+    if attempt >= policy.max_retries:
+        return None
+    return random.uniform(0, policy.base_backoff * (2**attempt))
+
+
+def retry_delay(status: int, retry_after: Optional[str], attempt: int, policy: LlmPolicy) -> Optional[float]:
+    """Espera antes da próxima tentativa, ou `None` se o status não é transitório."""
+    if status not in _RETRYABLE_STATUS or attempt >= policy.max_retries:
+        return None
+    hinted = retry_after_seconds(retry_after)
+    if hinted is not None:
+        return hinted if hinted <= policy.max_retry_after else None
+    return random.uniform(0, policy.base_backoff * (2**attempt))
+
+
+class CircuitBreaker:
+    """Após `failure_threshold` falhas seguidas, desvia chamadas para o fallback por `cooldown` segundos.
+
+    Passado o cooldown, uma única chamada de teste é liberada (meio-aberto):
+    sucesso fecha o circuito, falha o reabre.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "fechado"
+            if self._clock() - self.opened_at >= self.cooldown:
+                return "meio-aberto"
+            return "aberto"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._clock() - self.opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+            self._probing = False
+
+
+class LatencyTracker:
+    """Janela das latências recentes de chamadas bem-sucedidas, persistida em JSON.
+
+    O arquivo fica ao lado do cache do LLM para que o p95 sobreviva entre
+    execuções do Actions; sem amostras suficientes, o atraso de hedge usa o
+    default da política.
+    """
+
+    def __init__(self, path: Optional[str], window: int = 50, min_samples: int = 5) -> None:
+        self.path = path
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self.samples: List[float] = []
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    self.samples = [float(value) for value in json.load(fh).get("latencies", [])][-window:]
+            except (OSError, ValueError, AttributeError):
+                self.samples = []
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples = (self.samples + [seconds])[-self.window :]
+            payload = json.dumps({"latencies": self.samples})
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def hedge_delay(self, policy: LlmPolicy) -> float:
+        p95 = self.percentile(0.95)
+        return max(policy.hedge_min_delay, p95 if p95 is not None else policy.hedge_default_delay)
+
+
+@dataclass
+class LlmOutcome:
+    """Resultado de uma chamada: distingue resposta real, cache, timeout e cada motivo de fallback."""
+
+    outcome: str
+    model: str = ""
+    attempts: int = 0
+    hedged: bool = False
+    status: Optional[int] = None
+    latency_ms: float = 0.0
+    detail: str = ""
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def used_fallback(self) -> bool:
+        return self.outcome not in {"ok", "cache_hit"}
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class OutcomeLog:
+    def __init__(self, limit: int = 200) -> None:
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.entries: List[LlmOutcome] = []
+        self.counts: Dict[str, int] = {}
+
+    def record(self, outcome: LlmOutcome) -> LlmOutcome:
+        with self._lock:
+            self.entries = (self.entries + [outcome])[-self.limit :]
+            self.counts[outcome.outcome] = self.counts.get(outcome.outcome, 0) + 1
+        return outcome
+
+    def last(self) -> Optional[LlmOutcome]:
+        with self._lock:
+            return self.entries[-1] if self.entries else None
+
+
+def default_latency_path() -> str:
+    directory = os.getenv("AI_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "deep-ion-llm-cache")
+    # Subdiretório próprio: o LlmCache trata todo `*.json` da raiz como entrada despejável.
+    return os.getenv("AI_PROVIDER_LATENCY_PATH") or os.path.join(directory, "meta", "latency.json")
+
+
+def default_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv("AI_PROVIDER_BREAKER_FAILURES", "3") or "3"),
+        cooldown=float(os.getenv("AI_PROVIDER_BREAKER_COOLDOWN", "60") or "60"),
+    )
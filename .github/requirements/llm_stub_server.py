@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from skill_req_01 import _build_fallback_bar
+from skill_req_02 import _build_fallback_uc, _build_fallback_uc_block, _parse_rns_from_bar
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+MALFORMED_KINDS = ("preamble", "broken_json", "truncated")
+
+
+@dataclass
+class StubConfig:
+    """Comportamento do provedor simulado. Latências em ms; taxas entre 0 e 1."""
+
+    latency_ms: float = 0.0
+    latency_dist: str = "fixed"
+    latency_spread: float = 0.5
+    error_rate: float = 0.0
+    error_status: int = 503
+    retry_after: Optional[float] = 1.0
+    malformed_rate: float = 0.0
+    malformed_kinds: Tuple[str, ...] = MALFORMED_KINDS
+    chunk_chars: int = 24
+    chunk_delay_ms: float = 0.0
+    seed: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribuição de latência desconhecida: {self.latency_dist}")
+        unknown = set(self.malformed_kinds) - set(MALFORMED_KINDS)
+        if unknown:
+            raise ValueError(f"Tipos de saída malformada desconhecidos: {', '.join(sorted(unknown))}")
+
+
+def _field(prompt: str, name: str) -> Optional[str]:
+    match = re.search(rf"^{name}: (.+)$", prompt, flags=re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+
+def _between(prompt: str, start: str, end: str) -> str:
+    if start not in prompt:
+        return ""
+    tail = prompt.split(start, maxsplit=1)[1]
+    return tail.split(end, maxsplit=1)[0].strip() if end in tail else tail.strip()
+
+
+def templated_response(prompt: str) -> str:
+    """Saída no schema canônico para o prompt recebido, gerada pelos mesmos builders do fallback das skills.
+
+    Prompts do REQ-02 por UC (`uc_id:`) recebem um único UC; os do REQ-02
+    monolítico recebem todos os UCs do BAR com a matriz; o restante é tratado
+    como REQ-01 e recebe um BAR.
+    """
+    issue_number = int(_field(prompt, "issue_number") or 0)
+    if "## BAR aprovado" in prompt:
+        bar = _between(prompt, "## BAR aprovado", "\n\nissue_number:")
+        classification = _field(prompt, "classification") or "T1"
+        uc_id = _field(prompt, "uc_id")
+        if uc_id:
+            block, _ = _build_fallback_uc_block(
+                issue_number, classification, uc_id, _field(prompt, "uc_name") or "Fluxo principal", _parse_rns_from_bar(bar)
+            )
+            return "\n".join(block)
+        return _build_fallback_uc(issue_number, classification, bar)
+    title = _field(prompt, "issue_title") or ""
+    body = _between(prompt, "issue_body:\n", "\n\n## DuplicateReport")
+    report = _between(prompt, "## DuplicateReport\n\n", "\0")
+    return _build_fallback_bar(issue_number, title, body, "" if report == "N/A" else report)
+
+
+class LlmStubServer:
+    """Substituto local de `/v1/chat/completions` para testes de carga sem gastar tokens.
+
+    Aponte `AI_PROVIDER_URL` para `completions_url`. Respostas vêm de
+    `responses` (lista de `{"match": regex, "content": template}`, com
+    `$issue_number`, `$uc_id` e `$uc_name` substituídos) ou, sem match, de
+    `templated_response`. Latência, erros HTTP e saídas malformadas seguem
+    `StubConfig`; requisições com `"stream": true` recebem SSE em pedaços.
+    """
+
+    def __init__(
+        self,
+        config: Optional[StubConfig] = None,
+        responses: Optional[List[Dict[str, str]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.config = config or StubConfig()
+        self.responses = [(re.compile(item["match"]), Template(item["content"])) for item in responses or []]
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "ok": 0,
+            "streamed": 0,
+            "errors": 0,
+            "malformed": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def completions_url(self) -> str:
+        return f"{self.base_url}/v1/chat/completions"
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def sample_latency(self) -> float:
+        """Latência em segundos segundo a distribuição configurada (mediana ≈ `latency_ms`)."""
+        config = self.config
+        base = config.latency_ms / 1000.0
+        if base <= 0:
+            return 0.0
+        with self._lock:
+            if config.latency_dist == "uniform":
+                return max(self._random.uniform(base * (1 - config.latency_spread), base * (1 + config.latency_spread)), 0.0)
+            if config.latency_dist == "exponential":
+                return self._random.expovariate(1.0 / base)
+            if config.latency_dist == "lognormal":
+                return base * self._random.lognormvariate(0.0, config.latency_spread)
+        return base
+
+    def _roll(self) -> Tuple[bool, Optional[str]]:
+        """Decide se a requisição falha e, se não, qual defeito de saída injetar."""
+        with self._lock:
+            if self._random.random() < self.config.error_rate:
+                return True, None
+            if self.config.malformed_kinds and self._random.random() < self.config.malformed_rate:
+                return False, self._random.choice(self.config.malformed_kinds)
+        return False, None
+
+    def content_for(self, prompt: str) -> str:
+        values = {
+            "issue_number": _field(prompt, "issue_number") or "0",
+            "uc_id": _field(prompt, "uc_id") or "",
+            "uc_name": _field(prompt, "uc_name") or "",
+        }
+        for pattern, template in self.responses:
+            if pattern.search(prompt):
+                return template.safe_substitute(values)
+        return templated_response(prompt)
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _send(self, status: int, payload: bytes, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                server._count(bytes_out=len(payload))
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                server._count(requests=1, bytes_in=len(raw))
+                if not self.path.split("?", maxsplit=1)[0].endswith("/chat/completions"):
+                    self._send(404, b'{"error": {"message": "Not Found"}}')
+                    return
+                try:
+                    request = json.loads(raw.decode("utf-8"))
+                    prompt = next(m["content"] for m in reversed(request["messages"]) if m.get("role") == "user")
+                except (ValueError, KeyError, StopIteration, TypeError):
+                    self._send(400, b'{"error": {"message": "payload inv\\u00e1lido", "type": "invalid_request_error"}}')
+                    return
+
+                failed, defect = server._roll()
+                time.sleep(server.sample_latency())
+                if failed:
+                    server._count(errors=1)
+                    status = server.config.error_status
+                    headers = {}
+                    if status == 429 and server.config.retry_after is not None:
+                        headers["Retry-After"] = f"{server.config.retry_after:g}"
+                    body = {"error": {"message": "falha injetada pelo stub", "type": "server_error", "code": status}}
+                    self._send(status, json.dumps(body).encode("utf-8"), headers=headers)
+                    return
+
+                content = server.content_for(prompt)
+                if defect == "preamble":
+                    content = f"Claro! Segue o artefato solicitado:\n\n{content}"
+                if defect:
+                    server._count(malformed=1)
+                else:
+                    server._count(ok=1)
+                model = request.get("model", "stub")
+                if request.get("stream"):
+                    server._count(streamed=1)
+                    self._stream(content, model, defect)
+                    return
+                if defect == "broken_json":
+                    self._send(200, b'{"choices": [{"message": {"content": ')
+                    return
+                if defect == "truncated":
+                    content = content[: len(content) // 2]
+                body = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                }
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+            def _stream(self, content: str, model: str, defect: Optional[str]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                size = max(1, server.config.chunk_chars)
+                chunks = [content[i : i + size] for i in range(0, len(content), size)]
+                if defect == "truncated":
+                    chunks = chunks[: max(1, len(chunks) // 2)]
+                try:
+                    for index, chunk in enumerate(chunks):
+                        event = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "model": model,
+                                 "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                        line = f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                        if defect == "broken_json" and index == len(chunks) // 2:
+                            line = "data: {\"choices\": [\n\n"
+                        payload = line.encode("utf-8")
+                        self.wfile.write(payload)
+                        self.wfile.flush()
+                        server._count(bytes_out=len(payload))
+                        if server.config.chunk_delay_ms > 0:
+                            time.sleep(server.config.chunk_delay_ms / 1000.0)
+                    if defect != "truncated":
+                        self.wfile.write(b"data: [DONE]\n\n")
+                        server._count(bytes_out=14)
+                except OSError:
+                    # O cliente abortou o stream (validação antecipada ou prazo); não é erro do stub.
+                    return
+
+            def log_message(self, *args: Any) -> None:
+                return
+
+        return Handler
+
+    def start(self) -> "LlmStubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        malformed_rate=args.malformed_rate,
+        malformed_kinds=tuple(item.strip() for item in args.malformed_kinds.split(",") if item.strip()),
+        chunk_chars=args.chunk_chars,
+        chunk_delay_ms=args.chunk_delay_ms,
+        seed=args.seed,
+    )
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência mediana até o primeiro byte")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="Amplitude relativa (uniform) ou sigma (lognormal)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After enviado com 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-kinds", default=",".join(MALFORMED_KINDS))
+    parser.add_argument("--chunk-chars", type=int, default=24)
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--responses", help='JSON com [{"match": regex, "content": template}] (default: saídas geradas)')
+
+
+def load_responses(path: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Provedor OpenAI-compatível local com latência e falhas injetáveis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = LlmStubServer(config_from_args(args), load_responses(args.responses), host=args.host, port=args.port).start()
+    print(f"export AI_PROVIDER_URL={server.completions_url} AI_PROVIDER_API_KEY=stub", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.snapshot()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+from array import array
+from typing import Dict, Iterable, List, Set, Tuple
+
+_MAX_HASH = (1 << 64) - 1
+
+
+def _token_hash(token: str, seed: int) -> int:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8, key=seed.to_bytes(8, "little")).digest()
+    return int.from_bytes(digest, "little")
+
+
+def bands_for_threshold(jaccard_threshold: float, num_perm: int) -> int:
+    """Escolhe o número de bandas cujo limiar LSH ~(1/b)^(1/r) fica logo abaixo do alvo.
+
+    Limiar abaixo do alvo favorece recall; a precisão é recuperada no re-rank
+    por cosseno.
+    """
+    best_bands, best_gap = 1, float("inf")
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        lsh_threshold = (1.0 / bands) ** (1.0 / rows)
+        gap = jaccard_threshold - lsh_threshold
+        if 0 <= gap < best_gap:
+            best_bands, best_gap = bands, gap
+    return best_bands
+
+
+def jaccard_for_cosine(cosine_threshold: float) -> float:
+    """Jaccard equivalente a um limiar de cosseno para conjuntos binários de mesmo tamanho (c / (2 - c)).
+
+    Só vale nesse caso. O re-rank usa cosseno com pesos TF, e pares acima do
+    limiar por compartilharem poucos termos frequentes têm Jaccard bem menor,
+    então as bandas escolhidas a partir daqui não garantem recall (ver o
+    recall sobre todos os pares em `bench_similarity.py`).
+    """
+    cosine_threshold = min(max(cosine_threshold, 0.0), 1.0)
+    return cosine_threshold / (2.0 - cosine_threshold)
+
+
+class MinHashLSH:
+    """Assinaturas MinHash com bandas LSH para geração de candidatos sublinear.
+
+    Usa one-permutation hashing com densificação: cada token é hasheado uma única
+    vez e distribuído em `num_perm` compartimentos, então o custo da assinatura é
+    O(tokens) em vez de O(tokens × permutações). Documentos que colidem em pelo
+    menos uma banda de `rows` compartimentos viram candidatos; mais bandas (menos
+    linhas por banda) aumentam o recall em troca de mais candidatos.
+
+    As assinaturas estimam Jaccard sobre conjuntos de termos, não o cosseno TF
+    usado no re-rank: é um gerador de candidatos aproximado e de recall baixo
+    para pares que se parecem pelo peso de poucos termos.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 0x5EED) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self.size = 0
+
+    def signature(self, tokens: Iterable[str]) -> array:
+        bins = [_MAX_HASH] * self.num_perm
+        num_perm = self.num_perm
+        for token in set(tokens):
+            value = _token_hash(token, self.seed)
+            slot = value % num_perm
+            rank = value // num_perm
+            if rank < bins[slot]:
+                bins[slot] = rank
+        if all(value == _MAX_HASH for value in bins):
+            return array("Q", bins)
+        # Densificação: compartimentos vazios herdam o próximo compartimento preenchido.
+        original = list(bins)
+        for idx in range(num_perm):
+            if original[idx] != _MAX_HASH:
+                continue
+            offset = 1
+            while original[(idx + offset) % num_perm] == _MAX_HASH:
+                offset += 1
+            bins[idx] = original[(idx + offset) % num_perm] ^ offset
+        return array("Q", bins)
+
+    def _band_keys(self, signature: array) -> List[Tuple[int, ...]]:
+        rows = self.rows
+        return [tuple(signature[band * rows : (band + 1) * rows]) for band in range(self.bands)]
+
+    def add(self, doc_id: int, signature: array) -> None:
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append(doc_id)
+        self.size += 1
+
+    def candidates(self, signature: array) -> Set[int]:
+        found: Set[int] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            found.update(self._buckets[band].get(key, ()))
+        return found
+
+    def query(self, tokens: Iterable[str]) -> Set[int]:
+        return self.candidates(self.signature(tokens))
+
+    @classmethod
+    def build(cls, token_sets: Iterable[Iterable[str]], num_perm: int = 64, bands: int = 16, seed: int = 0x5EED) -> "MinHashLSH":
+        lsh = cls(num_perm=num_perm, bands=bands, seed=seed)
+        for doc_id, tokens in enumerate(token_sets):
+            lsh.add(doc_id, lsh.signature(tokens))
+        return lsh
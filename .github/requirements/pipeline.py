@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+import skill_req_00
+import skill_req_01
+import skill_req_02
+from audit_ledger import DecisionRecord
+from github_api import GitHubAPI, labels_from_issue
+
+STAGES = ("00", "01", "02")
+StageRunner = Callable[[GitHubAPI, Dict[str, Any]], DecisionRecord]
+STAGE_RUNNERS: Dict[str, StageRunner] = {
+    "00": skill_req_00.run,
+    "01": skill_req_01.run,
+    "02": skill_req_02.run,
+}
+# Mesmo gating dos workflows: o REQ-01 só roda com duplicatas verificadas e o
+# REQ-02 só depois do /ba-approve humano (Checkpoint A).
+STAGE_GATES = {
+    "01": "req/duplicatas-verificadas",
+    "02": "req/bar-aprovado",
+}
+
+
+@dataclass
+class StageReport:
+    stage: str
+    status: str
+    decision: str = ""
+    detail: str = ""
+    elapsed_ms: float = 0.0
+
+
+def run_pipeline(
+    gh: GitHubAPI,
+    issue_number: int,
+    stages: Sequence[str] = STAGES,
+    issue: Optional[Dict[str, Any]] = None,
+    runners: Optional[Mapping[str, StageRunner]] = None,
+) -> List[StageReport]:
+    """Executa as skills em sequência no mesmo processo, compartilhando a issue em memória.
+
+    A issue (com comentários) é buscada uma única vez; cada etapa publica seus
+    artefatos no fim e os reflete no dict, de onde a seguinte lê o
+    DuplicateReport/BAR. Uma etapa sem o label de gate, ou que falhe,
+    interrompe as seguintes. `runners` substitui etapas (ex.: REQ-00 com um
+    índice de UCs já aquecido).
+    """
+    issue = issue if issue is not None else gh.fetch_issue_bundle(issue_number)
+    runners = {**STAGE_RUNNERS, **(runners or {})}
+    reports: List[StageReport] = []
+    for stage in stages:
+        if stage not in STAGE_RUNNERS:
+            raise ValueError(f"Etapa desconhecida: {stage}")
+        gate = STAGE_GATES.get(stage)
+        if gate and gate not in labels_from_issue(issue):
+            reports.append(StageReport(stage, "pulada", detail=f"label `{gate}` ausente"))
+            break
+        started = time.perf_counter()
+        try:
+            decision = runners[stage](gh, issue)
+        except Exception as exc:
+            traceback.print_exc(file=sys.stderr)
+            elapsed = (time.perf_counter() - started) * 1000
+            reports.append(StageReport(stage, "erro", detail=f"{exc.__class__.__name__}: {exc}", elapsed_ms=round(elapsed, 1)))
+            break
+        elapsed = (time.perf_counter() - started) * 1000
+        reports.append(
+            StageReport(stage, "ok", decision=decision.decision, detail=decision.justification, elapsed_ms=round(elapsed, 1))
+        )
+    return reports
+
+
+def format_reports_markdown(issue_number: int, reports: List[StageReport]) -> str:
+    lines = [
+        f"### Pipeline DOM-02 — issue #{issue_number}",
+        "| Etapa | Status | Decisão | Tempo (ms) | Detalhe |",
+        "|---|---|---|---|---|",
+    ]
+    for report in reports:
+        lines.append(
+            f"| SKILL-REQ-{report.stage} | {report.status} | {report.decision or '-'} | {report.elapsed_ms} | {report.detail or '-'} |"
+        )
+    return "\n".join(lines)
+
+
+def parse_stages(value: str) -> List[str]:
+    stages = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in stages if item not in STAGE_RUNNERS]
+    if unknown:
+        raise ValueError(f"Etapas desconhecidas: {', '.join(unknown)}")
+    return stages
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="DOM-02 pipeline REQ-00 → REQ-01 → REQ-02 em um único processo")
+    parser.add_argument("--issue", type=int, required=True)
+    parser.add_argument("--stages", default=",".join(STAGES), help="Etapas em ordem (ex.: 00,01)")
+    args = parser.parse_args(argv)
+
+    stages = parse_stages(args.stages)
+    gh = GitHubAPI()
+    reports = run_pipeline(gh, args.issue, stages)
+    print(format_reports_markdown(args.issue, reports))
+    if any(report.status == "erro" for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SYMBOL_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_ROW_RE = re.compile(r"^\s*(\|(?!\s*:?-+:?\s*\|)|[-*+]\s|\d+[.)]\s)")
+_SEPARATOR_RE = re.compile(r"^\s*\|(\s*:?-+:?\s*\|)+\s*$")
+
+DEFAULT_MAX_PROMPT_TOKENS = 16000
+# Piso de cada seção dinâmica no corte pelo limite total, para nenhuma sumir por inteiro.
+MIN_SECTION_TOKENS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens sem tokenizer do provedor.
+
+    Usa o maior entre ~4 caracteres por token e ~1,3 token por palavra mais
+    um por sequência de símbolos: o primeiro domina em texto corrido, o
+    segundo em tabelas markdown e textos com muita acentuação.
+    """
+    if not text:
+        return 0
+    by_chars = len(text) / 4
+    by_words = 1.3 * len(_WORD_RE.findall(text)) + len(_SYMBOL_RE.findall(text))
+    return int(math.ceil(max(by_chars, by_words)))
+
+
+def _cut_to_tokens(text: str, max_tokens: int, from_end: bool = False) -> str:
+    """Maior prefixo (ou sufixo) de `text` dentro de `max_tokens`, cortado em fim de linha quando possível."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    size = min(len(text), max_tokens * 4)
+    while size > 0:
+        piece = text[-size:] if from_end else text[:size]
+        if estimate_tokens(piece) <= max_tokens:
+            break
+        size = int(size * 0.9)
+    if size <= 0:
+        return ""
+    piece = text[-size:] if from_end else text[:size]
+    newline = piece.find("\n") if from_end else piece.rfind("\n")
+    if newline > 0 and (len(piece) - newline if not from_end else newline) < len(piece) // 4:
+        piece = piece[newline + 1 :] if from_end else piece[:newline]
+    return piece
+
+
+def trim_tail(text: str, max_tokens: int) -> str:
+    marker = "\n[… conteúdo truncado …]"
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return _cut_to_tokens(text, max(max_tokens - estimate_tokens(marker), 0)) + marker
+
+
+def trim_middle(text: str, max_tokens: int) -> str:
+    """Resume um texto longo mantendo início, fim e os títulos markdown do trecho omitido."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    reserve = estimate_tokens("\n\n[… 0000000 caracteres omitidos …]\n\n")
+    available = max(max_tokens - reserve, 0)
+    head = _cut_to_tokens(text, available * 2 // 3)
+    tail = _cut_to_tokens(text[len(head) :], available - estimate_tokens(head), from_end=True)
+    middle = text[len(head) : len(text) - len(tail)]
+
+    outline: List[str] = []
+    spare = available - estimate_tokens(head) - estimate_tokens(tail)
+    for line in middle.splitlines():
+        if line.startswith("#"):
+            cost = estimate_tokens(line) + 1
+            if cost > spare:
+                break
+            outline.append(line)
+            spare -= cost
+    marker = f"[… {len(middle)} caracteres omitidos …]"
+    return "\n\n".join(part for part in [head.rstrip("\n"), "\n".join(outline + [marker]), tail.lstrip("\n")] if part)
+
+
+def trim_rows(text: str, max_tokens: int) -> str:
+    """Remove linhas de tabela e itens de lista, do fim para o início, mantendo cabeçalhos e texto corrido.
+
+    Cada bloco contíguo de linhas removíveis preserva a primeira linha e ganha
+    uma nota com a contagem omitida; se ainda assim o texto não couber, cai
+    para `trim_middle`.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lines = text.split("\n")
+    runs: List[List[int]] = []
+    for index, line in enumerate(lines):
+        if _ROW_RE.match(line) and not _SEPARATOR_RE.match(line):
+            if runs and runs[-1][-1] == index - 1:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    excess = estimate_tokens(text) - max_tokens
+    removed = set()
+    notes: Dict[int, str] = {}
+    for run in reversed(runs):
+        if excess <= 0:
+            break
+        count = 0
+        for index in reversed(run[1:]):
+            if excess <= 0:
+                break
+            removed.add(index)
+            excess -= costs[index]
+            count += 1
+        if count:
+            # A nota vem depois da última linha mantida para não quebrar a tabela.
+            is_table = lines[run[0]].lstrip().startswith("|")
+            notes[run[len(run) - count - 1]] = (
+                f"[… {count} linhas da tabela omitidas …]" if is_table else f"[… {count} itens omitidos …]"
+            )
+
+    kept: List[str] = []
+    for index, line in enumerate(lines):
+        if index in removed:
+            continue
+        kept.append(line)
+        if index in notes:
+            kept.append(notes[index])
+    trimmed = "\n".join(kept)
+    return trimmed if estimate_tokens(trimmed) <= max_tokens else trim_middle(trimmed, max_tokens)
+
+
+TRIM_STRATEGIES: Dict[str, Callable[[str, int], str]] = {
+    "tail": trim_tail,
+    "middle": trim_middle,
+    "rows": trim_rows,
+}
+
+
+@dataclass
+class PromptSection:
+    """Trecho do prompt. Seções estáticas nunca são cortadas e sempre abrem o prompt."""
+
+    name: str
+    content: str
+    static: bool = False
+    max_tokens: Optional[int] = None
+    strategy: str = "middle"
+    prefix: str = ""
+
+    def render(self, content: Optional[str] = None) -> str:
+        return f"{self.prefix}{self.content if content is None else content}"
+
+
+@dataclass
+class SectionUsage:
+    name: str
+    static: bool
+    tokens: int
+    original_tokens: int
+
+    @property
+    def trimmed(self) -> bool:
+        return self.tokens < self.original_tokens
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    tokens: int
+    prefix_tokens: int
+    max_tokens: int
+    sections: List[SectionUsage] = field(default_factory=list)
+
+    @property
+    def trimmed(self) -> List[str]:
+        return [usage.name for usage in self.sections if usage.trimmed]
+
+
+class PromptBuilder:
+    """Monta o prompt do usuário com orçamento de tokens por seção e total.
+
+    A ordem de saída é: seções estáticas (template, catálogo RN) na ordem em
+    que foram adicionadas, depois as dinâmicas. Como a mensagem de sistema e
+    esse prefixo não variam entre issues, o cache de prompt do provedor pode
+    reaproveitá-los. Seções dinâmicas primeiro respeitam o próprio
+    `max_tokens`; se o total ainda passar do limite, as dinâmicas com
+    orçamento são reduzidas da última para a primeira, até um piso de
+    `MIN_SECTION_TOKENS`. Todo corte é determinístico, então o mesmo input
+    gera o mesmo prompt (e a mesma chave no `LlmCache`).
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, separator: str = "\n\n") -> None:
+        self.max_tokens = max_tokens if max_tokens is not None else default_max_prompt_tokens()
+        self.separator = separator
+        self.sections: List[PromptSection] = []
+
+    def add_static(self, name: str, *parts: str) -> "PromptBuilder":
+        self.sections.append(PromptSection(name=name, content=self.separator.join(parts), static=True))
+        return self
+
+    def add(
+        self,
+        name: str,
+        content: str,
+        max_tokens: Optional[int] = None,
+        strategy: str = "middle",
+        prefix: str = "",
+    ) -> "PromptBuilder":
+        if strategy not in TRIM_STRATEGIES:
+            raise ValueError(f"Estratégia de corte desconhecida: {strategy}")
+        self.sections.append(PromptSection(name, content, max_tokens=max_tokens, strategy=strategy, prefix=prefix))
+        return self
+
+    def build(self) -> BuiltPrompt:
+        ordered = [section for section in self.sections if section.static] + [
+            section for section in self.sections if not section.static
+        ]
+        contents = [section.content for section in ordered]
+        original = [estimate_tokens(section.render()) for section in ordered]
+
+        for index, section in enumerate(ordered):
+            if section.max_tokens is not None and not section.static:
+                contents[index] = self._trim(section, contents[index], section.max_tokens)
+
+        rendered = [section.render(content) for section, content in zip(ordered, contents)]
+        separator_tokens = estimate_tokens(self.separator) * max(len(rendered) - 1, 0)
+        total = sum(estimate_tokens(text) for text in rendered) + separator_tokens
+        for index in reversed(range(len(ordered))):
+            section = ordered[index]
+            if total <= self.max_tokens:
+                break
+            if section.static or section.max_tokens is None:
+                continue
+            current = estimate_tokens(rendered[index])
+            target = max(current - (total - self.max_tokens), min(current, MIN_SECTION_TOKENS))
+            contents[index] = self._trim(section, contents[index], target)
+            rendered[index] = section.render(contents[index])
+            total += estimate_tokens(rendered[index]) - current
+
+        text = self.separator.join(rendered)
+        static_count = sum(1 for section in ordered if section.static)
+        prefix_tokens = estimate_tokens(self.separator.join(rendered[:static_count]))
+        usages = [
+            SectionUsage(section.name, section.static, estimate_tokens(rendered[index]), original[index])
+            for index, section in enumerate(ordered)
+        ]
+        built = BuiltPrompt(text, estimate_tokens(text), prefix_tokens, self.max_tokens, usages)
+        if built.tokens > self.max_tokens:
+            print(f"Prompt: ~{built.tokens} tokens acima do limite de {self.max_tokens} após os cortes", file=sys.stderr)
+        for usage in usages:
+            if usage.trimmed:
+                print(
+                    f"Prompt: seção {usage.name} reduzida de ~{usage.original_tokens} para ~{usage.tokens} tokens",
+                    file=sys.stderr,
+                )
+        return built
+
+    @staticmethod
+    def _trim(section: PromptSection, content: str, max_tokens: int) -> str:
+        budget = max(max_tokens - estimate_tokens(section.prefix), 0)
+        return TRIM_STRATEGIES[section.strategy](content, budget)
+
+
+def default_max_prompt_tokens() -> int:
+    raw = os.getenv("AI_PROMPT_MAX_TOKENS", "").strip()
+    return int(raw) if raw else DEFAULT_MAX_PROMPT_TOKENS
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from http.client import HTTPMessage
+from typing import Callable, Dict, Optional
+
+_RETRYABLE_5XX = {500, 502, 503, 504}
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+
+def is_idempotent(method: str) -> bool:
+    """Métodos que podem ser reenviados sem risco de efeito duplicado."""
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+def _header_float(headers: HTTPMessage, name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class RetryBudget:
+    """Retentativas disponíveis para uma execução (um `GitHubAPI`, um evento, um item de lote)."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(0, limit)
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+class RequestScheduler:
+    """Espaça requisições e decide retentativas respeitando a cota do GitHub.
+
+    Um token bucket limita a vazão (`rate_per_second`, rajada `burst`) e a cota
+    informada por `X-RateLimit-Remaining`/`X-RateLimit-Reset` pausa o envio quando
+    esgotada. Erros transitórios (5xx em métodos idempotentes, 429 e 403 de
+    rate limit secundário) são repetidos com backoff exponencial com jitter,
+    limitados a `retry_budget` retentativas por execução: cada execução recebe
+    seu próprio `RetryBudget` (`new_budget`), então um processo de longa duração
+    não esgota as retentativas de vez. `retries` e `wait_seconds` acumulam o
+    total do processo.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 10.0,
+        burst: int = 10,
+        retry_budget: int = 6,
+        base_backoff: float = 1.0,
+        max_wait: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate_per_second = max(rate_per_second, 0.001)
+        self.burst = max(1, burst)
+        self.retry_budget = retry_budget
+        self.base_backoff = base_backoff
+        self.max_wait = max_wait
+        self._sleep = sleep
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.wait_seconds = 0.0
+        self.retries = 0
+
+    def _wait(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.wait_seconds += seconds
+        self._sleep(seconds)
+
+    def acquire(self) -> None:
+        with self._lock:
+            delay = 0.0
+            if self.remaining is not None and self.remaining <= 0 and self.reset_at is not None:
+                until_reset = self.reset_at - time.time()
+                if 0 < until_reset <= self.max_wait:
+                    delay = until_reset
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / self.rate_per_second)
+        self._wait(delay)
+
+    def observe(self, headers: HTTPMessage) -> None:
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        reset = _header_float(headers, "X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = reset
+
+    def new_budget(self) -> RetryBudget:
+        return RetryBudget(self.retry_budget)
+
+    def retry_delay(
+        self, method: str, status: int, headers: HTTPMessage, body: bytes, attempt: int, budget: RetryBudget
+    ) -> Optional[float]:
+        retry_after = _header_float(headers, "Retry-After")
+        rate_limited = status == 429 or (
+            status == 403
+            and (
+                retry_after is not None
+                or headers.get("X-RateLimit-Remaining") == "0"
+                or b"secondary rate limit" in body.lower()
+            )
+        )
+        transient = status in _RETRYABLE_5XX and is_idempotent(method)
+        if not (rate_limited or transient):
+            return None
+        if not budget.take():
+            return None
+        with self._lock:
+            self.retries += 1
+
+        if retry_after is not None:
+            delay = retry_after
+        elif rate_limited and headers.get("X-RateLimit-Remaining") == "0":
+            reset = _header_float(headers, "X-RateLimit-Reset") or 0.0
+            delay = reset - time.time()
+        else:
+            delay = random.uniform(0, self.base_backoff * (2 ** attempt))
+        if delay > self.max_wait:
+            return None
+        return max(delay, 0.0)
+
+    def concurrency_budget(self, cap: int, requests_per_worker: int = 10) -> int:
+        """Workers paralelos que a cota sustenta: no máximo a rajada e a vazão do bucket e,
+        com `X-RateLimit-Remaining` conhecido, um worker a cada `requests_per_worker` requisições restantes."""
+        with self._lock:
+            limit = min(cap, self.burst, max(1, int(self.rate_per_second)))
+            if self.remaining is not None:
+                limit = min(limit, self.remaining // max(1, requests_per_worker))
+        return max(1, limit)
+
+    def backoff(self, delay: float) -> None:
+        self._wait(delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "wait_seconds": round(self.wait_seconds, 3),
+                "retries": self.retries,
+                "retry_budget": self.retry_budget,
+                "remaining": -1 if self.remaining is None else self.remaining,
+            }
+
+
+def default_scheduler() -> RequestScheduler:
+    return RequestScheduler(
+        rate_per_second=float(os.getenv("GITHUB_RATE_LIMIT_RPS", "10") or "10"),
+        burst=int(os.getenv("GITHUB_RATE_LIMIT_BURST", "10") or "10"),
+        retry_budget=int(os.getenv("GITHUB_RETRY_BUDGET", "6") or "6"),
+    )
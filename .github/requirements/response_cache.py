@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from disk_lru import DiskLru
+
+_SKIPPED_HEADERS = {"connection", "content-encoding", "content-length", "keep-alive", "transfer-encoding"}
+
+
+@dataclass
+class CachedResponse:
+    etag: str
+    last_modified: str
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+    def validators(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def message(self) -> http.client.HTTPMessage:
+        msg = http.client.HTTPMessage()
+        for name, value in self.headers:
+            msg[name] = value
+        return msg
+
+
+class ResponseCache:
+    """Cache em disco de respostas GET validadas por ETag/Last-Modified.
+
+    Cada entrada é um arquivo JSON nomeado pelo hash de (escopo do token, URL);
+    o token nunca é persistido, apenas um digest dele. O tamanho total é limitado
+    a `max_bytes` com despejo LRU (`DiskLru`) pela data do último acesso. Com `scope`, o
+    escopo é fixo em vez de derivado do token: o `GITHUB_TOKEN` do Actions muda a
+    cada execução, e sem isso um cache restaurado nunca seria reaproveitado.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 32 * 1024 * 1024, scope: str = "") -> None:
+        self.lru = DiskLru(directory, max_bytes)
+        self.directory = directory
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, url: str, authorization: str = "") -> str:
+        scope = hashlib.sha256((self.scope or authorization).encode("utf-8")).hexdigest()[:16]
+        return hashlib.sha256(f"{scope}\n{url}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raw = self.lru.read(key)
+        if raw is None:
+            return None
+        return CachedResponse(
+            etag=raw.get("etag", ""),
+            last_modified=raw.get("last_modified", ""),
+            headers=[(name, value) for name, value in raw.get("headers", [])],
+            body=base64.b64decode(raw.get("body", "")),
+        )
+
+    def record_hit(self, key: str) -> None:
+        with self._lock:
+            self.hits += 1
+        self.lru.touch(key)
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def store(self, key: str, etag: str, last_modified: str, headers: List[Tuple[str, str]], body: bytes) -> None:
+        if not etag and not last_modified:
+            return
+        payload = json.dumps(
+            {
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": [[n, v] for n, v in headers if n.lower() not in _SKIPPED_HEADERS],
+                "body": base64.b64encode(body).decode("ascii"),
+            }
+        )
+        self.lru.write(key, payload)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = {"hits": self.hits, "misses": self.misses}
+        return {**counters, **self.lru.stats()}
+
+
+def default_response_cache() -> Optional[ResponseCache]:
+    if os.getenv("GITHUB_HTTP_CACHE", "1").strip().lower() in {"0", "false", "off", "no"}:
+        return None
+    directory = os.getenv("GITHUB_HTTP_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "deep-ion-github-cache")
+    max_mb = int(os.getenv("GITHUB_HTTP_CACHE_MAX_MB", "32") or "32")
+    try:
+        return ResponseCache(directory, max_bytes=max_mb * 1024 * 1024, scope=os.getenv("GITHUB_HTTP_CACHE_SCOPE", ""))
+    except OSError:
+        return None
@@ -1,108 +1,203 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import threading
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from conflict_engine import ConflictEngine, ConflictScan
+from keyword_automaton import KeywordAutomaton
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent / "rn_catalog.json"
+SUPPORTED_CATALOG_VERSIONS = {1}
 
 
 @dataclass(frozen=True)
 class BusinessRule:
     rn_id: str
     name: str
-    modules: List[str]
-    actions: List[str]
+    modules: Tuple[str, ...]
+    actions: Tuple[str, ...]
     deterministic_fe: Optional[str]
     description: str
-
-
-RN_CATALOG: Dict[str, BusinessRule] = {
-    "RN-01": BusinessRule(
-        rn_id="RN-01",
-        name="Validar saldo antes de débito",
-        modules=["conta", "transacao"],
-        actions=["debitar", "transferir", "saque", "pagamento"],
-        deterministic_fe="Saldo Insuficiente",
-        description="Executa podeDebitar() antes de qualquer débito.",
-    ),
-    "RN-02": BusinessRule(
-        rn_id="RN-02",
-        name="Transferência atômica",
-        modules=["transacao", "conta"],
-        actions=["transferir", "transferencia", "pix"],
-        deterministic_fe="Falha na atomicidade da transferência",
-        description="Transferência deve ocorrer em transação atômica com rollback integral.",
-    ),
-    "RN-03": BusinessRule(
-        rn_id="RN-03",
-        name="Bloquear exclusão de transação confirmada",
-        modules=["transacao"],
-        actions=["excluir", "deletar", "remover", "cancelar"],
-        deterministic_fe="Tentativa de exclusão de transação confirmada",
-        description="Transações CONFIRMADA não podem ser removidas.",
-    ),
-    "RN-04": BusinessRule(
-        rn_id="RN-04",
-        name="Orçamento apenas com CONFIRMADA",
-        modules=["orcamento", "transacao", "relatorio"],
-        actions=["calcular", "orcamento", "periodo", "filtrar"],
-        deterministic_fe="Período inválido para cálculo de orçamento",
-        description="Filtro de orçamento considera somente status CONFIRMADA.",
-    ),
-    "RN-05": BusinessRule(
-        rn_id="RN-05",
-        name="Publicar evento de meta atingida",
-        modules=["meta", "objetivo", "notificacao"],
-        actions=["atingir", "meta", "concluir", "acumular"],
-        deterministic_fe=None,
-        description="Publica MetaAtingidaEvent ao atingir meta.",
-    ),
-    "RN-06": BusinessRule(
-        rn_id="RN-06",
-        name="Bloquear exclusão de categoria padrão",
-        modules=["categoria"],
-        actions=["excluir", "deletar", "remover", "categoria"],
-        deterministic_fe="Tentativa de exclusão de categoria padrão",
-        description="Categorias com padrao=true não podem ser removidas.",
-    ),
-    "RN-07": BusinessRule(
-        rn_id="RN-07",
-        name="Fluxo de caixa só com CONFIRMADA",
-        modules=["relatorio", "transacao", "fluxo-caixa"],
-        actions=["fluxo", "caixa", "relatorio", "consolidar"],
-        deterministic_fe="Transação não confirmada excluída do relatório",
-        description="Relatório de fluxo de caixa considera somente CONFIRMADA.",
-    ),
-}
+    conflict_patterns: Tuple[str, ...] = ()
 
 
 def _normalize(value: str) -> str:
     return value.strip().lower().replace("_", "-")
 
 
-def get_rn_by_module(module: str, action: str) -> List[str]:
-    module_key = _normalize(module)
-    action_key = _normalize(action)
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Catálogo carregado de um arquivo, imutável e com índices pré-computados."""
 
-    matches: List[str] = []
-    for rn_id, rule in RN_CATALOG.items():
-        module_match = module_key in {_normalize(m) for m in rule.modules}
-        action_match = action_key in {_normalize(a) for a in rule.actions}
-        if module_match or action_match:
-            matches.append(rn_id)
-    return sorted(set(matches))
+    version: int
+    digest: str
+    rules: Mapping[str, BusinessRule]
+    module_rules: Mapping[str, FrozenSet[str]]
+    action_rules: Mapping[str, FrozenSet[str]]
+    module_keywords: FrozenSet[str]
+    action_keywords: FrozenSet[str]
+    automaton: KeywordAutomaton
+    conflicts: ConflictEngine
+    markdown: str
 
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], digest: str) -> "CatalogSnapshot":
+        version = payload.get("version")
+        if version not in SUPPORTED_CATALOG_VERSIONS:
+            raise ValueError(f"Versão de catálogo RN não suportada: {version!r}")
 
-def get_fe_for_rn(rn_id: str) -> Optional[str]:
-    rule = RN_CATALOG.get(rn_id)
-    return rule.deterministic_fe if rule else None
+        rules: Dict[str, BusinessRule] = {}
+        for item in payload.get("rules", []):
+            rule = BusinessRule(
+                rn_id=item["rn_id"],
+                name=item["name"],
+                modules=tuple(item.get("modules", [])),
+                actions=tuple(item.get("actions", [])),
+                deterministic_fe=item.get("deterministic_fe"),
+                description=item.get("description", ""),
+                conflict_patterns=tuple(item.get("conflict_patterns", [])),
+            )
+            if rule.rn_id in rules:
+                raise ValueError(f"RN duplicada no catálogo: {rule.rn_id}")
+            rules[rule.rn_id] = rule
 
+        def reverse_index(kind: str) -> Mapping[str, FrozenSet[str]]:
+            mapping: Dict[str, set] = {}
+            for rn_id, rule in rules.items():
+                for keyword in getattr(rule, kind):
+                    mapping.setdefault(_normalize(keyword), set()).add(rn_id)
+            return MappingProxyType({keyword: frozenset(rn_ids) for keyword, rn_ids in mapping.items()})
 
-def list_rn_catalog_markdown() -> str:
+        module_keywords = frozenset(keyword.lower() for rule in rules.values() for keyword in rule.modules)
+        action_keywords = frozenset(keyword.lower() for rule in rules.values() for keyword in rule.actions)
+        return cls(
+            version=version,
+            digest=digest,
+            rules=MappingProxyType(rules),
+            module_rules=reverse_index("modules"),
+            action_rules=reverse_index("actions"),
+            module_keywords=module_keywords,
+            action_keywords=action_keywords,
+            automaton=KeywordAutomaton(sorted(module_keywords | action_keywords)).compile(),
+            conflicts=ConflictEngine({rn_id: rule.conflict_patterns for rn_id, rule in rules.items() if rule.conflict_patterns}),
+            markdown=_render_markdown(rules),
+        )
+
+
+def _render_markdown(rules: Mapping[str, BusinessRule]) -> str:
     lines = [
         "| RN | Regra | FE Determinístico |",
         "|---|---|---|",
     ]
-    for rn_id in sorted(RN_CATALOG.keys()):
-        rule = RN_CATALOG[rn_id]
+    for rn_id in sorted(rules.keys()):
+        rule = rules[rn_id]
         fe = rule.deterministic_fe or "Sem FE (evento MetaAtingidaEvent)"
         lines.append(f"| {rn_id} | {rule.name} | {fe} |")
     return "\n".join(lines)
+
+
+class CatalogLoader:
+    """Recarrega o catálogo apenas quando o arquivo muda.
+
+    A cada acesso compara mtime e tamanho do arquivo; se mudaram, relê o
+    conteúdo e só reconstrói o snapshot quando o sha256 também mudou (um
+    `touch` ou checkout sem alteração mantém os índices existentes).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self.reloads = 0
+
+    def snapshot(self) -> CatalogSnapshot:
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        current = self._snapshot
+        if current is not None and signature == self._stat:
+            return current
+        with self._lock:
+            if self._snapshot is not None and signature == self._stat:
+                return self._snapshot
+            raw = self.path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if self._snapshot is None or self._snapshot.digest != digest:
+                self._snapshot = CatalogSnapshot.from_payload(json.loads(raw.decode("utf-8")), digest)
+                self.reloads += 1
+            self._stat = signature
+            return self._snapshot
+
+
+_LOADER = CatalogLoader(Path(os.getenv("RN_CATALOG_PATH") or DEFAULT_CATALOG_PATH))
+
+
+def catalog_snapshot() -> CatalogSnapshot:
+    return _LOADER.snapshot()
+
+
+class _CatalogView(Mapping):
+    """Visão somente leitura de `rn_id → BusinessRule` sobre o snapshot corrente."""
+
+    def __getitem__(self, rn_id: str) -> BusinessRule:
+        return catalog_snapshot().rules[rn_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(catalog_snapshot().rules)
+
+    def __len__(self) -> int:
+        return len(catalog_snapshot().rules)
+
+
+RN_CATALOG: Mapping[str, BusinessRule] = _CatalogView()
+
+
+@dataclass(frozen=True)
+class CatalogHits:
+    modules: List[str]
+    actions: List[str]
+    rns: List[str]
+
+
+def scan_catalog_keywords(text: str, word_boundary: bool = False) -> CatalogHits:
+    """Módulos, ações e RNs citados em `text`, em uma única passada pelo automato do catálogo."""
+    catalog = catalog_snapshot()
+    found = catalog.automaton.find_all(text.lower(), word_boundary=word_boundary)
+    modules = sorted(found & catalog.module_keywords)
+    actions = sorted(found & catalog.action_keywords)
+    return CatalogHits(modules=modules, actions=actions, rns=get_rn_for(modules, actions))
+
+
+def detect_conflicts(text: str, budget_ms: Optional[float] = None) -> ConflictScan:
+    """RNs violadas em `text` segundo os padrões de conflito do catálogo (texto comparado em minúsculas)."""
+    return catalog_snapshot().conflicts.scan(text.lower(), budget_ms=budget_ms)
+
+
+def get_rn_for(modules: Iterable[str], actions: Iterable[str]) -> List[str]:
+    """União de `get_rn_by_module` para todos os pares módulo × ação."""
+    catalog = catalog_snapshot()
+    matches: set = set()
+    for module in modules:
+        matches.update(catalog.module_rules.get(_normalize(module), ()))
+    for action in actions:
+        matches.update(catalog.action_rules.get(_normalize(action), ()))
+    return sorted(matches)
+
+
+def get_rn_by_module(module: str, action: str) -> List[str]:
+    return get_rn_for([module], [action])
+
+
+def get_fe_for_rn(rn_id: str) -> Optional[str]:
+    rule = catalog_snapshot().rules.get(rn_id)
+    return rule.deterministic_fe if rule else None
+
+
+def list_rn_catalog_markdown() -> str:
+    return catalog_snapshot().markdown
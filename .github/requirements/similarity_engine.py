@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import heapq
+import math
+from bisect import bisect_right
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from minhash_lsh import MinHashLSH
+
+
+class Vocabulary:
+    """Mapeamento estável termo → id inteiro."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add(self, term: str) -> int:
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def get(self, term: str) -> Optional[int]:
+        return self.ids.get(term)
+
+
+class SimilarityEngine:
+    """Matriz termo-documento esparsa (CSR) com normas pré-computadas.
+
+    Cada linha é um documento; `indptr`/`indices`/`data` seguem o layout CSR e
+    um índice invertido por termo (o layout CSC equivalente) permite calcular o
+    produto escalar da consulta contra todo o corpus tocando apenas nas
+    postings dos termos da consulta. O escore é o cosseno
+    `(q · d) / (‖q‖ ‖d‖)` sobre esses pesos: sem `use_idf`, as frequências
+    brutas dos termos; com `use_idf`, frequência × idf suavizado.
+    """
+
+    def __init__(self, use_idf: bool = False, vocabulary: Optional[Vocabulary] = None) -> None:
+        self.use_idf = use_idf
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        # Termos incluídos depois do build num vocabulário compartilhado não têm postings.
+        self.vocab_size = 0
+        self.indptr = array("l", [0])
+        self.indices = array("l")
+        self.data = array("d")
+        self.norms = array("d")
+        self.idf = array("d")
+        self._postings_docs: List[array] = []
+        self._postings_weights: List[array] = []
+        self._pair_indexes: Dict[float, "PairIndex"] = {}
+
+    def __len__(self) -> int:
+        return len(self.norms)
+
+    @classmethod
+    def build(cls, documents: Iterable[Mapping[str, int]], use_idf: bool = False) -> "SimilarityEngine":
+        engine = cls(use_idf=use_idf)
+        add_term = engine.vocabulary.add
+        engine._load_rows([sorted((add_term(term), float(freq)) for term, freq in counts.items() if freq) for counts in documents])
+        return engine
+
+    @classmethod
+    def from_term_arrays(
+        cls,
+        vocabulary: Vocabulary,
+        rows: Iterable[Tuple[Sequence[int], Sequence[int]]],
+        use_idf: bool = False,
+    ) -> "SimilarityEngine":
+        """Monta o CSR direto de pares (ids em ordem crescente, frequências) já internados em `vocabulary`.
+
+        O vocabulário é compartilhado, não copiado: os registros que geraram as
+        linhas e o motor passam a ter o mesmo dono e o mesmo tempo de vida.
+        """
+        engine = cls(use_idf=use_idf, vocabulary=vocabulary)
+        engine._load_rows([list(zip(term_ids, map(float, freqs))) for term_ids, freqs in rows])
+        return engine
+
+    def _load_rows(self, rows: List[List[Tuple[int, float]]]) -> None:
+        use_idf = self.use_idf
+        doc_freq: Counter = Counter()
+        for row in rows:
+            doc_freq.update(term_id for term_id, _ in row)
+
+        total = len(rows)
+        vocab_size = len(self.vocabulary)
+        idf = [math.log((1 + total) / (1 + doc_freq[term_id])) + 1.0 if use_idf else 1.0 for term_id in range(vocab_size)]
+        postings_docs: List[List[int]] = [[] for _ in range(vocab_size)]
+        postings_weights: List[List[float]] = [[] for _ in range(vocab_size)]
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        norms: List[float] = []
+        for doc_id, row in enumerate(rows):
+            squared = 0.0
+            for term_id, freq in row:
+                weight = freq * idf[term_id]
+                postings_docs[term_id].append(doc_id)
+                postings_weights[term_id].append(weight)
+                squared += weight * weight
+            indices.extend(term_id for term_id, _ in row)
+            data.extend(freq * idf[term_id] for term_id, freq in row)
+            indptr.append(len(indices))
+            norms.append(math.sqrt(squared))
+
+        self.vocab_size = vocab_size
+        self.idf = array("d", idf)
+        self.indptr = array("l", indptr)
+        self.indices = array("l", indices)
+        self.data = array("d", data)
+        self.norms = array("d", norms)
+        self._postings_docs = [array("l", docs) for docs in postings_docs]
+        self._postings_weights = [array("d", weights) for weights in postings_weights]
+        self._pair_indexes = {}
+
+    def memory_bytes(self) -> int:
+        """Estimativa do espaço ocupado pelas matrizes e pelo vocabulário."""
+        arrays = [self.indptr, self.indices, self.data, self.norms, self.idf, *self._postings_docs, *self._postings_weights]
+        indexes = sum(index.memory_bytes() for index in self._pair_indexes.values())
+        return sum(len(item) * item.itemsize + 64 for item in arrays) + 96 * len(self.vocabulary) + indexes
+
+    def _query_weights(self, counts: Mapping[str, int]) -> Tuple[List[Tuple[int, float]], float]:
+        weights: List[Tuple[int, float]] = []
+        squared = 0.0
+        for term, freq in counts.items():
+            if not freq:
+                continue
+            term_id = self.vocabulary.get(term)
+            if term_id is not None and term_id >= self.vocab_size:
+                term_id = None
+            idf = self.idf[term_id] if term_id is not None else (math.log(1 + len(self)) + 1.0 if self.use_idf else 1.0)
+            weight = freq * idf
+            squared += weight * weight
+            if term_id is not None:
+                weights.append((term_id, weight))
+        return weights, math.sqrt(squared)
+
+    def scores(self, counts: Mapping[str, int]) -> Dict[int, float]:
+        weights, query_norm = self._query_weights(counts)
+        if query_norm == 0:
+            return {}
+        dots: Dict[int, float] = {}
+        get = dots.get
+        for term_id, weight in weights:
+            for doc_id, doc_weight in zip(self._postings_docs[term_id], self._postings_weights[term_id]):
+                dots[doc_id] = get(doc_id, 0.0) + weight * doc_weight
+        norms = self.norms
+        return {doc_id: dot / (query_norm * norms[doc_id]) for doc_id, dot in dots.items() if norms[doc_id]}
+
+    def score_rows(self, counts: Mapping[str, int], doc_ids: Iterable[int]) -> Dict[int, float]:
+        """Cosseno da consulta contra linhas específicas, lendo direto do CSR."""
+        weights, query_norm = self._query_weights(counts)
+        if query_norm == 0:
+            return {}
+        query = dict(weights)
+        indptr, indices, data, norms = self.indptr, self.indices, self.data, self.norms
+        scored: Dict[int, float] = {}
+        for doc_id in doc_ids:
+            if not norms[doc_id]:
+                continue
+            start, end = indptr[doc_id], indptr[doc_id + 1]
+            dot = sum(query.get(indices[pos], 0.0) * data[pos] for pos in range(start, end))
+            if dot:
+                scored[doc_id] = dot / (query_norm * norms[doc_id])
+        return scored
+
+    def row_terms(self, doc_id: int) -> List[str]:
+        terms = self.vocabulary.terms
+        return [terms[self.indices[pos]] for pos in range(self.indptr[doc_id], self.indptr[doc_id + 1])]
+
+    def top_k(
+        self,
+        counts: Mapping[str, int],
+        k: Optional[int] = None,
+        threshold: float = 0.0,
+        candidates: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        scored = self.scores(counts) if candidates is None else self.score_rows(counts, candidates)
+        hits = [(doc_id, value) for doc_id, value in scored.items() if value >= threshold]
+        if k is not None and len(hits) > k:
+            return heapq.nlargest(k, hits, key=lambda item: (item[1], -item[0]))
+        return sorted(hits, key=lambda item: (-item[1], item[0]))
+
+    def pair_index(self, threshold: float) -> "PairIndex":
+        cached = self._pair_indexes.get(threshold)
+        if cached is None:
+            cached = PairIndex.build(self, threshold)
+            self._pair_indexes[threshold] = cached
+        return cached
+
+    def similar_pairs(
+        self,
+        start: int,
+        end: int,
+        threshold: float,
+        lsh: Optional["MinHashLSH"] = None,
+    ) -> List[Tuple[int, int, float]]:
+        """Pares (i, j, cosseno) com i em [start, end), j > i e cosseno >= threshold.
+
+        Sem `lsh` o resultado é exato e usa `PairIndex`; com `lsh`, apenas os
+        documentos que colidem em alguma banda são pontuados.
+        """
+        if lsh is None:
+            return self.pair_index(threshold).pairs(self, start, end)
+        indptr, indices, data, norms = self.indptr, self.indices, self.data, self.norms
+        pairs: List[Tuple[int, int, float]] = []
+        for row in range(start, min(end, len(self))):
+            row_norm = norms[row]
+            if not row_norm:
+                continue
+            query = {indices[pos]: data[pos] for pos in range(indptr[row], indptr[row + 1])}
+            for doc_id in lsh.query(self.row_terms(row)):
+                if doc_id <= row or not norms[doc_id]:
+                    continue
+                dot = sum(query.get(indices[pos], 0.0) * data[pos] for pos in range(indptr[doc_id], indptr[doc_id + 1]))
+                similarity = dot / (row_norm * norms[doc_id])
+                if similarity >= threshold:
+                    pairs.append((row, doc_id, similarity))
+        return pairs
+
+
+class PairIndex:
+    """Índice podado para a busca exata de pares com cosseno >= threshold (AllPairs).
+
+    Os termos de cada documento normalizado são ordenados do mais para o menos
+    frequente; o prefixo cuja contribuição máxima possível ao cosseno (limitada
+    pelo peso máximo de cada termo e pela norma do próprio prefixo) fica abaixo
+    do limiar não entra nas postings. Um par só atinge o limiar se compartilhar
+    algum termo do sufixo indexado, então nenhum par se perde: o produto
+    parcial acumulado no sufixo mais a cota do prefixo descarta a maioria dos
+    candidatos, e os restantes são completados com o prefixo guardado à parte.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self.postings_docs: List[array] = []
+        self.postings_weights: List[array] = []
+        self.prefix_bound = array("d")
+        self.prefix_indptr = array("l", [0])
+        self.prefix_indices = array("l")
+        self.prefix_data = array("d")
+
+    @classmethod
+    def build(cls, engine: SimilarityEngine, threshold: float) -> "PairIndex":
+        index = cls(threshold)
+        norms, indptr, indices, data = engine.norms, engine.indptr, engine.indices, engine.data
+        doc_freq = [len(docs) for docs in engine._postings_docs]
+        max_weight = [
+            max((weight / norms[doc_id] for doc_id, weight in zip(docs, weights)), default=0.0)
+            for docs, weights in zip(engine._postings_docs, engine._postings_weights)
+        ]
+        postings_docs: List[List[int]] = [[] for _ in range(engine.vocab_size)]
+        postings_weights: List[List[float]] = [[] for _ in range(engine.vocab_size)]
+        prefix_bound: List[float] = []
+        prefix_indptr = [0]
+        prefix_indices: List[int] = []
+        prefix_data: List[float] = []
+        limit = threshold - 1e-9
+        for doc_id in range(len(engine)):
+            norm = norms[doc_id]
+            row = sorted(
+                ((indices[pos], data[pos] / norm) for pos in range(indptr[doc_id], indptr[doc_id + 1])) if norm else (),
+                key=lambda item: (-doc_freq[item[0]], item[0]),
+            )
+            bound = squared = covered = 0.0
+            for term_id, weight in row:
+                bound += weight * max_weight[term_id]
+                squared += weight * weight
+                current = min(bound, math.sqrt(squared))
+                if current >= limit:
+                    postings_docs[term_id].append(doc_id)
+                    postings_weights[term_id].append(weight)
+                else:
+                    covered = current
+                    prefix_indices.append(term_id)
+                    prefix_data.append(weight)
+            prefix_bound.append(covered)
+            prefix_indptr.append(len(prefix_indices))
+
+        index.postings_docs = [array("l", docs) for docs in postings_docs]
+        index.postings_weights = [array("d", weights) for weights in postings_weights]
+        index.prefix_bound = array("d", prefix_bound)
+        index.prefix_indptr = array("l", prefix_indptr)
+        index.prefix_indices = array("l", prefix_indices)
+        index.prefix_data = array("d", prefix_data)
+        return index
+
+    def memory_bytes(self) -> int:
+        arrays = [
+            self.prefix_bound,
+            self.prefix_indptr,
+            self.prefix_indices,
+            self.prefix_data,
+            *self.postings_docs,
+            *self.postings_weights,
+        ]
+        return sum(len(item) * item.itemsize + 64 for item in arrays)
+
+    def pairs(self, engine: SimilarityEngine, start: int, end: int) -> List[Tuple[int, int, float]]:
+        norms, indptr, indices, data = engine.norms, engine.indptr, engine.indices, engine.data
+        prefix_bound, prefix_indptr = self.prefix_bound, self.prefix_indptr
+        prefix_indices, prefix_data = self.prefix_indices, self.prefix_data
+        limit = self.threshold - 1e-9
+        found: List[Tuple[int, int, float]] = []
+        for row in range(start, min(end, len(engine))):
+            norm = norms[row]
+            if not norm:
+                continue
+            query = {indices[pos]: data[pos] / norm for pos in range(indptr[row], indptr[row + 1])}
+            partial: Dict[int, float] = {}
+            get = partial.get
+            for term_id, weight in query.items():
+                docs = self.postings_docs[term_id]
+                weights = self.postings_weights[term_id]
+                for idx in range(bisect_right(docs, row), len(docs)):
+                    doc_id = docs[idx]
+                    partial[doc_id] = get(doc_id, 0.0) + weight * weights[idx]
+            for doc_id, dot in partial.items():
+                if dot + prefix_bound[doc_id] < limit:
+                    continue
+                for pos in range(prefix_indptr[doc_id], prefix_indptr[doc_id + 1]):
+                    dot += query.get(prefix_indices[pos], 0.0) * prefix_data[pos]
+                if dot >= self.threshold:
+                    found.append((row, doc_id, dot))
+        return found
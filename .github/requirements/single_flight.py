@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Memoização por chave com deduplicação de chamadas em andamento.
+
+    A primeira chamada de `do(key, fn)` executa `fn`; chamadas concorrentes com a
+    mesma chave aguardam o mesmo resultado e chamadas posteriores o recebem da
+    memória. O escopo é o tempo de vida da instância (uma execução de skill).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            owner = call is None
+            if owner:
+                call = _Call()
+                self._calls[key] = call
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                call.value = fn()
+            except BaseException as exc:
+                call.error = exc
+                with self._lock:
+                    self._calls.pop(key, None)
+            finally:
+                call.done.set()
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def peek(self, key: Hashable) -> Tuple[bool, Any]:
+        """Retorna `(True, valor)` se a chave já foi (ou está sendo) resolvida."""
+        with self._lock:
+            call = self._calls.get(key)
+        if call is None:
+            return False, None
+        call.done.wait()
+        if call.error is not None:
+            return False, None
+        with self._lock:
+            self.hits += 1
+        return True, call.value
+
+    def forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._calls.clear()
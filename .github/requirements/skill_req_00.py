@@ -7,53 +7,32 @@ import re
 import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 CURRENT_DIR = Path(__file__).resolve().parent
 if str(CURRENT_DIR) not in sys.path:
     sys.path.insert(0, str(CURRENT_DIR))
 
 from audit_ledger import DecisionRecord, format_decision_record_markdown
-from github_api import GitHubAPI
-from rn_catalog import RN_CATALOG, get_rn_by_module
-from uc_repository import GitHubIssueClient, find_similar_ucs
+from batch import BatchSelection, add_selector_arguments, run_batch_cli
+from github_api import GitHubAPI, labels_from_issue, record_issue_writes
+from rn_catalog import detect_conflicts, get_rn_for, scan_catalog_keywords
+from uc_index import UcIndex, open_default_index
+from uc_repository import find_similar_ucs
 
 
 def _extract_modules(text: str) -> List[str]:
-    lowered = text.lower()
-    modules = []
-    for rule in RN_CATALOG.values():
-        for module in rule.modules:
-            if module in lowered:
-                modules.append(module)
-    return sorted(set(modules))
+    return scan_catalog_keywords(text).modules
 
 
 def _extract_actions(text: str) -> List[str]:
-    lowered = text.lower()
-    actions = []
-    for rule in RN_CATALOG.values():
-        for action in rule.actions:
-            if action in lowered:
-                actions.append(action)
-    return sorted(set(actions))
-
-
-def _detect_rn_conflicts(text: str) -> List[str]:
-    lowered = text.lower()
-    patterns = {
-        "RN-01": [r"sem\s+validar\s+saldo", r"ignorar\s+saldo"],
-        "RN-02": [r"sem\s+transa[cç][aã]o", r"n[aã]o\s+at[oô]mic"],
-        "RN-03": [r"excluir\s+transa[cç][aã]o\s+confirmada"],
-        "RN-04": [r"or[cç]amento.*pendente", r"incluir.*n[aã]o\s+confirmada.*or[cç]amento"],
-        "RN-06": [r"excluir\s+categoria\s+padr[aã]o"],
-        "RN-07": [r"fluxo\s+de\s+caixa.*n[aã]o\s+confirmada"],
-    }
-    conflicts = []
-    for rn, rn_patterns in patterns.items():
-        if any(re.search(pattern, lowered) for pattern in rn_patterns):
-            conflicts.append(rn)
-    return sorted(set(conflicts))
+    return scan_catalog_keywords(text).actions
+
+
+def _detect_rn_conflicts(text: str) -> Tuple[List[str], bool]:
+    """RNs em conflito e se a varredura estourou o orçamento de tempo (resultado incompleto)."""
+    scan = detect_conflicts(text)
+    return scan.rn_ids, scan.timed_out
 
 
 def _parallel_issues_warning(gh: GitHubAPI, issue_number: int, modules: List[str]) -> List[str]:
@@ -61,14 +40,15 @@ def _parallel_issues_warning(gh: GitHubAPI, issue_number: int, modules: List[str
         return []
     thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
     warnings: List[str] = []
-    for issue in gh.list_recent_issues(per_page=100, state="open"):
-        if int(issue.get("number", 0)) == issue_number:
-            continue
+    # Ordenado por criação (desc): a primeira issue fora da janela encerra a paginação.
+    for issue in gh.iter_recent_issues(per_page=100, state="open", sort="created"):
         created_at = issue.get("created_at")
         if not created_at:
             continue
         created_dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
         if created_dt < thirty_days_ago:
+            break
+        if int(issue.get("number", 0)) == issue_number:
             continue
         content = f"{issue.get('title', '')}\n{issue.get('body', '')}".lower()
         overlaps = [module for module in modules if module in content]
@@ -104,42 +84,52 @@ def _classification_warning(issue_text: str, estimated: str) -> str:
     return f"Classificação divergente: declarada {declared}, estimada {estimated} (sugestão: /reclassify)."
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="SKILL-REQ-00 Duplicate & Conflict Detector")
-    parser.add_argument("--issue", type=int, required=True)
-    args = parser.parse_args()
+def run(gh: GitHubAPI, issue: Dict[str, Any], uc_index: Optional[UcIndex] = None) -> DecisionRecord:
+    """Executa o REQ-00 sobre a issue já buscada (REST ou bundle GraphQL).
 
-    gh = GitHubAPI()
-    issue = gh.get_issue(args.issue)
+    Publica os artefatos no fim e reflete comentários e labels em `issue`,
+    para que a etapa seguinte do pipeline não precise buscá-la de novo. Com
+    `uc_index`, usa o índice de UCs já sincronizado por quem chama (modo lote).
+    """
+    issue_number = int(issue["number"])
     title = issue.get("title", "")
     body = issue.get("body", "") or ""
     issue_text = f"{title}\n{body}"
 
-    modules = _extract_modules(issue_text)
-    actions = _extract_actions(issue_text)
+    hits = scan_catalog_keywords(issue_text)
+    modules = hits.modules
+    actions = hits.actions
 
-    triggered_rns = set()
-    for module in modules or ["transacao", "conta", "categoria", "relatorio", "orcamento", "meta"]:
-        for action in actions or ["analisar"]:
-            triggered_rns.update(get_rn_by_module(module, action))
+    triggered_rns = get_rn_for(
+        modules or ["transacao", "conta", "categoria", "relatorio", "orcamento", "meta"],
+        actions or ["analisar"],
+    )
 
-    uc_client = GitHubIssueClient(repo=os.getenv("GITHUB_REPOSITORY"), token=os.getenv("GITHUB_TOKEN"))
-    similar_ucs = find_similar_ucs(issue_text, threshold=0.8, client=uc_client)
+    shared_index = uc_index is not None
+    similar_ucs = find_similar_ucs(
+        issue_text,
+        threshold=0.8,
+        client=gh,
+        index=uc_index if shared_index else open_default_index(gh.ctx.repository),
+        use_lsh=os.getenv("UC_SIMILARITY_LSH", "0") == "1",
+        refresh=not shared_index,
+    )
     known_uc_ids = [item["uc_id"] for item in similar_ucs]
 
-    conflicts = _detect_rn_conflicts(issue_text)
-    parallel_warnings = _parallel_issues_warning(gh, args.issue, modules)
+    conflicts, conflicts_incomplete = _detect_rn_conflicts(issue_text)
+    parallel_warnings = _parallel_issues_warning(gh, issue_number, modules)
     dependency_warnings = _dependency_warning(issue_text, known_uc_ids)
     estimated_classification = _estimate_classification(issue_text, sorted(triggered_rns))
     class_warning = _classification_warning(issue_text, estimated_classification)
 
     duplicate_critical = bool(similar_ucs and triggered_rns and modules)
     block_rn_violation = bool(conflicts)
-    should_block = duplicate_critical or block_rn_violation
+    # Varredura incompleta não prova ausência de conflito: bloqueia para revisão manual.
+    should_block = duplicate_critical or block_rn_violation or conflicts_incomplete
 
     report_lines = [
-        f"## DuplicateReport-{args.issue}",
-        f"**Issue:** #{args.issue}",
+        f"## DuplicateReport-{issue_number}",
+        f"**Issue:** #{issue_number}",
         "",
         "### V1 — Duplicatas semânticas",
     ]
@@ -153,6 +143,8 @@ def main() -> None:
 
     report_lines.extend(["", "### V2 — Conflitos com RN"])
     report_lines.append(", ".join(conflicts) if conflicts else "Nenhum conflito explícito detectado.")
+    if conflicts_incomplete:
+        report_lines.append("⚠️ Verificação interrompida pelo limite de tempo; conflitos podem não ter sido detectados. Revisão manual necessária.")
 
     report_lines.extend(["", "### V3 — Issues paralelas (30 dias)"])
     report_lines.extend(parallel_warnings or ["Nenhuma issue paralela relevante detectada."])
@@ -165,31 +157,70 @@ def main() -> None:
 
     report_lines.extend(["", f"**Resultado:** {'BLOQUEADO' if should_block else 'LIMPO'}"])
 
-    gh.post_issue_comment(args.issue, "\n".join(report_lines))
-
-    if should_block:
-        gh.add_labels(args.issue, ["blocked/rn-violation"])
-        gh.remove_labels(args.issue, ["req/duplicatas-verificadas"])
-    else:
-        gh.add_labels(args.issue, ["req/duplicatas-verificadas"])
-        gh.remove_labels(args.issue, ["blocked/rn-violation"])
-
     decision = DecisionRecord(
         skill="SKILL-REQ-00",
-        issue_id=args.issue,
+        issue_id=issue_number,
         decision_type="block" if should_block else "alert",
         decision="bloquear" if should_block else "avançar",
-        confidence_score=0.9 if not conflicts else 0.7,
+        confidence_score=0.9 if not (conflicts or conflicts_incomplete) else 0.7,
         rn_triggered=sorted(triggered_rns),
         modules_affected=modules,
         approval_weight=0.0,
         justification=(
-            "Violação de RN detectada" if block_rn_violation else "Duplicata crítica detectada" if duplicate_critical else "Sem bloqueios"
+            "Violação de RN detectada"
+            if block_rn_violation
+            else "Duplicata crítica detectada"
+            if duplicate_critical
+            else "Verificação de conflitos RN incompleta; revisão manual necessária"
+            if conflicts_incomplete
+            else "Sem bloqueios"
         ),
-        artifacts_produced=[f"DuplicateReport-{args.issue}"],
+        artifacts_produced=[f"DuplicateReport-{issue_number}"],
         lgpd_scope=False,
     )
-    gh.post_issue_comment(args.issue, format_decision_record_markdown(decision))
+    report = "\n".join(report_lines)
+    decision_markdown = format_decision_record_markdown(decision)
+
+    gh.post_issue_comment(issue_number, report)
+    labels = gh.label_transaction(issue_number, current=labels_from_issue(issue))
+    if should_block:
+        labels.add("blocked/rn-violation").remove("req/duplicatas-verificadas")
+    else:
+        labels.add("req/duplicatas-verificadas").remove("blocked/rn-violation")
+    labels.commit()
+    gh.post_issue_comment(issue_number, decision_markdown)
+    record_issue_writes(issue, [report, decision_markdown], labels.current)
+    return decision
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="SKILL-REQ-00 Duplicate & Conflict Detector")
+    add_selector_arguments(parser)
+    args = parser.parse_args(argv)
+
+    gh = GitHubAPI()
+    if args.issue is not None:
+        run(gh, gh.get_issue(args.issue))
+        return
+
+    # Sem índice persistente, um índice em memória ainda evita reconstruir o motor por issue.
+    uc_index = open_default_index(gh.ctx.repository) or UcIndex(":memory:", gh.ctx.repository)
+
+    def prepare(selection: BatchSelection) -> None:
+        # Corpus de UCs sincronizado e indexado uma única vez para todo o lote. A
+        # listagem completa fica memoizada no `gh` e também atende a checagem de
+        # issues paralelas (V3) de cada issue.
+        gh.list_recent_issues(per_page=100, state="all")
+        uc_index.refresh(gh)
+        uc_index.engine()
+
+    run_batch_cli(
+        "SKILL-REQ-00",
+        gh,
+        args,
+        lambda item_gh, selection, number: run(item_gh, selection.issue(item_gh, number), uc_index=uc_index),
+        prepare=prepare,
+    )
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ import re
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 CURRENT_DIR = Path(__file__).resolve().parent
 if str(CURRENT_DIR) not in sys.path:
@@ -14,8 +14,10 @@ if str(CURRENT_DIR) not in sys.path:
 
 from ai_provider import call_llm, load_prompt_file
 from audit_ledger import DecisionRecord, format_decision_record_markdown
-from github_api import GitHubAPI
-from rn_catalog import RN_CATALOG, list_rn_catalog_markdown
+from batch import add_selector_arguments, run_batch_cli
+from github_api import GitHubAPI, labels_from_issue, record_issue_writes
+from prompt_budget import PromptBuilder
+from rn_catalog import list_rn_catalog_markdown, scan_catalog_keywords
 
 
 def _extract_duplicate_report(comments: List[Dict]) -> str:
@@ -27,12 +29,7 @@ def _extract_duplicate_report(comments: List[Dict]) -> str:
 
 
 def _extract_rn_hits(text: str) -> List[str]:
-    lowered = text.lower()
-    hits = []
-    for rn_id, rule in RN_CATALOG.items():
-        if any(module in lowered for module in rule.modules) or any(action in lowered for action in rule.actions):
-            hits.append(rn_id)
-    return sorted(set(hits))
+    return scan_catalog_keywords(text).rns
 
 
 def _build_fallback_bar(issue_number: int, title: str, body: str, duplicate_report: str) -> str:
@@ -128,14 +125,14 @@ def _has_critical_ambiguity(bar_markdown: str) -> bool:
     return any(term in section.lower() for term in ["crítica", "critica", "fluxo principal", "rn", "não definido", "nao definido"])
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="SKILL-REQ-01 Business Analyst Agent")
-    parser.add_argument("--issue", type=int, required=True)
-    args = parser.parse_args()
+def run(gh: GitHubAPI, issue: Dict[str, Any]) -> DecisionRecord:
+    """Executa o REQ-01 sobre o bundle da issue (comentários incluídos).
 
-    gh = GitHubAPI()
-    issue = gh.get_issue(args.issue)
-    comments = gh.list_issue_comments(args.issue)
+    Publica os artefatos no fim e reflete comentários e labels em `issue`,
+    para que a etapa seguinte do pipeline não precise buscá-la de novo.
+    """
+    issue_number = int(issue["number"])
+    comments = issue["comments"]
 
     duplicate_report = _extract_duplicate_report(comments)
     issue_title = issue.get("title", "")
@@ -143,43 +140,32 @@ def main() -> None:
     issue_text = f"{issue_title}\n{issue_body}"
 
     prompt_template = load_prompt_file(str(CURRENT_DIR / "prompts" / "bar_generation.md"))
-    prompt = "\n\n".join(
-        [
-            prompt_template,
-            "## Catálogo RN inline",
-            list_rn_catalog_markdown(),
-            "## Contexto da Issue",
-            f"issue_number: {args.issue}",
-            f"issue_title: {issue_title}",
-            f"issue_body:\n{issue_body}",
-            "## DuplicateReport",
-            duplicate_report or "N/A",
-        ]
+    prompt = (
+        PromptBuilder()
+        .add_static("template", prompt_template)
+        .add_static("catalogo_rn", "## Catálogo RN inline", list_rn_catalog_markdown())
+        .add("contexto", "\n\n".join(["## Contexto da Issue", f"issue_number: {issue_number}", f"issue_title: {issue_title}"]))
+        .add("issue_body", issue_body, max_tokens=6000, strategy="middle", prefix="issue_body:\n")
+        .add("duplicate_report", "\n\n".join(["## DuplicateReport", duplicate_report or "N/A"]), max_tokens=1500, strategy="rows")
+        .build()
+        .text
     )
 
-    fallback = _build_fallback_bar(args.issue, issue_title, issue_body, duplicate_report)
-    bar_markdown = call_llm(prompt=prompt, fallback=fallback)
+    fallback = _build_fallback_bar(issue_number, issue_title, issue_body, duplicate_report)
+    bar_markdown = call_llm(prompt=prompt, fallback=fallback, expect_prefix="## BAR-")
 
     if not bar_markdown.strip().startswith("## BAR-"):
         bar_markdown = fallback
 
-    gh.post_issue_comment(args.issue, bar_markdown)
-
     confidence_score = _extract_confidence(bar_markdown)
     lgpd_scope = _extract_lgpd_scope(bar_markdown, issue_text)
     critical_ambiguity = _has_critical_ambiguity(bar_markdown)
 
     should_escalate = confidence_score < 0.65 or lgpd_scope or critical_ambiguity
 
-    gh.add_labels(args.issue, ["req/bar-aguardando"])
-    if should_escalate:
-        gh.add_labels(args.issue, ["qa/bloqueado"])
-    else:
-        gh.remove_labels(args.issue, ["qa/bloqueado"])
-
     decision = DecisionRecord(
         skill="SKILL-REQ-01",
-        issue_id=args.issue,
+        issue_id=issue_number,
         decision_type="checkpoint",
         decision="escalar" if should_escalate else "avançar",
         confidence_score=confidence_score,
@@ -189,10 +175,38 @@ def main() -> None:
         justification=(
             "Checkpoint A bloqueado por ambiguidades críticas/LGPD/confiança" if should_escalate else "BAR gerado para revisão humana"
         ),
-        artifacts_produced=[f"BAR-{args.issue}"],
+        artifacts_produced=[f"BAR-{issue_number}"],
         lgpd_scope=lgpd_scope,
     )
-    gh.post_issue_comment(args.issue, format_decision_record_markdown(decision))
+    decision_markdown = format_decision_record_markdown(decision)
+
+    gh.post_issue_comment(issue_number, bar_markdown)
+    labels = gh.label_transaction(issue_number, current=labels_from_issue(issue)).add("req/bar-aguardando")
+    if should_escalate:
+        labels.add("qa/bloqueado")
+    else:
+        labels.remove("qa/bloqueado")
+    labels.commit()
+    gh.post_issue_comment(issue_number, decision_markdown)
+    record_issue_writes(issue, [bar_markdown, decision_markdown], labels.current)
+    return decision
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="SKILL-REQ-01 Business Analyst Agent")
+    add_selector_arguments(parser)
+    args = parser.parse_args(argv)
+
+    gh = GitHubAPI()
+    if args.issue is not None:
+        run(gh, gh.fetch_issue_bundle(args.issue))
+        return
+    run_batch_cli(
+        "SKILL-REQ-01",
+        gh,
+        args,
+        lambda item_gh, selection, number: run(item_gh, item_gh.fetch_issue_bundle(number)),
+    )
 
 
 if __name__ == "__main__":
@@ -4,9 +4,10 @@ from __future__ import annotations
 import argparse
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 CURRENT_DIR = Path(__file__).resolve().parent
 if str(CURRENT_DIR) not in sys.path:
@@ -14,7 +15,10 @@ if str(CURRENT_DIR) not in sys.path:
 
 from ai_provider import call_llm, load_prompt_file
 from audit_ledger import DecisionRecord, format_decision_record_markdown
-from github_api import GitHubAPI
+from batch import add_selector_arguments, run_batch_cli
+from github_api import GitHubAPI, labels_from_issue, record_issue_writes
+from llm_resilience import LlmPolicy
+from prompt_budget import PromptBuilder
 from rn_catalog import get_fe_for_rn
 
 
@@ -42,101 +46,108 @@ def _parse_uc_names_from_bar(bar: str, issue_number: int) -> List[Tuple[str, str
     return rows
 
 
-def _build_fallback_uc(issue_number: int, classification: str, bar_markdown: str) -> str:
-    rns = _parse_rns_from_bar(bar_markdown)
-    uc_rows = _parse_uc_names_from_bar(bar_markdown, issue_number)
-
-    uc_blocks: List[str] = []
-    matrix_lines = [
-        "## Matriz de Rastreabilidade",
-        "| Issue | RN Acionada | UC | Módulo | Cenário Gherkin | Teste Esperado |",
-        "|---|---|---|---|---|---|",
-    ]
-
-    for idx, (uc_id, uc_name) in enumerate(uc_rows, start=1):
-        module = "transacao"
-        rn_list = ", ".join(rns) if rns else "N/A"
-        fe_rows = []
-        gherkin_rows = [
-            "Scenario: Caminho feliz",
-            "Given contexto válido",
-            "When o ator executa o fluxo principal",
-            "Then o sistema conclui a operação com sucesso",
-            "",
-        ]
-        for fe_idx, rn in enumerate(rns, start=1):
-            fe = get_fe_for_rn(rn)
-            if not fe:
-                continue
-            fe_name = f"FE-{fe_idx}: {fe}"
-            fe_rows.extend(
-                [
-                    f"FE-{fe_idx}: {fe} — Bifurca no Passo 2",
-                    f"Gatilho: violação de {rn}",
-                    f"RN Violada: {rn}",
-                    f"Resposta do Sistema: bloquear operação com mensagem '{fe}'",
-                    "",
-                ]
-            )
-            gherkin_rows.extend(
-                [
-                    f"Scenario: FE-{fe_idx}",
-                    f"Given condição de violação {rn}",
-                    "When o ator tenta executar a ação",
-                    f"Then o sistema retorna '{fe}'",
-                    "",
-                ]
-            )
-            matrix_lines.append(
-                f"| #{issue_number} | {rn} | {uc_id} | {module} | FE-{fe_idx}: {fe} | `{module.title()}ServiceTest#deveCobrir{rn.replace('-', '')}` |"
-            )
+_MATRIX_HEADER = [
+    "## Matriz de Rastreabilidade",
+    "| Issue | RN Acionada | UC | Módulo | Cenário Gherkin | Teste Esperado |",
+    "|---|---|---|---|---|---|",
+]
 
-        exception_rows = fe_rows if fe_rows else ["N/A"]
 
-        uc_blocks.extend(
+def _build_fallback_uc_block(
+    issue_number: int, classification: str, uc_id: str, uc_name: str, rns: List[str]
+) -> Tuple[List[str], List[str]]:
+    """Linhas markdown de um UC determinístico e suas linhas na matriz de rastreabilidade."""
+    module = "transacao"
+    rn_list = ", ".join(rns) if rns else "N/A"
+    fe_rows = []
+    matrix_rows = []
+    gherkin_rows = [
+        "Scenario: Caminho feliz",
+        "Given contexto válido",
+        "When o ator executa o fluxo principal",
+        "Then o sistema conclui a operação com sucesso",
+        "",
+    ]
+    for fe_idx, rn in enumerate(rns, start=1):
+        fe = get_fe_for_rn(rn)
+        if not fe:
+            continue
+        fe_rows.extend(
             [
-                f"## {uc_id}: {uc_name}",
-                f"**Módulo:** `{module}` | **Classificação:** {classification} | **Versão:** 1.0",
-                f"**RNs Acionadas:** {rn_list}",
-                "**Ator Principal:** Usuário de negócio | **Atores Secundários:** Sistema de validação",
-                "",
-                "### Pré-condições",
-                "- Usuário autenticado.",
-                "",
-                "### Pós-condições de Sucesso",
-                "- Estado de negócio persistido.",
-                "",
-                "### Pós-condições de Falha",
-                "- Nenhuma alteração persistida em caso de FE.",
+                f"FE-{fe_idx}: {fe} — Bifurca no Passo 2",
+                f"Gatilho: violação de {rn}",
+                f"RN Violada: {rn}",
+                f"Resposta do Sistema: bloquear operação com mensagem '{fe}'",
                 "",
-                "### Fluxo Principal",
-                "| Passo | Ator | Ação | Resposta do Sistema |",
-                "|---|---|---|---|",
-                "| 1 | Usuário | Inicia operação | Sistema valida pré-condições |",
-                "| 2 | Usuário | Confirma ação | Sistema aplica regras de negócio |",
-                "| 3 | Sistema | Finaliza fluxo | Sistema confirma sucesso |",
-                "",
-                "### Fluxos Alternativos",
-                "FA-1: Dados opcionais ausentes — Bifurca no Passo 1",
-                "",
-                "### Fluxos de Exceção",
-                *exception_rows,
-                "### Invariantes",
-                "- Regras RN aplicadas antes de persistência.",
-                "",
-                "### Critérios de Aceitação — Gherkin",
-                *gherkin_rows,
-                "### RNFs Aplicáveis",
-                "| Atributo | Métrica | Fonte |",
-                "|---|---|---|",
-                "| Latência | <= 2s por operação | NFR padrão DOM-02 |",
-                "| Confiabilidade | 100% aderência RN acionadas | DOM-02_SPEC |",
-                "",
-                "---",
+            ]
+        )
+        gherkin_rows.extend(
+            [
+                f"Scenario: FE-{fe_idx}",
+                f"Given condição de violação {rn}",
+                "When o ator tenta executar a ação",
+                f"Then o sistema retorna '{fe}'",
                 "",
             ]
         )
+        matrix_rows.append(
+            f"| #{issue_number} | {rn} | {uc_id} | {module} | FE-{fe_idx}: {fe} | `{module.title()}ServiceTest#deveCobrir{rn.replace('-', '')}` |"
+        )
 
+    exception_rows = fe_rows if fe_rows else ["N/A"]
+
+    block = [
+        f"## {uc_id}: {uc_name}",
+        f"**Módulo:** `{module}` | **Classificação:** {classification} | **Versão:** 1.0",
+        f"**RNs Acionadas:** {rn_list}",
+        "**Ator Principal:** Usuário de negócio | **Atores Secundários:** Sistema de validação",
+        "",
+        "### Pré-condições",
+        "- Usuário autenticado.",
+        "",
+        "### Pós-condições de Sucesso",
+        "- Estado de negócio persistido.",
+        "",
+        "### Pós-condições de Falha",
+        "- Nenhuma alteração persistida em caso de FE.",
+        "",
+        "### Fluxo Principal",
+        "| Passo | Ator | Ação | Resposta do Sistema |",
+        "|---|---|---|---|",
+        "| 1 | Usuário | Inicia operação | Sistema valida pré-condições |",
+        "| 2 | Usuário | Confirma ação | Sistema aplica regras de negócio |",
+        "| 3 | Sistema | Finaliza fluxo | Sistema confirma sucesso |",
+        "",
+        "### Fluxos Alternativos",
+        "FA-1: Dados opcionais ausentes — Bifurca no Passo 1",
+        "",
+        "### Fluxos de Exceção",
+        *exception_rows,
+        "### Invariantes",
+        "- Regras RN aplicadas antes de persistência.",
+        "",
+        "### Critérios de Aceitação — Gherkin",
+        *gherkin_rows,
+        "### RNFs Aplicáveis",
+        "| Atributo | Métrica | Fonte |",
+        "|---|---|---|",
+        "| Latência | <= 2s por operação | NFR padrão DOM-02 |",
+        "| Confiabilidade | 100% aderência RN acionadas | DOM-02_SPEC |",
+        "",
+        "---",
+        "",
+    ]
+    return block, matrix_rows
+
+
+def _build_fallback_uc(issue_number: int, classification: str, bar_markdown: str) -> str:
+    rns = _parse_rns_from_bar(bar_markdown)
+    uc_blocks: List[str] = []
+    matrix_lines = list(_MATRIX_HEADER)
+    for uc_id, uc_name in _parse_uc_names_from_bar(bar_markdown, issue_number):
+        block, matrix_rows = _build_fallback_uc_block(issue_number, classification, uc_id, uc_name, rns)
+        uc_blocks.extend(block)
+        matrix_lines.extend(matrix_rows)
     return "\n".join(uc_blocks + matrix_lines)
 
 
@@ -152,14 +163,134 @@ def _validate_deterministic_fes(markdown: str, rns: List[str]) -> List[str]:
     return missing
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="SKILL-REQ-02 Use Case Modeler Agent")
-    parser.add_argument("--issue", type=int, required=True)
-    args = parser.parse_args()
+def _strip_matrix(markdown: str) -> List[str]:
+    """Linhas de um UC gerado, sem matriz própria nem separador final (a matriz é consolidada depois)."""
+    lines = markdown.strip().splitlines()
+    for index, line in enumerate(lines):
+        if line.strip().startswith("## Matriz de Rastreabilidade"):
+            lines = lines[:index]
+            break
+    while lines and lines[-1].strip() in {"", "---"}:
+        lines.pop()
+    return lines + ["", "---", ""]
+
+
+_FE_HEADING = re.compile(r"^\s*(?:#+\s*)?\**(FE-\d+)\**\s*:\s*(.+?)\s*$")
+_MODULE_LINE = re.compile(r"\*\*Módulo:\*\*\s*`([^`]+)`")
 
-    gh = GitHubAPI()
-    issue = gh.get_issue(args.issue)
-    comments = gh.list_issue_comments(args.issue)
+
+def _matrix_rows_from_uc(lines: List[str], issue_number: int, uc_id: str, rns: List[str]) -> Optional[List[str]]:
+    """Linhas da matriz a partir dos FEs do próprio UC gerado.
+
+    Cada RN com FE determinístico precisa aparecer num cabeçalho `FE-n: ...`;
+    se algum faltar (numeração ou nome divergente), devolve None e o chamador
+    usa o bloco de fallback do UC.
+    """
+    module = "transacao"
+    headings: List[Tuple[str, str]] = []
+    for line in lines:
+        module_match = _MODULE_LINE.search(line)
+        if module_match:
+            module = module_match.group(1).strip()
+        fe_match = _FE_HEADING.match(line)
+        if fe_match:
+            label = fe_match.group(2).split(" — ")[0].strip()
+            headings.append((fe_match.group(1), label))
+
+    rows = []
+    for rn in rns:
+        fe = get_fe_for_rn(rn)
+        if not fe:
+            continue
+        found = next((heading for heading in headings if fe.lower() in heading[1].lower()), None)
+        if found is None:
+            return None
+        fe_id, label = found
+        rows.append(
+            f"| #{issue_number} | {rn} | {uc_id} | {module} | {fe_id}: {label} | `{module.title()}ServiceTest#deveCobrir{rn.replace('-', '')}` |"
+        )
+    return rows
+
+
+def _generate_uc(
+    prompt_template: str, bar: str, issue_number: int, classification: str, uc_id: str, uc_name: str, rns: List[str]
+) -> Tuple[List[str], List[str], bool]:
+    """Gera um único UC; qualquer saída fora do schema ou sem os FEs determinísticos cai no bloco de fallback."""
+    fallback_block, matrix_rows = _build_fallback_uc_block(issue_number, classification, uc_id, uc_name, rns)
+    fallback = "\n".join(fallback_block)
+    # BAR antes do UC alvo: todas as chamadas da mesma issue compartilham o prefixo do prompt.
+    prompt = (
+        PromptBuilder()
+        .add_static("template", prompt_template)
+        .add("bar", "\n\n".join(["## BAR aprovado", bar]), max_tokens=8000, strategy="middle")
+        .add(
+            "uc_alvo",
+            "\n\n".join(
+                [
+                    f"issue_number: {issue_number}",
+                    f"classification: {classification}",
+                    "## UC alvo",
+                    f"uc_id: {uc_id}",
+                    f"uc_name: {uc_name}",
+                    "Gere somente este UC no schema canônico, sem a Matriz de Rastreabilidade.",
+                ]
+            ),
+        )
+        .build()
+        .text
+    )
+    uc_markdown = call_llm(prompt=prompt, fallback=fallback, expect_prefix=f"## {uc_id}")
+    if (
+        uc_markdown == fallback
+        or not uc_markdown.strip().startswith(f"## {uc_id}")
+        or _validate_deterministic_fes(uc_markdown, rns)
+    ):
+        return fallback_block, matrix_rows, True
+    uc_lines = _strip_matrix(uc_markdown)
+    generated_rows = _matrix_rows_from_uc(uc_lines, issue_number, uc_id, rns)
+    if generated_rows is None:
+        return fallback_block, matrix_rows, True
+    return uc_lines, generated_rows, False
+
+
+def _generate_ucs(
+    prompt_template: str, bar: str, issue_number: int, classification: str, rns: List[str]
+) -> Tuple[str, List[str]]:
+    """Gera os UCs do BAR em paralelo (um pedido ao LLM por UC) e consolida a matriz de rastreabilidade.
+
+    O pool é limitado por `LlmPolicy.max_concurrency`; a ordem dos UCs segue
+    a tabela do BAR, independentemente de qual termina primeiro. Devolve o
+    markdown final e os UCs que usaram o fallback determinístico.
+    """
+    uc_rows = _parse_uc_names_from_bar(bar, issue_number)
+    workers = min(LlmPolicy.from_env().max_concurrency, len(uc_rows))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(
+            pool.map(
+                lambda row: _generate_uc(prompt_template, bar, issue_number, classification, row[0], row[1], rns),
+                uc_rows,
+            )
+        )
+
+    uc_blocks: List[str] = []
+    matrix_lines = list(_MATRIX_HEADER)
+    fallback_ucs: List[str] = []
+    for (uc_id, _), (block, matrix_rows, used_fallback) in zip(uc_rows, results):
+        uc_blocks.extend(block)
+        matrix_lines.extend(matrix_rows)
+        if used_fallback:
+            fallback_ucs.append(uc_id)
+    return "\n".join(uc_blocks + matrix_lines), fallback_ucs
+
+
+def run(gh: GitHubAPI, issue: Dict[str, Any]) -> DecisionRecord:
+    """Executa o REQ-02 sobre o bundle da issue (comentários incluídos).
+
+    Publica os artefatos no fim e reflete comentários e labels em `issue`,
+    para que a etapa seguinte do pipeline não precise buscá-la de novo.
+    """
+    issue_number = int(issue["number"])
+    comments = issue["comments"]
 
     bar = _find_latest_bar(comments)
     if not bar:
@@ -168,7 +299,7 @@ def main() -> None:
     if re.search(r"lgpd_scope:\s*true", bar, flags=re.IGNORECASE):
         decision = DecisionRecord(
             skill="SKILL-REQ-02",
-            issue_id=args.issue,
+            issue_id=issue_number,
             decision_type="gate",
             decision="escalar",
             confidence_score=0.6,
@@ -179,9 +310,12 @@ def main() -> None:
             artifacts_produced=[],
             lgpd_scope=True,
         )
-        gh.post_issue_comment(args.issue, format_decision_record_markdown(decision))
-        gh.add_labels(args.issue, ["qa/bloqueado"])
-        return
+        decision_markdown = format_decision_record_markdown(decision)
+        gh.post_issue_comment(issue_number, decision_markdown)
+        labels = gh.label_transaction(issue_number, current=labels_from_issue(issue)).add("qa/bloqueado")
+        labels.commit()
+        record_issue_writes(issue, [decision_markdown], labels.current)
+        return decision
 
     classification = "T1"
     explicit = re.search(r"Classificação:\s*(T[0-3])", bar)
@@ -189,48 +323,48 @@ def main() -> None:
         classification = explicit.group(1)
 
     prompt_template = load_prompt_file(str(CURRENT_DIR / "prompts" / "uc_generation.md"))
-    prompt = "\n\n".join(
-        [
-            prompt_template,
-            "## BAR aprovado",
-            bar,
-            f"issue_number: {args.issue}",
-            f"classification: {classification}",
-        ]
-    )
-
-    fallback = _build_fallback_uc(args.issue, classification, bar)
-    uc_markdown = call_llm(prompt=prompt, fallback=fallback)
-    if not uc_markdown.strip().startswith("## UC-"):
-        uc_markdown = fallback
-
     rns = _parse_rns_from_bar(bar)
-    missing = _validate_deterministic_fes(uc_markdown, rns)
-    if missing:
-        extra_lines = ["", "### Complemento Determinístico RN→FE"]
-        for rn in missing:
-            fe = get_fe_for_rn(rn)
-            if fe:
-                extra_lines.append(f"- {rn}: {fe}")
-        uc_markdown += "\n" + "\n".join(extra_lines)
-
-    gh.post_issue_comment(args.issue, uc_markdown)
-    gh.add_labels(args.issue, ["gate/2-aguardando"])
+    uc_markdown, fallback_ucs = _generate_ucs(prompt_template, bar, issue_number, classification, rns)
 
     decision = DecisionRecord(
         skill="SKILL-REQ-02",
-        issue_id=args.issue,
+        issue_id=issue_number,
         decision_type="gate",
         decision="avançar",
         confidence_score=0.8,
         rn_triggered=rns,
         modules_affected=["transacao"],
         approval_weight=0.0,
-        justification="UCs canônicos e matriz publicados para Gate 2.",
-        artifacts_produced=[f"UC-{args.issue}", "Matriz de Rastreabilidade"],
+        justification="UCs canônicos e matriz publicados para Gate 2."
+        + (f" UCs com fallback determinístico: {', '.join(fallback_ucs)}." if fallback_ucs else ""),
+        artifacts_produced=[f"UC-{issue_number}", "Matriz de Rastreabilidade"],
         lgpd_scope=False,
     )
-    gh.post_issue_comment(args.issue, format_decision_record_markdown(decision))
+    decision_markdown = format_decision_record_markdown(decision)
+
+    gh.post_issue_comment(issue_number, uc_markdown)
+    labels = gh.label_transaction(issue_number, current=labels_from_issue(issue)).add("gate/2-aguardando")
+    labels.commit()
+    gh.post_issue_comment(issue_number, decision_markdown)
+    record_issue_writes(issue, [uc_markdown, decision_markdown], labels.current)
+    return decision
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="SKILL-REQ-02 Use Case Modeler Agent")
+    add_selector_arguments(parser)
+    args = parser.parse_args(argv)
+
+    gh = GitHubAPI()
+    if args.issue is not None:
+        run(gh, gh.fetch_issue_bundle(args.issue))
+        return
+    run_batch_cli(
+        "SKILL-REQ-02",
+        gh,
+        args,
+        lambda item_gh, selection, number: run(item_gh, item_gh.fetch_issue_bundle(number)),
+    )
 
 
 if __name__ == "__main__":
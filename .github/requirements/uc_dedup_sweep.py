@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from github_api import GitHubAPI
+from minhash_lsh import MinHashLSH
+from similarity_engine import SimilarityEngine
+from uc_index import open_default_index
+from uc_repository import UcRecord
+
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _init_worker(engine: SimilarityEngine, lsh: Optional[MinHashLSH]) -> None:
+    _WORKER_STATE["engine"] = engine
+    _WORKER_STATE["lsh"] = lsh
+
+
+def _score_block(start: int, end: int, threshold: float) -> List[Tuple[int, int, float]]:
+    return _WORKER_STATE["engine"].similar_pairs(start, end, threshold, lsh=_WORKER_STATE["lsh"])
+
+
+class _DisjointSet:
+    def __init__(self) -> None:
+        self.parent: Dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        parent = self.parent.setdefault(item, item)
+        while parent != self.parent[parent]:
+            self.parent[parent] = self.parent[self.parent[parent]]
+            parent = self.parent[parent]
+        self.parent[item] = parent
+        return parent
+
+    def union(self, left: int, right: int) -> None:
+        root_left, root_right = self.find(left), self.find(right)
+        if root_left != root_right:
+            self.parent[max(root_left, root_right)] = min(root_left, root_right)
+
+
+def _plan(engine: SimilarityEngine, workers: int, memory_mb: int) -> Tuple[int, int]:
+    """Define (workers, linhas por bloco) para respeitar o teto de memória.
+
+    Cada processo mantém uma cópia do motor mais o acumulador de uma linha
+    (até uma entrada por UC, ~100 bytes cada); o processo principal também
+    guarda o motor, então o número de workers é reduzido até caber no teto.
+    """
+    total = len(engine)
+    budget = memory_mb * 1024 * 1024
+    per_process = engine.memory_bytes() + total * 100
+    fitting = max(budget // max(per_process, 1) - 1, 1)
+    workers = max(1, min(workers, fitting))
+    block = max(8, min(512, total // (workers * 8) or 8))
+    return workers, block
+
+
+def sweep(
+    records: List[UcRecord],
+    engine: SimilarityEngine,
+    threshold: float,
+    workers: int,
+    memory_mb: int,
+    lsh: Optional[MinHashLSH] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    started = time.perf_counter()
+    total = len(engine)
+    if lsh is None:
+        # Construído antes do pool para ser copiado uma única vez para cada worker.
+        engine.pair_index(threshold)
+    workers, block = _plan(engine, workers, memory_mb)
+    dsu = _DisjointSet()
+    edges: Dict[int, List[float]] = {}
+    pair_count = 0
+
+    def consume(pairs: List[Tuple[int, int, float]]) -> None:
+        nonlocal pair_count
+        for left, right, similarity in pairs:
+            dsu.union(left, right)
+            edges.setdefault(left, []).append(similarity)
+            edges.setdefault(right, []).append(similarity)
+            pair_count += 1
+
+    ranges = [(start, min(start + block, total)) for start in range(0, total, block)]
+    if workers <= 1:
+        for start, end in ranges:
+            consume(engine.similar_pairs(start, end, threshold, lsh=lsh))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine, lsh)) as pool:
+            # Limita blocos em voo para manter os resultados pendentes dentro do teto de memória.
+            pending = set()
+            queue = list(reversed(ranges))
+            while queue or pending:
+                while queue and len(pending) < workers * 2:
+                    start, end = queue.pop()
+                    pending.add(pool.submit(_score_block, start, end, threshold))
+                done = next(as_completed(pending))
+                pending.discard(done)
+                consume(done.result())
+
+    groups: Dict[int, List[int]] = {}
+    for doc_id in list(dsu.parent):
+        groups.setdefault(dsu.find(doc_id), []).append(doc_id)
+
+    clusters: List[Dict[str, Any]] = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort()
+        similarities = [value for doc_id in members for value in edges.get(doc_id, [])]
+        clusters.append(
+            {
+                "size": len(members),
+                "max_similarity": round(max(similarities), 4),
+                "min_similarity": round(min(similarities), 4),
+                "ucs": [
+                    {
+                        "issue_number": records[doc_id].issue_number,
+                        "uc_id": records[doc_id].uc_id,
+                        "uc_name": records[doc_id].name,
+                    }
+                    for doc_id in members
+                ],
+            }
+        )
+    clusters.sort(key=lambda item: (-item["size"], -item["max_similarity"]))
+
+    # ru_maxrss dos filhos é o pico do maior worker já encerrado (o pool foi finalizado
+    # acima); o total é uma cota superior: pico do principal + pico do maior worker × workers.
+    self_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker_rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024 if workers > 1 else 0.0
+    total_rss_mb = self_rss_mb + worker_rss_mb * workers
+    stats = {
+        "ucs": total,
+        "pairs": pair_count,
+        "clusters": len(clusters),
+        "block_size": block,
+        "workers": workers,
+        "mode": "lsh" if lsh is not None else "exato",
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "peak_rss_mb": round(self_rss_mb, 1),
+        "peak_rss_worker_mb": round(worker_rss_mb, 1),
+        "peak_rss_total_mb": round(total_rss_mb, 1),
+        "memory_mb": memory_mb,
+        "memory_exceeded": total_rss_mb > memory_mb,
+    }
+    return clusters, stats
+
+
+def format_clusters_markdown(clusters: List[Dict[str, Any]], stats: Dict[str, Any], threshold: float) -> str:
+    lines = [
+        "## Varredura de UCs duplicados",
+        f"**UCs:** {stats['ucs']} | **Pares ≥ {threshold:.2f}:** {stats['pairs']} | **Clusters:** {stats['clusters']} | "
+        f"**Modo:** {stats['mode']} | **Tempo:** {stats['elapsed_s']}s | "
+        f"**Memória (pico):** {stats['peak_rss_total_mb']} MB de {stats['memory_mb']} MB",
+        "",
+    ]
+    if stats["memory_exceeded"]:
+        lines.extend(["⚠️ O pico de memória medido passou do teto de `--memory-mb`; reduza `--workers`.", ""])
+    if not clusters:
+        lines.append("Nenhum cluster de quase-duplicatas encontrado.")
+    for idx, cluster in enumerate(clusters, start=1):
+        lines.extend(
+            [
+                f"### Cluster {idx} ({cluster['size']} UCs, similaridade {cluster['min_similarity']:.2f}–{cluster['max_similarity']:.2f})",
+                "| Issue | UC | Nome |",
+                "|---|---|---|",
+                *[f"| #{uc['issue_number']} | {uc['uc_id']} | {uc['uc_name']} |" for uc in cluster["ucs"]],
+                "",
+            ]
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Varredura all-pairs de UCs quase-duplicados no backlog")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--memory-mb", type=int, default=2048, help="Teto de memória somando todos os processos")
+    parser.add_argument("--lsh", action="store_true", help="Usa candidatos MinHash/LSH em vez do cálculo exato (rápido, mas de recall baixo)")
+    parser.add_argument("--offline", action="store_true", help="Não sincroniza o índice com o GitHub antes da varredura")
+    parser.add_argument("--format", choices=["json", "markdown"], default="markdown")
+    parser.add_argument("--output", help="Arquivo de saída (default: stdout)")
+    args = parser.parse_args()
+
+    index = open_default_index(os.getenv("GITHUB_REPOSITORY", ""))
+    if index is None:
+        raise RuntimeError("Índice de UCs indisponível (UC_INDEX=0 ou UC_INDEX_PATH inválido).")
+    if not args.offline:
+        index.refresh(GitHubAPI())
+    records, engine = index.engine()
+    lsh = index.lsh() if args.lsh else None
+
+    clusters, stats = sweep(records, engine, args.threshold, args.workers, args.memory_mb, lsh=lsh)
+    if stats["memory_exceeded"]:
+        print(
+            f"Aviso: pico de memória medido {stats['peak_rss_total_mb']} MB acima do teto de {args.memory_mb} MB",
+            file=sys.stderr,
+        )
+    if args.format == "json":
+        rendered = json.dumps({"threshold": args.threshold, "stats": stats, "clusters": clusters}, ensure_ascii=False, indent=2)
+    else:
+        rendered = format_clusters_markdown(clusters, stats, args.threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(rendered + "\n")
+    else:
+        print(rendered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from github_api import GitHubAPI
+from minhash_lsh import MinHashLSH
+from similarity_engine import SimilarityEngine, Vocabulary
+from uc_repository import UcRecord, _extract_ucs_from_markdown
+
+_SCHEMA_VERSION = "2"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ucs (
+    issue_number INTEGER NOT NULL,
+    uc_id TEXT NOT NULL,
+    issue_title TEXT NOT NULL,
+    name TEXT NOT NULL,
+    tokens TEXT NOT NULL,
+    PRIMARY KEY (issue_number, uc_id)
+);
+"""
+
+
+class UcIndex:
+    """Índice SQLite de `UcRecord`s e vetores de tokens, sincronizado por `since`.
+
+    `refresh` busca apenas issues com `updated_at` igual ou posterior à última
+    sincronização e re-extrai os UCs somente dessas issues; o marcador usa o
+    `updated_at` informado pelo GitHub, evitando dependência do relógio local.
+    Issues apagadas ou transferidas nunca voltam nessa listagem; por isso, a
+    cada `reconcile_seconds` a sincronização usa a listagem completa e remove
+    os UCs de issues que não aparecem mais nela.
+    `last_refresh_issues` conta as issues devolvidas na última sincronização e
+    `engine_builds` quantas vezes o motor em memória foi reconstruído.
+    """
+
+    def __init__(self, path: str, repository: str, reconcile_seconds: float = 24 * 3600) -> None:
+        self.path = path
+        self.repository = repository
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        if self._meta("schema") != _SCHEMA_VERSION:
+            # Índices antigos guardavam o trecho do UC; recria a tabela e força nova carga inicial.
+            self._conn.executescript("DROP TABLE ucs; DELETE FROM meta;" + _SCHEMA)
+        elif self._meta("repository") not in (None, repository):
+            self._conn.execute("DELETE FROM ucs")
+            self._conn.execute("DELETE FROM meta")
+        self._set_meta("schema", _SCHEMA_VERSION)
+        self._set_meta("repository", repository)
+        self._conn.commit()
+        self.last_refresh_issues = 0
+        self.last_refresh_changed = 0
+        self.last_refresh_removed = 0
+        self.engine_builds = 0
+        self._engine: Optional[Tuple[List[UcRecord], SimilarityEngine]] = None
+        self._lsh: Optional[MinHashLSH] = None
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def last_sync(self) -> Optional[str]:
+        with self._lock:
+            return self._meta("last_sync")
+
+    def refresh(self, client: GitHubAPI) -> int:
+        """Sincroniza o índice e retorna quantas issues tiveram UCs alterados.
+
+        O `since` do GitHub é inclusivo e os próprios comentários/labels das
+        skills atualizam `updated_at`, então a maioria das issues devolvidas não
+        muda nenhum UC; nesses casos nada é regravado e o motor em memória é
+        mantido. Só inserção, alteração ou remoção de UCs o invalida.
+        """
+        with self._lock:
+            since = self._meta("last_sync")
+            now = time.time()
+            reconcile = not since or now - float(self._meta("last_reconcile") or 0) >= self.reconcile_seconds
+            newest = since or ""
+            seen = 0
+            changed = 0
+            listed: Set[int] = set()
+            if reconcile:
+                # Carga inicial ou reconciliação: a listagem completa fica memoizada para o restante da execução.
+                issues = iter(client.list_recent_issues(per_page=100, state="all"))
+            else:
+                issues = client.iter_recent_issues(per_page=100, state="all", since=since)
+            for issue in issues:
+                seen += 1
+                newest = max(newest, issue.get("updated_at") or "")
+                issue_number = int(issue.get("number", 0))
+                listed.add(issue_number)
+                records = _extract_ucs_from_markdown(issue.get("body", "") or "", issue_number, issue.get("title", ""))
+                # Mesmo critério do `INSERT OR REPLACE`: um uc_id repetido fica com a última ocorrência.
+                fresh = {uc.uc_id: (uc.issue_title, uc.name, uc.counts()) for uc in records}
+                stored = {
+                    row[0]: (row[1], row[2], json.loads(row[3]))
+                    for row in self._conn.execute(
+                        "SELECT uc_id, issue_title, name, tokens FROM ucs WHERE issue_number = ?", (issue_number,)
+                    )
+                }
+                if fresh == stored:
+                    continue
+                self._conn.execute("DELETE FROM ucs WHERE issue_number = ?", (issue_number,))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ucs (issue_number, uc_id, issue_title, name, tokens) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (issue_number, uc_id, title, name, json.dumps(counts, ensure_ascii=False, sort_keys=True))
+                        for uc_id, (title, name, counts) in fresh.items()
+                    ],
+                )
+                changed += 1
+            removed = 0
+            if reconcile:
+                stored_issues = [row[0] for row in self._conn.execute("SELECT DISTINCT issue_number FROM ucs")]
+                gone = [(issue_number,) for issue_number in stored_issues if issue_number not in listed]
+                self._conn.executemany("DELETE FROM ucs WHERE issue_number = ?", gone)
+                removed = len(gone)
+                changed += removed
+                self._set_meta("last_reconcile", str(now))
+            if newest:
+                self._set_meta("last_sync", newest)
+            self._conn.commit()
+            self.last_refresh_issues = seen
+            self.last_refresh_changed = changed
+            self.last_refresh_removed = removed
+            if changed:
+                self._engine = None
+                self._lsh = None
+            return changed
+
+    def records(self, vocabulary: Optional[Vocabulary] = None) -> List[UcRecord]:
+        vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT issue_number, issue_title, uc_id, name, tokens FROM ucs ORDER BY issue_number DESC, uc_id"
+            ).fetchall()
+        return [UcRecord.from_counts(row[0], row[1], row[2], row[3], json.loads(row[4]), vocabulary) for row in rows]
+
+    def engine(self) -> Tuple[List[UcRecord], SimilarityEngine]:
+        """Registros e motor de similaridade, reconstruídos só quando o índice muda.
+
+        Cada reconstrução usa um vocabulário novo, compartilhado entre registros
+        e motor; termos de UCs que saíram do corpus somem com o motor anterior.
+        """
+        cached = self._engine
+        if cached is None:
+            vocabulary = Vocabulary()
+            records = self.records(vocabulary)
+            cached = (records, SimilarityEngine.from_term_arrays(vocabulary, ((uc.term_ids, uc.term_freqs) for uc in records)))
+            self._engine = cached
+            self.engine_builds += 1
+        return cached
+
+    def lsh(self, num_perm: int = 64, bands: int = 16) -> MinHashLSH:
+        cached = self._lsh
+        if cached is None or (cached.num_perm, cached.bands) != (num_perm, bands):
+            _, engine = self.engine()
+            cached = MinHashLSH.build(
+                (engine.row_terms(doc_id) for doc_id in range(len(engine))), num_perm=num_perm, bands=bands
+            )
+            self._lsh = cached
+        return cached
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "last_sync": self.last_sync,
+            "last_refresh_issues": self.last_refresh_issues,
+            "last_refresh_changed": self.last_refresh_changed,
+            "last_refresh_removed": self.last_refresh_removed,
+            "engine_builds": self.engine_builds,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_default_index(repository: str) -> Optional[UcIndex]:
+    if os.getenv("UC_INDEX", "1").strip().lower() in {"0", "false", "off", "no"}:
+        return None
+    safe_repo = re.sub(r"[^A-Za-z0-9._-]", "_", repository)
+    path = os.getenv("UC_INDEX_PATH") or os.path.join(tempfile.gettempdir(), f"deep-ion-uc-index-{safe_repo}.sqlite")
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        reconcile_hours = float(os.getenv("UC_INDEX_RECONCILE_HOURS", "24") or "24")
+        return UcIndex(path, repository, reconcile_seconds=reconcile_hours * 3600)
+    except (OSError, sqlite3.Error):
+        return None
@@ -1,66 +1,102 @@
 from __future__ import annotations
 
-import json
 import math
-import os
 import re
+import sys
+from array import array
 from collections import Counter
-from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional
-from urllib import request
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional
 
+from github_api import GitHubAPI
+from http_transport import HttpTransport
+from minhash_lsh import MinHashLSH
+from similarity_engine import SimilarityEngine, Vocabulary
 
-@dataclass
+if TYPE_CHECKING:
+    from uc_index import UcIndex
+
+
+@dataclass(slots=True)
 class UcRecord:
+    """UC extraído de uma issue, com o vetor de termos já tokenizado.
+
+    O texto do UC não é guardado: `term_ids` (ids de `vocabulary`, em ordem
+    crescente) e `term_freqs` são arrays paralelos e `norm` é a norma L2 das
+    frequências, calculada uma única vez. O vocabulário pertence a quem monta o
+    corpus (índice ou busca) e é compartilhado com o `SimilarityEngine`, então
+    é descartado junto com o motor em vez de crescer durante todo o processo.
+    """
+
     issue_number: int
     issue_title: str
     uc_id: str
     name: str
-    body_excerpt: str
+    term_ids: array = field(default_factory=lambda: array("I"))
+    term_freqs: array = field(default_factory=lambda: array("H"))
+    norm: float = 0.0
+    vocabulary: Vocabulary = field(default_factory=Vocabulary, repr=False, compare=False)
+
+    @classmethod
+    def from_counts(
+        cls,
+        issue_number: int,
+        issue_title: str,
+        uc_id: str,
+        name: str,
+        counts: Mapping[str, int],
+        vocabulary: Vocabulary,
+    ) -> "UcRecord":
+        pairs = sorted((vocabulary.add(sys.intern(term)), freq) for term, freq in counts.items() if freq)
+        return cls(
+            issue_number=issue_number,
+            issue_title=issue_title,
+            uc_id=uc_id,
+            name=name,
+            term_ids=array("I", (term_id for term_id, _ in pairs)),
+            term_freqs=array("H", (freq for _, freq in pairs)),
+            norm=math.sqrt(sum(freq * freq for _, freq in pairs)),
+            vocabulary=vocabulary,
+        )
 
+    def counts(self) -> Dict[str, int]:
+        terms = self.vocabulary.terms
+        return {terms[term_id]: freq for term_id, freq in zip(self.term_ids, self.term_freqs)}
 
-class GitHubIssueClient:
-    def __init__(self, repo: Optional[str] = None, token: Optional[str] = None) -> None:
-        self.repo = repo or os.getenv("GITHUB_REPOSITORY", "")
-        self.token = token or os.getenv("GITHUB_TOKEN", "")
-        if not self.repo:
-            raise ValueError("GITHUB_REPOSITORY não definido")
-        if not self.token:
-            raise ValueError("GITHUB_TOKEN não definido")
 
-    def _api_get(self, path: str) -> Any:
-        url = f"https://api.github.com{path}"
-        req = request.Request(url)
-        req.add_header("Accept", "application/vnd.github+json")
-        req.add_header("Authorization", f"Bearer {self.token}")
-        req.add_header("X-GitHub-Api-Version", "2022-11-28")
-        with request.urlopen(req, timeout=30) as resp:
-            return json.loads(resp.read().decode("utf-8"))
+class GitHubIssueClient(GitHubAPI):
+    """Cliente legado de leitura de UCs, agora apoiado no `GitHubAPI` compartilhado."""
 
-    def list_recent_issues(self, per_page: int = 100, state: str = "all") -> List[Dict[str, Any]]:
-        owner, name = self.repo.split("/", maxsplit=1)
-        path = f"/repos/{owner}/{name}/issues?state={state}&per_page={per_page}&sort=updated&direction=desc"
-        data = self._api_get(path)
-        return [item for item in data if "pull_request" not in item]
+    def __init__(
+        self,
+        repo: Optional[str] = None,
+        token: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+    ) -> None:
+        super().__init__(repository=repo, token=token, transport=transport)
 
+    @property
+    def repo(self) -> str:
+        return self.ctx.repository
 
-def _tokenize(text: str) -> List[str]:
-    return re.findall(r"[a-zA-ZÀ-ÿ0-9_-]{3,}", text.lower())
+    @property
+    def token(self) -> str:
+        return self.ctx.token
 
+    def _api_get(self, path: str) -> Any:
+        return self._request("GET", path)
 
-def _cosine_similarity(vec_a: Counter, vec_b: Counter) -> float:
-    common = set(vec_a.keys()) & set(vec_b.keys())
-    dot = sum(vec_a[t] * vec_b[t] for t in common)
-    norm_a = math.sqrt(sum(v * v for v in vec_a.values()))
-    norm_b = math.sqrt(sum(v * v for v in vec_b.values()))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
 
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-zA-ZÀ-ÿ0-9_-]{3,}", text.lower())
 
-def _extract_ucs_from_markdown(body: str, issue_number: int, issue_title: str) -> List[UcRecord]:
+
+def _extract_ucs_from_markdown(
+    body: str, issue_number: int, issue_title: str, vocabulary: Optional[Vocabulary] = None
+) -> List[UcRecord]:
     if not body:
         return []
+    vocabulary = vocabulary if vocabulary is not None else Vocabulary()
 
     pattern = re.compile(r"^##\s+(UC-[A-Za-z0-9._-]+):\s*(.+)$", re.MULTILINE)
     matches = list(pattern.finditer(body))
@@ -71,51 +107,70 @@ def _extract_ucs_from_markdown(body: str, issue_number: int, issue_title: str) -
         chunk = body[start:end].strip()
         uc_id = match.group(1).strip()
         name = match.group(2).strip()
-        records.append(
-            UcRecord(
-                issue_number=issue_number,
-                issue_title=issue_title,
-                uc_id=uc_id,
-                name=name,
-                body_excerpt=chunk[:1200],
-            )
-        )
+        records.append(UcRecord.from_counts(issue_number, issue_title, uc_id, name, Counter(_tokenize(chunk[:1200])), vocabulary))
     return records
 
 
-def list_existing_ucs(client: Optional[GitHubIssueClient] = None) -> List[UcRecord]:
+def list_existing_ucs(client: Optional[GitHubAPI] = None, vocabulary: Optional[Vocabulary] = None) -> List[UcRecord]:
     gh = client or GitHubIssueClient()
-    issues = gh.list_recent_issues(per_page=100, state="all")
+    vocabulary = vocabulary if vocabulary is not None else Vocabulary()
     all_ucs: List[UcRecord] = []
 
-    for issue in issues:
+    for issue in gh.list_recent_issues(per_page=100, state="all"):
         issue_number = int(issue.get("number", 0))
         issue_title = issue.get("title", "")
         issue_body = issue.get("body", "") or ""
 
-        all_ucs.extend(_extract_ucs_from_markdown(issue_body, issue_number, issue_title))
+        all_ucs.extend(_extract_ucs_from_markdown(issue_body, issue_number, issue_title, vocabulary))
 
     return all_ucs
 
 
-def find_similar_ucs(text: str, threshold: float = 0.8, client: Optional[GitHubIssueClient] = None) -> List[Dict[str, Any]]:
+def find_similar_ucs(
+    text: str,
+    threshold: float = 0.8,
+    client: Optional[GitHubAPI] = None,
+    index: Optional["UcIndex"] = None,
+    limit: Optional[int] = None,
+    use_lsh: bool = False,
+    refresh: bool = True,
+) -> List[Dict[str, Any]]:
+    """UCs existentes com similaridade ≥ `threshold` a `text`.
+
+    Com `index`, o índice é sincronizado antes da busca; `refresh=False`
+    pula a sincronização quando quem chama já a fez (ex.: lote de issues
+    compartilhando o mesmo índice e motor).
+    """
     target_tokens = Counter(_tokenize(text))
     if not target_tokens:
         return []
 
+    lsh: Optional[MinHashLSH] = None
+    if index is not None:
+        if refresh:
+            index.refresh(client or GitHubIssueClient())
+        records, engine = index.engine()
+        if use_lsh:
+            lsh = index.lsh()
+    else:
+        vocabulary = Vocabulary()
+        records = list_existing_ucs(client=client, vocabulary=vocabulary)
+        engine = SimilarityEngine.from_term_arrays(vocabulary, ((uc.term_ids, uc.term_freqs) for uc in records))
+        if use_lsh:
+            lsh = MinHashLSH.build(engine.row_terms(doc_id) for doc_id in range(len(engine)))
+
+    # Com LSH, apenas os candidatos que colidem em alguma banda são re-ranqueados por cosseno.
+    candidates = lsh.query(target_tokens) if lsh is not None else None
     matches: List[Dict[str, Any]] = []
-    for uc in list_existing_ucs(client=client):
-        similarity = _cosine_similarity(target_tokens, Counter(_tokenize(uc.body_excerpt)))
-        if similarity >= threshold:
-            matches.append(
-                {
-                    "issue_number": uc.issue_number,
-                    "issue_title": uc.issue_title,
-                    "uc_id": uc.uc_id,
-                    "uc_name": uc.name,
-                    "similarity": round(similarity, 4),
-                }
-            )
-
-    matches.sort(key=lambda item: item["similarity"], reverse=True)
+    for doc_id, similarity in engine.top_k(target_tokens, k=limit, threshold=threshold, candidates=candidates):
+        uc = records[doc_id]
+        matches.append(
+            {
+                "issue_number": uc.issue_number,
+                "issue_title": uc.issue_title,
+                "uc_id": uc.uc_id,
+                "uc_name": uc.name,
+                "similarity": round(similarity, 4),
+            }
+        )
     return matches
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+import skill_req_00
+from ai_provider import OUTCOMES, get_llm_cache
+from audit_ledger import DecisionRecord
+from github_api import GitHubAPI, labels_from_issue, record_issue_writes
+from http_transport import get_default_transport
+from pipeline import StageReport, run_pipeline
+from rn_catalog import catalog_snapshot
+from uc_index import UcIndex, open_default_index
+
+DEFAULT_WEBHOOK_PORT = 8090
+DEFAULT_WEBHOOK_WORKERS = 4
+DEFAULT_MAX_PENDING = 100
+RETRY_AFTER_SECONDS = 30
+
+# Comandos de comentário na ordem em que os workflows os avaliam. Os de
+# Checkpoint A só mexem em labels (mesmas regras do checkpoint-automation.yml);
+# as etapas rodam depois, com o gating de labels do pipeline.
+COMMAND_STAGES: Dict[str, Tuple[str, ...]] = {
+    "/gate1-approve": ("00", "01"),
+    "/ba-approve": ("02",),
+    "/ba-reject": (),
+    "/ba-revise": (),
+}
+COMMAND_LABELS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "/ba-approve": (("req/bar-aprovado",), ("req/bar-aguardando", "qa/bloqueado")),
+    "/ba-reject": (("qa/bloqueado",), ("req/bar-aprovado",)),
+    "/ba-revise": (("req/bar-aguardando",), ("req/bar-aprovado",)),
+}
+
+
+@dataclass
+class WebhookJob:
+    issue_number: int
+    commands: List[str]
+    delivery: str = ""
+    received_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def stages(self) -> List[str]:
+        stages: List[str] = []
+        for command in self.commands:
+            stages.extend(stage for stage in COMMAND_STAGES[command] if stage not in stages)
+        return stages
+
+
+def parse_issue_comment(payload: Dict[str, Any]) -> Optional[WebhookJob]:
+    """Job a partir do payload `issue_comment` do GitHub; None se não houver nada a executar."""
+    if payload.get("action") != "created":
+        return None
+    issue = payload.get("issue") or {}
+    # Comentários em PR chegam como `issue_comment` com `issue.pull_request`.
+    if "pull_request" in issue or not issue.get("number"):
+        return None
+    body = (payload.get("comment") or {}).get("body") or ""
+    commands = [command for command in COMMAND_STAGES if command in body]
+    if not commands:
+        return None
+    return WebhookJob(int(issue["number"]), commands)
+
+
+def verify_signature(secret: str, payload: bytes, signature: str) -> bool:
+    expected = "sha256=" + hmac.new(secret.encode("utf-8"), payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+class IssueQueue:
+    """Fila limitada que serializa os jobs de uma mesma issue.
+
+    Cada issue tem sua própria fila FIFO; só issues sem job em execução ficam
+    em `_ready`, então dois workers nunca processam a mesma issue ao mesmo
+    tempo, enquanto issues diferentes seguem em paralelo. `offer` recusa
+    quando há `max_pending` jobs esperando (backpressure para o chamador).
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING) -> None:
+        self.max_pending = max(1, max_pending)
+        self._cond = threading.Condition()
+        self._pending: Dict[int, Deque[WebhookJob]] = {}
+        self._ready: Deque[int] = deque()
+        self._active: Set[int] = set()
+        self._size = 0
+        self._closed = False
+
+    def offer(self, job: WebhookJob) -> bool:
+        with self._cond:
+            if self._closed or self._size >= self.max_pending:
+                return False
+            queue = self._pending.setdefault(job.issue_number, deque())
+            queue.append(job)
+            self._size += 1
+            # Com a issue em execução ou já na fila de prontas, o job só espera a vez dela.
+            if job.issue_number not in self._active and len(queue) == 1:
+                self._ready.append(job.issue_number)
+                self._cond.notify()
+            return True
+
+    def take(self) -> Optional[WebhookJob]:
+        """Próximo job de uma issue livre; None quando a fila foi fechada e esvaziada."""
+        with self._cond:
+            while not self._ready:
+                if self._closed and not self._size:
+                    return None
+                self._cond.wait()
+            issue_number = self._ready.popleft()
+            job = self._pending[issue_number].popleft()
+            self._size -= 1
+            self._active.add(issue_number)
+            return job
+
+    def done(self, job: WebhookJob) -> None:
+        with self._cond:
+            self._active.discard(job.issue_number)
+            if self._pending.get(job.issue_number):
+                self._ready.append(job.issue_number)
+                self._cond.notify()
+            else:
+                self._pending.pop(job.issue_number, None)
+            if self._closed and not self._size:
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "depth": self._size,
+                "max_pending": self.max_pending,
+                "active_issues": sorted(self._active),
+                "waiting_issues": {str(number): len(jobs) for number, jobs in self._pending.items() if jobs},
+            }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class WorkerMetrics:
+    def __init__(self, limit: int = 500) -> None:
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"received": 0, "accepted": 0, "ignored": 0, "duplicate": 0, "rejected": 0, "processed": 0, "failed": 0}
+        self.wait_ms: Deque[float] = deque(maxlen=limit)
+        self.run_ms: Deque[float] = deque(maxlen=limit)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def observe(self, wait_ms: float, run_ms: float, failed: bool) -> None:
+        with self._lock:
+            self.counts["failed" if failed else "processed"] += 1
+            self.wait_ms.append(wait_ms)
+            self.run_ms.append(run_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            wait, run = list(self.wait_ms), list(self.run_ms)
+            return {
+                **self.counts,
+                "wait_p50_ms": round(_percentile(wait, 0.50), 1),
+                "wait_p95_ms": round(_percentile(wait, 0.95), 1),
+                "run_p50_ms": round(_percentile(run, 0.50), 1),
+                "run_p95_ms": round(_percentile(run, 0.95), 1),
+            }
+
+
+class WebhookWorker:
+    """Daemon que recebe webhooks `issue_comment` e executa as skills com estado quente.
+
+    O processo mantém o pool de conexões/ETag do transporte padrão, o catálogo
+    de RNs e um `UcIndex` sincronizado incrementalmente entre eventos. Cada
+    evento usa um `GitHubAPI` novo sobre esse transporte, para que a
+    memoização do `SingleFlight` não sirva listagens de um evento anterior e
+    cada evento tenha seu próprio orçamento de retentativas.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WEBHOOK_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        secret: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_WEBHOOK_PORT,
+        handler: Optional[Callable[[WebhookJob], List[StageReport]]] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.secret = secret or ""
+        self.queue = IssueQueue(max_pending)
+        self.metrics = WorkerMetrics()
+        self.handler = handler or self.process
+        self._uc_index: Optional[UcIndex] = None
+        self._index_lock = threading.Lock()
+        self._deliveries: "OrderedDict[str, None]" = OrderedDict()
+        self._deliveries_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._httpd = ThreadingHTTPServer((host, port), self._http_handler())
+        self._httpd.daemon_threads = True
+        self._http_thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def uc_index(self, gh: GitHubAPI) -> UcIndex:
+        with self._index_lock:
+            if self._uc_index is None:
+                # Sem índice persistente, o índice em memória vive enquanto o processo viver.
+                self._uc_index = open_default_index(gh.ctx.repository) or UcIndex(":memory:", gh.ctx.repository)
+            return self._uc_index
+
+    def warm_up(self) -> None:
+        """Carrega catálogo de RNs e corpus de UCs antes do primeiro evento."""
+        catalog_snapshot()
+        gh = GitHubAPI()
+        index = self.uc_index(gh)
+        index.refresh(gh)
+        index.engine()
+
+    def check_noop_refresh(self) -> Optional[str]:
+        """Confere que uma sincronização sem UCs alterados mantém o motor quente.
+
+        Roda depois do `warm_up`: o `since` é inclusivo, então a issue mais
+        recente volta na listagem mesmo sem mudanças. Devolve a descrição da
+        falha, ou None.
+        """
+        gh = GitHubAPI()
+        index = self.uc_index(gh)
+        _, before = index.engine()
+        builds = index.engine_builds
+        changed = index.refresh(gh)
+        _, after = index.engine()
+        if changed:
+            return f"{changed} issue(s) com UCs alterados numa sincronização sem mudanças"
+        if after is not before or index.engine_builds != builds:
+            return "motor de similaridade reconstruído sem mudanças no índice"
+        return None
+
+    def process(self, job: WebhookJob) -> List[StageReport]:
+        gh = GitHubAPI()
+        issue = gh.fetch_issue_bundle(job.issue_number)
+        for command in job.commands:
+            if command not in COMMAND_LABELS:
+                continue
+            add, remove = COMMAND_LABELS[command]
+            labels = gh.label_transaction(job.issue_number, current=labels_from_issue(issue))
+            labels.add(*add).remove(*remove).commit()
+            record_issue_writes(issue, [], labels.current)
+        if not job.stages:
+            return []
+
+        index = self.uc_index(gh)
+
+        def run_req_00(gh: GitHubAPI, issue: Dict[str, Any]) -> DecisionRecord:
+            # Sincronização incremental: só issues alteradas desde o último evento.
+            index.refresh(gh)
+            return skill_req_00.run(gh, issue, uc_index=index)
+
+        return run_pipeline(gh, job.issue_number, job.stages, issue=issue, runners={"00": run_req_00})
+
+    def submit(self, job: WebhookJob) -> str:
+        """Enfileira o job: "enfileirado", "duplicado" ou "fila cheia" (backpressure)."""
+        if job.delivery:
+            with self._deliveries_lock:
+                # Reentregas do GitHub reutilizam o X-GitHub-Delivery.
+                if job.delivery in self._deliveries:
+                    self.metrics.count("duplicate")
+                    return "duplicado"
+                self._deliveries[job.delivery] = None
+                while len(self._deliveries) > 1000:
+                    self._deliveries.popitem(last=False)
+        if not self.queue.offer(job):
+            self.metrics.count("rejected")
+            if job.delivery:
+                # O GitHub (ou quem reenviar) precisa poder tentar de novo com o mesmo id.
+                with self._deliveries_lock:
+                    self._deliveries.pop(job.delivery, None)
+            return "fila cheia"
+        self.metrics.count("accepted")
+        return "enfileirado"
+
+    def _work(self) -> None:
+        while True:
+            job = self.queue.take()
+            if job is None:
+                return
+            started = time.monotonic()
+            failed = False
+            try:
+                reports = self.handler(job)
+                failed = any(report.status == "erro" for report in reports)
+                summary = ", ".join(f"REQ-{report.stage}={report.status}" for report in reports) or "labels"
+            except Exception as exc:
+                failed = True
+                summary = f"{exc.__class__.__name__}: {exc}"
+            finally:
+                self.queue.done(job)
+            finished = time.monotonic()
+            self.metrics.observe((started - job.received_at) * 1000, (finished - started) * 1000, failed)
+            print(
+                f"Webhook: issue #{job.issue_number} {' '.join(job.commands)} → {summary} ({(finished - started) * 1000:.0f} ms)",
+                file=sys.stderr,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        cache = get_llm_cache()
+        scheduler = getattr(get_default_transport(), "scheduler", None)
+        return {
+            "queue": self.queue.snapshot(),
+            "workers": self.workers,
+            "events": self.metrics.snapshot(),
+            "llm_outcomes": dict(OUTCOMES.counts),
+            "llm_cache": cache.stats() if cache is not None else {},
+            "github_scheduler": scheduler.stats() if scheduler is not None else {},
+            "uc_index": self._uc_index.stats() if self._uc_index is not None else {},
+        }
+
+    def _http_handler(self) -> type:
+        worker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                path = self.path.split("?", maxsplit=1)[0]
+                if path == "/healthz":
+                    self._send(200, {"status": "ok"})
+                elif path == "/metrics":
+                    self._send(200, worker.snapshot())
+                else:
+                    self._send(404, {"error": "Not Found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if self.path.split("?", maxsplit=1)[0] != "/webhook":
+                    self._send(404, {"error": "Not Found"})
+                    return
+                worker.metrics.count("received")
+                if worker.secret and not verify_signature(worker.secret, raw, self.headers.get("X-Hub-Signature-256", "")):
+                    self._send(401, {"error": "assinatura inválida"})
+                    return
+                event = self.headers.get("X-GitHub-Event", "issue_comment")
+                if event == "ping":
+                    self._send(200, {"status": "pong"})
+                    return
+                try:
+                    payload = json.loads(raw.decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    self._send(400, {"error": "payload inválido"})
+                    return
+                job = parse_issue_comment(payload) if event == "issue_comment" and isinstance(payload, dict) else None
+                if job is None:
+                    worker.metrics.count("ignored")
+                    self._send(202, {"status": "ignorado"})
+                    return
+                job.delivery = self.headers.get("X-GitHub-Delivery", "")
+                status = worker.submit(job)
+                if status == "fila cheia":
+                    self._send(503, {"status": status, "max_pending": worker.queue.max_pending}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+                    return
+                self._send(202, {"status": status, "issue": job.issue_number, "commands": job.commands})
+
+            def log_message(self, *args: Any) -> None:
+                return
+
+        return Handler
+
+    def start(self) -> "WebhookWorker":
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"webhook-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._http_thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._http_thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Para de aceitar eventos e espera os workers esvaziarem a fila."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Worker de webhooks issue_comment com caches quentes e serialização por issue")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("WEBHOOK_PORT") or DEFAULT_WEBHOOK_PORT))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEBHOOK_WORKERS") or DEFAULT_WEBHOOK_WORKERS))
+    parser.add_argument("--max-pending", type=int, default=int(os.getenv("WEBHOOK_MAX_PENDING") or DEFAULT_MAX_PENDING))
+    parser.add_argument("--no-warm-up", action="store_true", help="Não sincroniza o índice de UCs na partida")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Só aquece o índice, confere que uma nova sincronização sem mudanças mantém o motor e sai (exit 1 se não)",
+    )
+    args = parser.parse_args(argv)
+
+    worker = WebhookWorker(
+        workers=args.workers,
+        max_pending=args.max_pending,
+        secret=os.getenv("GITHUB_WEBHOOK_SECRET"),
+        host=args.host,
+        port=args.port,
+    )
+    if args.check:
+        worker.warm_up()
+        failure = worker.check_noop_refresh()
+        print(json.dumps(worker.snapshot()["uc_index"]))
+        if failure:
+            print(f"Falha: {failure}", file=sys.stderr)
+            sys.exit(1)
+        return
+    if not args.no_warm_up:
+        worker.warm_up()
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    worker.start()
+    print(f"Webhook worker ouvindo em {worker.base_url}/webhook ({worker.workers} workers, fila {args.max_pending})", file=sys.stderr)
+    try:
+        while not stopped.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()